@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Throughput benchmarks of data-migrator.
+
+Measures the scan of rows into models, every emitter, the anonymizors, the
+SQL escaping and the Transformer end to end, on synthetic input generated from
+the models below (see :mod:`data_migrator.contrib.synthetic`). Every benchmark
+is run ``--repeat`` times, the best time is kept.
+
+Run from the root of the repository::
+
+    python benchmarks/bench.py --rows 100000 --output before.json
+    python benchmarks/bench.py --rows 100000 --output after.json --compare before.json
+
+Results are saved as JSON with the version and platform, ``--compare`` shows
+how much faster every benchmark is than in an earlier result.
+"""
+
+import os
+import sys
+import gc
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import datetime
+from functools import partial
+from timeit import default_timer as clock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from data_migrator import __version__, models  # noqa: E402
+from data_migrator import emitters  # noqa: E402
+from data_migrator.anonymizors import SimpleStringAnonymizor, TextAnonymizor  # noqa: E402
+from data_migrator.anonymizors import ChoiceAnonymizor  # noqa: E402
+from data_migrator.anonymizors.lists import Alpha3Anonymizor  # noqa: E402
+from data_migrator.contrib.synthetic import synthetic_rows, write_tsv  # noqa: E402
+from data_migrator.transform import Transformer  # noqa: E402
+from data_migrator.utils import sql_escape, mysql_tsv_escape, pg_copy_escape  # noqa: E402
+
+
+class Customer(models.Model):
+    id = models.IntField(pos=0, key=True, unique=True)
+    name = models.StringField(pos=1, max_length=64)
+    email = models.StringField(pos=2, max_length=128, unique=True)
+    city = models.NullStringField(pos=3, max_length=32)
+    active = models.BooleanField(pos=4)
+    created = models.DateTimeField(pos=5)
+    score = models.NullIntField(pos=6)
+
+
+class AnonymizedCustomer(models.Model):
+    id = models.IntField(pos=0, key=True)
+    name = models.StringField(pos=1, anonymize=TextAnonymizor)
+    email = models.StringField(pos=2, anonymize=SimpleStringAnonymizor)
+    city = models.NullStringField(pos=3, anonymize=Alpha3Anonymizor)
+
+    class Meta:
+        table_name = 'customer'
+
+
+BENCHMARKS = []
+
+
+def benchmark(fn):
+    '''register a benchmark, ``fn(data)`` returns the number of items'''
+    BENCHMARKS.append(fn)
+    return fn
+
+
+class Data(object):
+    '''input shared by the benchmarks, generated once'''
+
+    def __init__(self, rows, tmpdir):
+        self.rows = rows
+        self.tmpdir = tmpdir
+        self.input = list(synthetic_rows(Customer, rows))[1:]
+        self.filename = os.path.join(tmpdir, 'customer.tsv')
+        self.size = write_tsv(Customer, self.filename, rows)
+        self.objects = self.scan(Customer)
+
+    def scan(self, model):
+        manager = model.objects.__class__()
+        manager._prepare(model)
+        model.objects = manager
+        manager.scan_rows(self.input)
+        return manager.all()
+
+
+@benchmark
+def scan(data):
+    data.scan(Customer)
+    return data.rows
+
+
+@benchmark
+def scan_emit_anonymized(data):
+    # the anonymizors run when the objects are emitted
+    objects = data.scan(AnonymizedCustomer)
+    emitters.MySQLEmitter(manager=AnonymizedCustomer.objects).emit_many(objects)
+    return data.rows
+
+
+def _emit(emitter, data, model=Customer):
+    e = emitter(manager=model.objects)
+    e.preamble(headers=[])
+    e.emit_many(data.objects)
+    e.postamble()
+    return data.rows
+
+
+for _name, _emitter in [
+        ('mysql', emitters.MySQLEmitter),
+        ('mysql_extended', partial(emitters.MySQLEmitter, batch_size=1000)),
+        ('mysql_load_data', emitters.MySQLLoadDataEmitter),
+        ('postgres_copy', emitters.PostgresCopyEmitter),
+        ('postgres_copy_binary', partial(emitters.PostgresCopyEmitter, binary=True)),
+        ('csv', emitters.CSVEmitter),
+        ('csv_dialect', partial(emitters.CSVEmitter, dialect='excel')),
+        ('json', emitters.JSONEmitter),
+        ('singer', emitters.SingerEmitter),
+        ('update', emitters.UpdateEmitter),
+        ('dbapi', emitters.DBAPIEmitter)]:
+    _fn = partial(_emit, _emitter)
+    _fn.__name__ = 'emit_' + _name
+    benchmark(_fn)
+
+
+@benchmark
+def emit_parquet(data):
+    try:
+        import pyarrow  # noqa: F401 pylint: disable=unused-import
+    except ImportError:
+        return None
+    return _emit(emitters.ParquetEmitter, data)
+
+
+def _anonymize(anonymizor, data):
+    for row in data.input:
+        anonymizor(row[1])
+    return data.rows
+
+
+for _name, _anonymizor in [
+        ('simple_string', SimpleStringAnonymizor()),
+        ('text', TextAnonymizor()),
+        ('choice', ChoiceAnonymizor(['M', 'F', None], weights=[0.3, 0.3, 0.4])),
+        ('alpha3', Alpha3Anonymizor())]:
+    _fn = partial(_anonymize, _anonymizor)
+    _fn.__name__ = 'anonymize_' + _name
+    benchmark(_fn)
+
+
+def _escape(escaper, data):
+    for row in data.input:
+        for v in row:
+            escaper(v)
+    return data.rows
+
+
+for _name, _escaper in [
+        ('sql', sql_escape), ('mysql_tsv', mysql_tsv_escape), ('pg_copy', pg_copy_escape)]:
+    _fn = partial(_escape, _escaper)
+    _fn.__name__ = 'escape_' + _name
+    benchmark(_fn)
+
+
+def _transform(args, data, **kwargs):
+    outdir = os.path.join(data.tmpdir, 'out')
+    os.mkdir(outdir)
+    argv = sys.argv
+    sys.argv = ['bench', '-q', '-i', data.filename, '-o', outdir] + args
+    try:
+        data.scan(Customer)  # a fresh manager
+        Transformer(models=[Customer], **kwargs).process()
+    finally:
+        sys.argv = argv
+        shutil.rmtree(outdir, ignore_errors=True)
+    return data.rows
+
+
+for _name, _args in [
+        ('collect', []),
+        ('stream', ['--stream']),
+        ('stream_unquoted', ['--stream', '--unquoted']),
+        ('workers', ['--stream', '--unquoted', '--workers', '4']),
+        ('gzip', ['--stream', '--compress', 'gzip'])]:
+    _fn = partial(_transform, _args)
+    _fn.__name__ = 'transform_' + _name
+    benchmark(_fn)
+
+
+def run(rows, repeat=3, select=None):
+    '''run the benchmarks, returns the results by name'''
+    tmpdir = tempfile.mkdtemp()
+    try:
+        data = Data(rows, tmpdir)
+        res = {}
+        for fn in BENCHMARKS:
+            if select and select not in fn.__name__:
+                continue
+            best = None
+            for _ in range(repeat):
+                gc.collect()
+                t = clock()
+                items = fn(data)
+                elapsed = clock() - t
+                if items is None:
+                    break
+                best = elapsed if best is None else min(best, elapsed)
+            if best is None:
+                print("%-28s skipped" % fn.__name__)
+                continue
+            res[fn.__name__] = {
+                'seconds': round(best, 6),
+                'items': items,
+                'items_per_second': round(items / best, 1),
+            }
+            print("%-28s %10.3fs %14.0f/s" % (fn.__name__, best, items / best))
+        return res
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def compare(results, baseline):
+    '''print the change of every benchmark relative to a baseline'''
+    print("\n%-28s %12s %12s %8s" % ("benchmark", "baseline", "current", "faster"))
+    for name, r in sorted(results.items()):
+        b = baseline.get(name)
+        if b is None:
+            continue
+        change = b['seconds'] / r['seconds'] - 1 if r['seconds'] else 0.0
+        print("%-28s %11.3fs %11.3fs %+7.1f%%" % (name, b['seconds'], r['seconds'], 100 * change))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='data-migrator benchmarks')
+    parser.add_argument('--rows', type=int, default=100000, help='rows of synthetic input')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, best is kept')
+    parser.add_argument('-k', dest='select', default=None, help='only run benchmarks with this in their name')
+    parser.add_argument('--output', default=None, help='save the results as JSON')
+    parser.add_argument('--compare', default=None, help='JSON results to compare with')
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat, args.select)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'version': __version__,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'date': datetime.datetime.now().isoformat(),
+                'rows': args.rows,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
+
+
+if __name__ == '__main__':
+    main()
@@ -40,5 +40,8 @@ setup(
         'boto3',
         "python-dateutil",
     ],
+    extras_require={
+        'parquet': ['pyarrow'],
+    },
     zip_safe=True,
 )
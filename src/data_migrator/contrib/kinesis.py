@@ -72,9 +72,11 @@ class KinesisTransformer(object):
     def _specific_args(self):
         self.parser.add_argument('-t', '--trial', action='store_true',
             help='trial run only, no actual upload to Kinesis')
-        self.parser.add_argument('--stream',
+        # --stream and --profile replace the flags of the Transformer
+        group = self.parser.add_argument_group('kinesis', conflict_handler='resolve')
+        group.add_argument('--stream',
             help='name of the stream')
-        self.parser.add_argument('--profile',
+        group.add_argument('--profile',
             help='name of the profile')
 
     def _interpret_cmdline(self):
@@ -114,6 +116,9 @@ class KinesisTransformer(object):
 
     def _open_input(self):
         self.in_headers = next(self.reader, [])
+        for m in self.models:
+            m.resolve_columns(self.in_headers)
+        self.max_pos = max([x._meta.max_pos for x in self.models])
         if len(self.in_headers) <= self.max_pos:
             raise DataException(
                 'Data in has %d columns, too little for max position %d',
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+'''
+synthetic input generated from model definitions, for benchmarks and tests
+
+The values of every input column are derived from the field reading it: its
+class and ``schema_type``, ``max_length``, ``nullable`` and ``unique``. The
+output is reproducible for a given seed.
+
+    >>> from data_migrator import models
+    >>> class Person(models.Model):
+    ...     id = models.IntField(pos=0, unique=True)
+    ...     name = models.StringField(pos=1, max_length=8, nullable=None)
+    >>> rows = synthetic_rows(Person, 3)
+    >>> next(rows)
+    ['id', 'name']
+    >>> [row[0] for row in rows]
+    ['1', '2', '3']
+'''
+
+import datetime
+import random
+import string
+import uuid
+
+from data_migrator.models.fields import BooleanField, DateTimeField, UUIDField
+from data_migrator.utils.files import open_file
+
+_CHARS = string.ascii_letters + string.digits + ' '
+_EPOCH = datetime.datetime(2010, 1, 1)
+_DIGITS = string.digits + string.ascii_lowercase
+
+
+def _base36(i):
+    s = ''
+    while True:
+        i, r = divmod(i, 36)
+        s = _DIGITS[r] + s
+        if not i:
+            return s
+
+
+def _string(rnd, n):
+    return ''.join([rnd.choice(_CHARS) for _ in range(n)]).strip() or 'x'
+
+
+def synthetic_value(field, i, rnd, null_fraction=0.05):
+    '''returns a synthetic input string for a field.
+
+    Args:
+        field: the field to generate a value for
+        i (int): number of the row, used to keep unique fields unique
+        rnd (random.Random): random generator
+        null_fraction (float): fraction of ``nullable`` values, for fields
+            that are not unique
+
+    Returns:
+        str: value as in the input
+    '''
+    if field.nullable is not None and not field.unique and rnd.random() < null_fraction:
+        return field.nullable
+    if isinstance(field, DateTimeField):
+        seconds = i * 60 if field.unique else rnd.randint(0, 10 * 365 * 86400)
+        d = _EPOCH + datetime.timedelta(seconds=seconds)
+        return d.strftime(field.input_format[0]) if field.input_format else d.isoformat(' ')
+    if isinstance(field, UUIDField):
+        return str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+    if isinstance(field, BooleanField) or field.schema_type == 'boolean':
+        return rnd.choice(['true', 'false', '1', '0', 'yes', 'no'])
+    if field.schema_type == 'integer':
+        return str(i if field.unique else rnd.randint(-2 ** 31, 2 ** 31 - 1))
+    if field.schema_type == 'object':
+        return '{"key": %d}' % rnd.randint(0, 1000)
+    if field.schema_type == 'array':
+        return '[%d, %d]' % (rnd.randint(0, 1000), rnd.randint(0, 1000))
+    n = rnd.randint(1, field.max_length) if field.max_length else rnd.randint(3, 20)
+    if field.unique:
+        suffix = _base36(i)
+        return (_string(rnd, n)[:max(0, n - len(suffix) - 1)] + '-' + suffix).lstrip('-')
+    return _string(rnd, n)
+
+
+def _columns(models):
+    # header and field per input column, the first field reading a column
+    positions, named = {}, []
+    for m in models:
+        for k, f in m._meta.fields.items():
+            if f.pos >= 0 and f.column is None:
+                positions.setdefault(f.pos, (k, f))
+            elif f.column is not None and f.column not in [x[0] for x in named]:
+                named.append((f.column, f))
+    n = max(list(positions) + [-1]) + 1
+    res = [positions.get(p, ('column%d' % p, None)) for p in range(n)]
+    return res + named
+
+
+def synthetic_rows(models, rows, seed=0, null_fraction=0.05, values=None, header=True):
+    '''generate synthetic input rows for one or more models.
+
+    Columns read by position are generated in order, columns read by name
+    (``column``) are added after these. Columns no field reads are filled
+    with random strings.
+
+    Args:
+        models: model or list of models reading the input
+        rows (int): number of rows to generate
+        seed: seed of the random generator
+        null_fraction (float): fraction of ``nullable`` values
+        values (dict): functions ``f(i, rnd)`` by column header, to generate
+            values for columns that are parsed or validated by the fields
+        header (boolean): generate the header first
+
+    Returns:
+        generator of lists of strings
+    '''
+    if not isinstance(models, (list, tuple)):
+        models = [models]
+    values = values or {}
+    columns = _columns(models)
+    rnd = random.Random(seed)
+    if header:
+        yield [c[0] for c in columns]
+    for i in range(1, rows + 1):
+        row = []
+        for name, f in columns:
+            if name in values:
+                row.append(values[name](i, rnd))
+            elif f is None:
+                row.append(_string(rnd, 8))
+            else:
+                row.append(synthetic_value(f, i, rnd, null_fraction))
+        yield row
+
+
+def write_tsv(models, filename, rows, **kwargs):
+    '''write synthetic input for models to a tab separated file.
+
+    The file is compressed if the name has the extension of a compression,
+    see :func:`~.open_file`. Arguments are as :func:`synthetic_rows`.
+
+    Returns:
+        int: bytes written, before compression
+    '''
+    size = 0
+    with open_file(filename, 'w', encoding='utf-8', newline='') as f:
+        for row in synthetic_rows(models, rows, **kwargs):
+            line = '\t'.join(row) + '\n'
+            f.write(line)
+            size += len(line.encode('utf-8'))
+    return size
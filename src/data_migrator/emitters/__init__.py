@@ -13,6 +13,10 @@ The following classes are defined in this module:
 
 * :class:`~.BaseEmitter`
 * :class:`~.MySQLEmitter`
+* :class:`~.MySQLLoadDataEmitter`
+* :class:`~.PostgresCopyEmitter`
+* :class:`~.ParquetEmitter`
+* :class:`~.DBAPIEmitter`, with :class:`~.DBAPILoader` to load directly
 * :class:`~.CSVEmitter`
 * :class:`~.JSONEmitter`
 * :class:`~.UpdateEmitter`
@@ -37,6 +41,10 @@ The basic structure for emitting is a combination between
 
 from .update import UpdateEmitter # noqa
 from .mysql import MySQLEmitter # noqa
+from .mysql_load import MySQLLoadDataEmitter # noqa
+from .postgres import PostgresCopyEmitter # noqa
+from .dbapi import DBAPIEmitter, DBAPILoader # noqa
+from .parquet import ParquetEmitter # noqa
 from .csv import CSVEmitter # noqa
 from .json_emit import JSONEmitter # noqa
 from .singer import SingerEmitter # noqa
@@ -10,11 +10,26 @@ class BaseEmitter(object):
             emitter to export objects from that manager
         model_class (Model): reference to the model linked to the class
         extension (str): file extension for output file of this emitter
+        stats_trailer (boolean): if ``True`` the manager statistics are
+            written in the postamble instead of the preamble, for example
+            when streaming and statistics are not known upfront.
+        binary (boolean): if ``True`` the emitter outputs ``bytes`` instead
+            of lines, written as is to a binary file.
+        resumable (boolean): if ``True`` a streamed output file can be
+            truncated to a checkpoint and appended to, see ``--resume``.
+        compressible (boolean): if ``True`` the output file can be
+            compressed, see ``--compress``.
+        encoding (str): encoding of the output file, set by the transformer
 
     note: :attr:`~.model_class` and :attr:`~.manager` are linked together
     '''
 
-    def __init__(self, extension=None, manager=None):
+    binary = False
+    resumable = True
+    compressible = True
+    encoding = 'utf-8'
+
+    def __init__(self, extension=None, manager=None, stats_trailer=False):
         # reference to the manager that is calling this emitter to
         # export objects from the manager
         self.manager = manager
@@ -22,6 +37,7 @@ class BaseEmitter(object):
         self.meta = self.model_class._meta
         self.extension = extension or getattr(self.__class__,
                 'extension', '.txt')
+        self.stats_trailer = stats_trailer
 
     def emit(self, l):
         '''output the result set of an object.
@@ -33,6 +49,22 @@ class BaseEmitter(object):
         '''
         raise NotImplementedError
 
+    def emit_many(self, objects):
+        '''output the result sets of many objects.
+
+        Override for emitters that output a chunk of objects faster than
+        object by object.
+
+        Args:
+            objects (list): objects to transform
+        Returns:
+            list: generated strings
+        '''
+        res = []
+        for l in objects:
+            res += self.emit(l)
+        return res
+
     def filename(self):
         '''generate filename for this emitter.
 
@@ -59,6 +91,36 @@ class BaseEmitter(object):
         '''
         raise NotImplementedError
 
+    def control_files(self, headers):  #pylint disable=no-self-use
+        '''generate additional files that go with the emitted file, for
+        example a control file to load the data. Called after all objects
+        are emitted.
+
+        Args:
+            headers (list): additional header to provide outside the emitter
+        Returns:
+            dict: filename as key, list of lines as value
+        '''
+        return {}
+
+    def stats(self):
+        '''generate the statistics line of the manager.
+
+        Returns:
+            str: statistics of the linked manager
+        '''
+        return 'stats: %s' % ",".join(
+            ["%s=%s" % (k, v) for k, v in self.manager.stats().items()])
+
+    def flush(self):  #pylint disable=no-self-use
+        '''output objects that are pending in the emitter, for emitters
+        that combine objects.
+
+        Returns:
+            list: generated strings
+        '''
+        return []
+
     def postamble(self):  #pylint disable=no-self-use
         '''generate a postamble for the file to emit.
 
@@ -1,47 +1,105 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+from __future__ import absolute_import
+
+import csv
+import json
+
+import six
+
 from data_migrator.emitters.base import BaseEmitter
 from data_migrator.models.fields import HiddenField
+from data_migrator.models.codegen import compile_emit
 from data_migrator.utils import default_logger, sql_escape
 
 log = default_logger()
 
 
+def _csv_value(v):
+    if isinstance(v, dict) or isinstance(v, list):
+        return json.dumps(v)
+    return v
+
+
 class CSVEmitter(BaseEmitter):
     '''CSV emitter to output delimited data
 
+    By default values are SQL escaped and separated by a comma and a space.
+    Set ``dialect`` or ``delimiter`` to write standard CSV with
+    :func:`csv.writer`, NULL is written as an empty field and remarks are
+    left out:
+
+    .. code-block:: python
+
+      e = CSVEmitter(manager=Model.objects, dialect='excel-tab')
+
     Attributes:
         base_template: base template to output the object
         extension (str): file extension for output file of this emitter.
             Defaults to .csv
+        dialect: name or class of the :mod:`csv` dialect
+        delimiter (str): field delimiter, overrides the dialect
     '''
     extension = '.csv'
     base_template = '''%s'''
+    dialect = None
+    delimiter = None
 
     def __init__(self, *args, **kwargs):
+        self.dialect = kwargs.pop('dialect', self.dialect)
+        self.delimiter = kwargs.pop('delimiter', self.delimiter)
         super(CSVEmitter, self).__init__(*args, **kwargs)
         self._prepare()
 
     def emit(self, l):
         '''Output the result set of an object as CSV string'''
+        if self._writer:
+            return self.emit_many([l])
         res = []
         if hasattr(l, self.meta.remark):
             res.append("# %s" % getattr(l, self.meta.remark))
-        res.append(self._template % l.emit(escaper=sql_escape))
+        res.append(self._template % self._values(l))
         return res
 
+    def emit_many(self, objects):
+        '''Output the result set of many objects, in CSV mode as one block'''
+        if not self._writer:
+            return super(CSVEmitter, self).emit_many(objects)
+        self._writer.writerows([self._values(l) for l in objects])
+        return self._drain()
+
     def preamble(self, headers=None):
         # before we spit out the data
         r = [self._headers]
         return r
 
+    def _drain(self):
+        # written records, without the last line end added by the transformer
+        res = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return [res[:-1]] if res else []
+
     def _prepare(self):
         # generate the base query template
-        c = [f.name for k, f in self.meta.fields.items()
+        keys = [k for k, f in self.meta.fields.items()
             if not isinstance(f, HiddenField)]
-        headers = ", ".join(c)
-        replacements = ", ".join(["%(" + x + ")s" for x in c])
+        self._writer = None
+        if self.dialect is not None or self.delimiter is not None:
+            self._values = compile_emit(self.meta, keys, _csv_value)
+            # csv writes str on python 2, io.StringIO takes unicode only
+            self._buffer = six.StringIO()
+            params = {'lineterminator': '\n'}
+            if self.delimiter is not None:
+                params['delimiter'] = self.delimiter
+            self._writer = csv.writer(self._buffer, self.dialect or 'excel', **params)
+            self._writer.writerow(self._values.names)
+            self._headers = self._drain()[0]
+            return
+        self._values = compile_emit(self.meta, keys, sql_escape)
+        headers = ", ".join(self._values.names)
+        replacements = ", ".join(["%s"] * len(keys))
         template = self.base_template % (replacements)
         log.debug('emit template: %s', template)
         self._template = template
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Load models directly in a database with a DB-API 2 connection.
+
+Instead of writing files to replay later, the :class:`DBAPILoader` inserts
+the objects with ``executemany`` in chunks, each chunk is committed as one
+transaction. Models are loaded in order, models marked ``independent`` (see
+:class:`~.Options`) are loaded concurrently with a small pool of connections.
+
+.. code-block:: python
+
+  loader = DBAPILoader(partial(MySQLdb.connect, db='test'),
+                       paramstyle='format', quote='`')
+  Transformer(models=[Model], loader=loader).process()
+"""
+
+import json
+import time
+import threading
+
+from six.moves import queue
+
+from data_migrator.emitters.base import BaseEmitter
+from data_migrator.models.fields import HiddenField
+from data_migrator.models.codegen import compile_emit
+from data_migrator.exceptions import DefinitionException
+from data_migrator.utils import default_logger
+
+log = default_logger()
+
+_PARAMSTYLES = {
+    'qmark': lambda i, k: '?',
+    'numeric': lambda i, k: ':%d' % (i + 1),
+    'named': lambda i, k: ':%s' % k,
+    'format': lambda i, k: '%s',
+    'pyformat': lambda i, k: '%%(%s)s' % k,
+}
+
+
+def _error(conn):
+    # DB-API error class of the driver, an optional extension of connections
+    return getattr(conn, 'Error', Exception)
+
+
+def _param(v):
+    if isinstance(v, dict) or isinstance(v, list):
+        return json.dumps(v)
+    return v
+
+
+class DBAPIEmitter(BaseEmitter):
+    '''DB-API emitter to output parameters for ``executemany``
+
+    Attributes:
+        statement (str): parameterized insert statement
+        paramstyle (str): DB-API paramstyle of the driver, one of qmark,
+            numeric, named, format and pyformat. Defaults to qmark
+        quote (str): quote character for identifiers, use a backtick for MySQL.
+            Defaults to ``"``
+    '''
+    base_template = '''INSERT INTO %s (%s) VALUES (%s)'''
+
+    def __init__(self, *args, **kwargs):
+        self.paramstyle = kwargs.pop('paramstyle', 'qmark')
+        self.quote = kwargs.pop('quote', '"')
+        if self.paramstyle not in _PARAMSTYLES:
+            raise DefinitionException('unknown paramstyle %s' % self.paramstyle)
+        super(DBAPIEmitter, self).__init__(*args, **kwargs)
+        self._prepare()
+
+    def emit(self, l):
+        '''Output the result set of an object as parameters'''
+        values = self._values(l)
+        if self.paramstyle in ('named', 'pyformat'):
+            return [dict(zip(self._keys, values))]
+        return [values]
+
+    def preamble(self, headers):
+        return []
+
+    def prefix(self):
+        '''statements to run before loading: ``Meta.prefix`` or cleaning the
+        table'''
+        if isinstance(self.meta.prefix, list):
+            return list(self.meta.prefix)
+        return ["DELETE FROM %s" % self._quote(self.meta.table_name)]  #nosec
+
+    def _quote(self, name):
+        return self.quote + name.replace(self.quote, self.quote * 2) + self.quote
+
+    def _prepare(self):
+        keys = [k for k, f in self.meta.fields.items() if not isinstance(f, HiddenField)]
+        self._values = compile_emit(self.meta, keys, _param)
+        self._keys = keys
+        _marker = _PARAMSTYLES[self.paramstyle]
+        self.statement = self.base_template % (
+            self._quote(self.meta.table_name),
+            ", ".join([self._quote(x) for x in self._values.names]),
+            ", ".join([_marker(i, k) for i, k in enumerate(keys)]),
+        )
+        log.debug('emit statement: %s', self.statement)
+
+
+class ConnectionPool(object):
+    '''thread safe pool of at most ``size`` DB-API connections
+
+    Args:
+        connect: function returning a new connection
+        size (int): maximum number of connections
+    '''
+
+    def __init__(self, connect, size=4):
+        self.connect = connect
+        self.size = size
+        self._idle = queue.Queue()
+        self._slots = threading.Semaphore(size)
+
+    def get(self):
+        '''get a connection, waits until one is available'''
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self.connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def put(self, conn):
+        '''return a connection to the pool'''
+        self._idle.put(conn)
+        self._slots.release()
+
+    def discard(self, conn):
+        '''close a broken connection, a new one is made when needed'''
+        try:
+            conn.close()
+        except _error(conn) as err:
+            log.debug('closing broken connection failed: %s', err)
+        self._slots.release()
+
+    def close(self):
+        '''close all idle connections'''
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class _Session(object):
+    # loads the objects of one model, in chunks
+    def __init__(self, loader, model):
+        self.loader = loader
+        self.emitter = loader.emitter(
+            manager=model.objects, paramstyle=loader.paramstyle,
+            quote=loader.quote)
+        self.pending = self.emitter.prefix()
+        self.batch = []
+        self.rows = 0
+
+    def load(self, objects):
+        n = 0
+        for o in objects:
+            self.batch += self.emitter.emit(o)
+            n += 1
+            if len(self.batch) >= self.loader.chunk_size:
+                self.flush()
+        return n
+
+    def flush(self):
+        if not self.batch and not self.pending:
+            return
+        self.loader.execute(self.pending, self.emitter.statement, self.batch)
+        self.rows += len(self.batch)
+        self.batch, self.pending = [], []
+
+    def close(self):
+        self.flush()
+
+
+class DBAPILoader(object):
+    '''loads models with a DB-API 2 connection factory
+
+    The table is cleaned first, see :meth:`DBAPIEmitter.prefix`, in the same
+    transaction as the first chunk. Every chunk is committed, a failing
+    chunk is rolled back and retried on a new connection.
+
+    Args:
+        connect: function returning a new DB-API connection, for example
+            ``partial(sqlite3.connect, 'my.db', check_same_thread=False)``
+        paramstyle (str): DB-API paramstyle of the driver
+        quote (str): quote character for identifiers
+        chunk_size (int): rows per ``executemany`` and transaction
+        pool_size (int): maximum connections, independent models are loaded
+            concurrently with as many threads
+        retries (int): number of retries for a failing chunk
+        retry_wait (float): seconds to wait before the first retry, doubled
+            for every next retry
+        emitter: emitter class to generate the statement and parameters
+    '''
+
+    def __init__(self, connect, paramstyle='qmark', quote='"',
+                 chunk_size=10000, pool_size=4, retries=3, retry_wait=1.0,
+                 emitter=DBAPIEmitter):
+        self.pool = ConnectionPool(connect, pool_size)
+        self.paramstyle = paramstyle
+        self.quote = quote
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.retry_wait = retry_wait
+        self.emitter = emitter
+
+    def open(self, model):
+        '''start loading a model
+
+        Returns:
+            session with ``load(objects)`` and ``close()``
+        '''
+        return _Session(self, model)
+
+    def execute(self, statements, statement, params):
+        '''run statements and ``executemany`` in one transaction, with
+        retries'''
+        for attempt in range(self.retries + 1):
+            conn = self.pool.get()
+            try:
+                cursor = conn.cursor()
+                for s in statements:
+                    cursor.execute(s)
+                if params:
+                    cursor.executemany(statement, params)
+                conn.commit()
+            except Exception as err:  #pylint: disable=W0703
+                try:
+                    conn.rollback()
+                except _error(conn) as rollback_err:
+                    log.warning('rollback failed: %s', rollback_err)
+                self.pool.discard(conn)
+                if attempt == self.retries:
+                    raise
+                log.warning('load failed, retry %d of %d: %s',
+                            attempt + 1, self.retries, err)
+                time.sleep(self.retry_wait * 2 ** attempt)
+            else:
+                self.pool.put(conn)
+                return
+
+    def map(self, fn, items):
+        '''call ``fn`` for every item in up to ``pool_size`` threads, the
+        first error is raised again'''
+        todo = queue.Queue()
+        for x in items:
+            todo.put(x)
+        errors = []
+
+        def _run():
+            while not errors:
+                try:
+                    x = todo.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    fn(x)
+                except Exception as err:  #pylint: disable=W0703
+                    errors.append(err)
+
+        threads = [threading.Thread(target=_run)
+                   for _ in range(min(self.pool.size, todo.qsize()))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.pool.close()
+        if errors:
+            raise errors[0]
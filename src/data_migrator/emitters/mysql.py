@@ -3,6 +3,7 @@
 
 from data_migrator.emitters.base import BaseEmitter
 from data_migrator.models.fields import HiddenField
+from data_migrator.models.codegen import compile_emit
 from data_migrator.utils import sql_escape, default_logger
 
 log = default_logger()
@@ -11,24 +12,77 @@ log = default_logger()
 class MySQLEmitter(BaseEmitter):
     '''MySQL emitter to output MySQL specific insert statements
 
+    Objects are grouped in extended inserts of :attr:`batch_size` rows,
+    statements are closed earlier if they would exceed
+    :attr:`max_statement_bytes`. Remarks are written as comments just before
+    the statement containing the object.
+
     Attributes:
         base_template: base template to output the object
         extension (str): file extension for output file of this emitter.
             Defaults to .sql
+        batch_size (int): number of rows per INSERT statement, taken from
+            the ``batch_size`` argument or :attr:`~.Options.batch_size`.
+            Defaults to 1
+        max_statement_bytes (int): maximum size of a batched statement, keep
+            this below ``max_allowed_packet`` of the server. Defaults to 1MB
     '''
     base_template = '''INSERT %sINTO `%s` (%s) VALUES (%s);'''
     extension = '.sql'
+    batch_size = 1
+    max_statement_bytes = 1024 * 1024
 
     def __init__(self, *args, **kwargs):
+        batch_size = kwargs.pop('batch_size', None)
+        max_statement_bytes = kwargs.pop('max_statement_bytes', None)
         super(MySQLEmitter, self).__init__(*args, **kwargs)
+        self.batch_size = batch_size or self.meta.batch_size or self.batch_size
+        self.max_statement_bytes = max_statement_bytes or self.max_statement_bytes
+        self._batch = []
         self._prepare()
 
     def emit(self, l):
         '''Output the result set of an object as MYSQL insert statement'''
         res = []
+        if self.batch_size <= 1:
+            if hasattr(l, self.meta.remark):
+                res.append("# %s" % getattr(l, self.meta.remark))
+            res.append(self._template % self._values(l))
+            return res
+        row = self._row % self._values(l)
+        # python 2 rows of str values are encoded already
+        size = len(row if isinstance(row, bytes) else row.encode('utf-8')) + 2
+        if self._batch and self._batch_bytes + size > self.max_statement_bytes:
+            res += self.flush()
         if hasattr(l, self.meta.remark):
             res.append("# %s" % getattr(l, self.meta.remark))
-        res.append(self._template % l.emit(escaper=sql_escape))
+        self._batch.append(row)
+        self._batch_bytes += size
+        if len(self._batch) >= self.batch_size:
+            res += self.flush()
+        return res
+
+    def emit_many(self, objects):
+        '''Output the result set of many objects'''
+        if self.batch_size > 1:
+            return super(MySQLEmitter, self).emit_many(objects)
+        template, values, remark = self._template, self._values, self.meta.remark
+        res = []
+        for l in objects:
+            if hasattr(l, remark):
+                res.append("# %s" % getattr(l, remark))
+            res.append(template % values(l))
+        return res
+
+    def flush(self):
+        '''Output the pending rows as one extended insert statement'''
+        if not self._batch:
+            return []
+        res = [self._insert]
+        res += [x + "," for x in self._batch[:-1]]
+        res.append(self._batch[-1] + ";")
+        self._batch = []
+        self._batch_bytes = len(self._insert) + 1
         return res
 
     def preamble(self, headers):
@@ -38,28 +92,46 @@ class MySQLEmitter(BaseEmitter):
         h1 = [
             "transformation for %s to table %s" % (_meta.model_name, _meta.table_name),
             "input headers: %s" % ",".join(headers),
-            'stats: %s' % ",".join(["%s=%d" % (k, v) for k, v in self.manager.stats().items()]),
         ]
+        if not self.stats_trailer:
+            h1.append(self.stats())
         r = []
         r += ['# %s' % l for l in h1]
         r += [""]
-        if isinstance(_meta.prefix, list):
-            r += ["%s" % l for l in _meta.prefix]
-        else:
-            r += [
-                "SET SQL_SAFE_UPDATES = 0; -- you need this to delete without WHERE clause",
-                "DELETE FROM `%s`;" % _meta.table_name,   #nosec
-                "ALTER TABLE `%s` AUTO_INCREMENT = 1;" % _meta.table_name,
-            ]
+        r += self._prefix()
         r += [""]
         return r
 
+    def _prefix(self):
+        # statements to prepare the table: Meta.prefix or clean the table
+        _meta = self.meta
+        if isinstance(_meta.prefix, list):
+            return ["%s" % l for l in _meta.prefix]
+        return [
+            "SET SQL_SAFE_UPDATES = 0; -- you need this to delete without WHERE clause",
+            "DELETE FROM `%s`;" % _meta.table_name,   #nosec
+            "ALTER TABLE `%s` AUTO_INCREMENT = 1;" % _meta.table_name,
+        ]
+
+    def postamble(self):
+        '''flush the pending rows, add the statistics as trailer if not in
+        the preamble'''
+        res = self.flush()
+        if self.stats_trailer:
+            res += ["", "# %s" % self.stats()]
+        return res
+
     def _prepare(self):
         # generate the base query template
-        c = [f.name for k, f in self.meta.fields.items() if not isinstance(f, HiddenField)]
-        columns = ", ".join(["`" + x + "`" for x in c])
-        replacements = ", ".join(["%(" + x + ")s" for x in c])
+        keys = [k for k, f in self.meta.fields.items() if not isinstance(f, HiddenField)]
+        self._values = compile_emit(self.meta, keys, sql_escape)
+        columns = ", ".join(["`" + x + "`" for x in self._values.names])
+        replacements = ", ".join(["%s"] * len(keys))
         _ignore = 'IGNORE ' if self.meta.drop_non_unique else ''
         template = self.base_template % (_ignore, self.meta.table_name, columns, replacements)
         log.debug('emit template: %s', template)
         self._template = template
+        # templates for extended inserts
+        self._insert = template[:template.index(" VALUES (") + len(" VALUES")]
+        self._row = "(%s)" % replacements
+        self._batch_bytes = len(self._insert) + 1
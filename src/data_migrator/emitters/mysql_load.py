@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import os
+import codecs
+
+from data_migrator.exceptions import DefinitionException
+from data_migrator.emitters.mysql import MySQLEmitter
+from data_migrator.models.fields import HiddenField
+from data_migrator.models.codegen import compile_emit
+from data_migrator.utils import mysql_tsv_escape, default_logger
+
+log = default_logger()
+
+# MySQL character sets of python codecs, by normalised codec name
+CHARSETS = {
+    'utf-8': 'utf8mb4',
+    'ascii': 'ascii',
+    'iso8859-1': 'latin1',
+    'cp1252': 'latin1',
+    'iso8859-2': 'latin2',
+    'iso8859-7': 'greek',
+    'iso8859-8': 'hebrew',
+    'iso8859-9': 'latin5',
+    'iso8859-13': 'latin7',
+    'cp1250': 'cp1250',
+    'cp1251': 'cp1251',
+    'cp1256': 'cp1256',
+    'cp1257': 'cp1257',
+    'koi8-r': 'koi8r',
+    'koi8-u': 'koi8u',
+    'gbk': 'gbk',
+    'gb2312': 'gb2312',
+    'big5': 'big5',
+    'euc_jp': 'ujis',
+    'shift_jis': 'sjis',
+    'cp932': 'cp932',
+    'euc_kr': 'euckr',
+    'utf-16-be': 'utf16',
+    'utf-32-be': 'utf32',
+}
+
+
+class MySQLLoadDataEmitter(MySQLEmitter):
+    '''MySQL emitter to output a data file for ``LOAD DATA INFILE``
+
+    The emitted file is a tab separated data file in the default format of
+    ``LOAD DATA``. A control file (same name, extension ``.sql``) is written
+    next to it with the table preparation of the :class:`~.MySQLEmitter`
+    (``Meta.prefix`` or cleaning the table) and the ``LOAD DATA LOCAL INFILE``
+    statement. Run the control file with the mysql client from the output
+    directory, ``local_infile`` should be enabled on client and server:
+
+    .. code-block:: bash
+
+      cd outdir; mysql --local-infile=1 my_db < table.sql
+
+    Remarks can not be written in the data file and are ignored. The data file
+    can not be compressed, ``LOAD DATA`` reads plain files only. Fields with a
+    ``replacement`` can not be emitted, their SQL can not be loaded.
+
+    Attributes:
+        extension (str): file extension for output file of this emitter.
+            Defaults to .tsv
+        charset (str): MySQL character set of the data file. Defaults to the
+            character set of the output encoding, see :data:`CHARSETS`
+    '''
+    extension = '.tsv'
+    charset = None
+    compressible = False
+    load_template = (
+        "LOAD DATA LOCAL INFILE '%s' %sINTO TABLE `%s` CHARACTER SET %s "
+        "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+        "LINES TERMINATED BY '\\n' (%s);"
+    )
+
+    def emit(self, l):
+        '''Output the result set of an object as tab separated line'''
+        return ["\t".join(self._values(l))]
+
+    def emit_many(self, objects):
+        '''Output the result set of many objects'''
+        values = self._values
+        return ["\t".join(values(l)) for l in objects]
+
+    def flush(self):
+        return []
+
+    def preamble(self, headers):
+        '''the data file has no preamble, see :meth:`control_files`'''
+        return []
+
+    def postamble(self):
+        return []
+
+    def control_file(self):
+        '''generate filename for the control file'''
+        root, ext = os.path.splitext(self.filename())
+        return root + ('.load.sql' if ext == '.sql' else '.sql')
+
+    def control_files(self, headers):
+        '''generate the control file to load the data file'''
+        _meta = self.meta
+        h1 = [
+            "transformation for %s to table %s" % (_meta.model_name, _meta.table_name),
+            "input headers: %s" % ",".join(headers),
+            self.stats(),
+        ]
+        r = []
+        r += ['# %s' % l for l in h1]
+        r += [""]
+        r += self._prefix()
+        r += [""]
+        _ignore = 'IGNORE ' if _meta.drop_non_unique else ''
+        _file = os.path.basename(self.filename()).replace("'", "\\'")
+        r.append(self.load_template % (_file, _ignore, _meta.table_name,
+                                       self._charset(), self._columns))
+        return {self.control_file(): r}
+
+    def _charset(self):
+        if self.charset:
+            return self.charset
+        try:
+            return CHARSETS[codecs.lookup(self.encoding).name]
+        except (LookupError, KeyError):
+            raise DefinitionException(
+                '%s: no MySQL character set known for encoding %s, set charset' %
+                (self.meta.model_name, self.encoding))
+
+    def _prepare(self):
+        keys = [k for k, f in self.meta.fields.items() if not isinstance(f, HiddenField)]
+        for k in keys:
+            if self.meta.fields[k].replace:
+                raise DefinitionException(
+                    '%s: field %s has a replacement, LOAD DATA can not load it' %
+                    (self.meta.model_name, k))
+        self._values = compile_emit(self.meta, keys, mysql_tsv_escape)
+        self._columns = ", ".join(["`" + x + "`" for x in self._values.names])
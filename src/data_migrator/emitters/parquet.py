@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import json
+
+from data_migrator.emitters.base import BaseEmitter
+from data_migrator.models.fields import HiddenField, IntField, NullIntField
+from data_migrator.models.fields import BooleanField, DateTimeField
+from data_migrator.exceptions import DefinitionException
+from data_migrator.utils import default_logger
+
+log = default_logger()
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise DefinitionException(
+            'ParquetEmitter needs pyarrow, install data-migrator[parquet]')
+    return pyarrow
+
+
+class _Sink(object):
+    # write only file collecting the written bytes until drained, keeps the
+    # position for the offsets in the parquet metadata
+    def __init__(self):
+        self.chunks = []
+        self.pos = 0
+        self.closed = False
+
+    def write(self, b):
+        b = bytes(b)
+        self.chunks.append(b)
+        self.pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        res, self.chunks = b''.join(self.chunks), []
+        return res
+
+
+def _json(v):
+    if isinstance(v, dict) or isinstance(v, list):
+        return json.dumps(v)
+    return v
+
+
+class ParquetEmitter(BaseEmitter):
+    '''Parquet emitter to output a columnar Apache Parquet file
+
+    Field types map to Arrow types like :meth:`~.BaseField.json_schema`:
+    integer fields to ``int64``, boolean fields to ``bool``, datetime fields
+    to ``timestamp[us]`` and other fields to ``string``. Objects and lists are
+    written as JSON strings. Objects are collected per row group, every full
+    row group is written directly. Needs ``pyarrow``.
+
+    Remarks are not written.
+
+    Attributes:
+        extension (str): file extension for output file of this emitter.
+            Defaults to .parquet
+        row_group_size (int): objects per row group, taken from the
+            ``row_group_size`` argument or :attr:`~.Options.batch_size`.
+            Defaults to 65536
+        compression (str): parquet compression codec, e.g. snappy, gzip,
+            zstd or none. Defaults to snappy
+    '''
+    extension = '.parquet'
+    binary = True
+    resumable = False
+    row_group_size = 65536
+    compression = 'snappy'
+
+    def __init__(self, *args, **kwargs):
+        row_group_size = kwargs.pop('row_group_size', None)
+        self.compression = kwargs.pop('compression', self.compression)
+        super(ParquetEmitter, self).__init__(*args, **kwargs)
+        self.row_group_size = row_group_size or self.meta.batch_size or \
+            self.row_group_size
+        self._pa = _pyarrow()
+        self._prepare()
+
+    def emit(self, l):
+        '''Collect the object, output a row group when full'''
+        for (k, f, raw), c in zip(self._fields, self._columns):
+            v = getattr(l, k)
+            if raw:
+                c.append(f.default if v is None else v)
+            else:
+                c.append(_json(f.emit(v)))
+        self._size += 1
+        if self._size >= self.row_group_size:
+            return self.flush()
+        return []
+
+    def flush(self):
+        '''Output the collected objects as row group'''
+        if self._size:
+            pa = self._pa
+            table = pa.Table.from_arrays(
+                [pa.array(c, type=t) for c, t in zip(self._columns, self.schema.types)],
+                schema=self.schema)
+            self._writer.write_table(table)
+            self._columns = [[] for _ in self._fields]
+            self._size = 0
+        return [self._sink.drain()]
+
+    def preamble(self, headers):
+        return [self._sink.drain()]
+
+    def postamble(self):
+        '''Output the last row group and the parquet footer'''
+        res = self.flush()
+        self._writer.close()
+        return res + [self._sink.drain()]
+
+    def _prepare(self):
+        pa = self._pa
+        keys = [k for k, f in self.meta.fields.items() if not isinstance(f, HiddenField)]
+        self._fields = []
+        schema = []
+        for k in keys:
+            f = self.meta.fields[k]
+            t = self._type(f)
+            # datetimes are written from the value, not the formatted string
+            raw = isinstance(f, DateTimeField) and \
+                not (f.anonymize or f.replace or f.validate_output)
+            if isinstance(f, DateTimeField) and not raw:
+                t = pa.string()
+            self._fields.append((k, f, raw))
+            schema.append(pa.field(f.name, t))
+        self.schema = pa.schema(schema)
+        self._columns = [[] for _ in self._fields]
+        self._size = 0
+        self._sink = _Sink()
+        self._writer = pa.parquet.ParquetWriter(
+            pa.PythonFile(self._sink, mode='w'), self.schema,
+            compression=self.compression)
+
+    def _type(self, f):
+        pa = self._pa
+        if isinstance(f, (IntField, NullIntField)):
+            return pa.int64()
+        elif isinstance(f, BooleanField):
+            return pa.bool_()
+        elif isinstance(f, DateTimeField):
+            return pa.timestamp('us')
+        elif f.schema_type == 'number':
+            return pa.float64()
+        return pa.string()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import datetime
+import json
+import os
+import struct
+
+from data_migrator.emitters.base import BaseEmitter
+from data_migrator.models.fields import HiddenField, IntField, NullIntField
+from data_migrator.models.fields import BooleanField, DateTimeField
+from data_migrator.models.codegen import compile_emit
+from data_migrator.exceptions import DefinitionException, ValidationException
+from data_migrator.utils import pg_copy_escape, default_logger, isstr
+
+log = default_logger()
+
+_PG_EPOCH = datetime.datetime(2000, 1, 1)
+_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_NULL = struct.pack('>i', -1)
+
+
+def _text(v):
+    if isinstance(v, dict) or isinstance(v, list):
+        v = json.dumps(v)
+    elif not isstr(v):
+        v = '%s' % v
+    return v.encode('utf-8')
+
+
+def _timestamp(v):
+    if not isinstance(v, datetime.datetime):
+        raise ValidationException("not a datetime: %r" % v)
+    if v.tzinfo is not None:
+        v = v.replace(tzinfo=None) - v.utcoffset()
+    d = v - _PG_EPOCH
+    return struct.pack('>q', (d.days * 86400 + d.seconds) * 1000000 + d.microseconds)
+
+
+def _pack(fmt):
+    return lambda v: struct.pack(fmt, v)
+
+
+# encoders of the binary COPY format, by postgres type
+_ENCODERS = {
+    'int2': _pack('>h'),
+    'int4': _pack('>i'),
+    'int8': _pack('>q'),
+    'float4': _pack('>f'),
+    'float8': _pack('>d'),
+    'bool': _pack('?'),
+    'timestamp': _timestamp,
+    'timestamptz': _timestamp,
+    'text': _text,
+    'varchar': _text,
+    'json': _text,
+    'jsonb': lambda v: b'\x01' + _text(v),
+    'bytea': bytes,
+}
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+class PostgresCopyEmitter(BaseEmitter):
+    '''PostgreSQL emitter to output ``COPY`` data
+
+    In text mode the output is a SQL script for ``psql`` with the table
+    preparation (``Meta.prefix`` or ``TRUNCATE``) followed by
+    ``COPY table (columns) FROM STDIN`` and the data.
+
+    In binary mode the output is a data file in the binary ``COPY`` format,
+    with a control file (extension ``.sql``) holding the table preparation and
+    a ``\\copy`` command to load it. The binary format needs the exact column
+    types, by default integer fields are ``int8``, boolean fields ``bool``,
+    datetime fields ``timestamp`` and other fields ``text``. Override them
+    with ``types``:
+
+    .. code-block:: python
+
+      e = PostgresCopyEmitter(manager=Model.objects, binary=True,
+                              types={'id': 'int4'})
+
+    Remarks can not be written in the data and are ignored.
+
+    Attributes:
+        extension (str): file extension for output file of this emitter.
+            Defaults to .sql, or .pgcopy in binary mode
+        binary (boolean): emit the binary ``COPY`` format, output is
+            ``bytes``
+        types (map): postgres type per field for binary mode, one of int2,
+            int4, int8, float4, float8, bool, timestamp, timestamptz, text,
+            varchar, json, jsonb and bytea
+    '''
+    extension = '.sql'
+    binary = False
+
+    def __init__(self, *args, **kwargs):
+        self.binary = kwargs.pop('binary', self.binary)
+        types = kwargs.pop('types', None) or {}
+        if self.binary and 'extension' not in kwargs:
+            kwargs['extension'] = '.pgcopy'
+        super(PostgresCopyEmitter, self).__init__(*args, **kwargs)
+        self._prepare(types)
+
+    def emit(self, l):
+        '''Output the result set of an object as COPY data'''
+        if self.binary:
+            return [self._binary_row(l)]
+        return ["\t".join(self._values(l))]
+
+    def _binary_row(self, o):
+        res = [self._count]
+        for k, f, encode, raw in self._fields:
+            v = getattr(o, k)
+            if raw:
+                v = f.default if v is None else v
+            else:
+                v = f.emit(v)
+            if v is None:
+                res.append(_NULL)
+            else:
+                v = encode(v)
+                res.append(struct.pack('>i', len(v)))
+                res.append(v)
+        return b''.join(res)
+
+    def preamble(self, headers):
+        '''generate the script header, or the binary file header'''
+        if self.binary:
+            return [_BINARY_HEADER]
+        r = self._header(headers, stats=not self.stats_trailer)
+        r += ["COPY %s (%s) FROM STDIN;" % (_quote(self.meta.table_name), self._columns)]
+        return r
+
+    def postamble(self):
+        '''end the COPY data, add the statistics as trailer if not in the
+        preamble'''
+        if self.binary:
+            return [struct.pack('>h', -1)]
+        res = ["\\."]
+        if self.stats_trailer:
+            res += ["", "-- %s" % self.stats()]
+        return res
+
+    def control_files(self, headers):
+        '''generate the control file to load the binary data file'''
+        if not self.binary:
+            return {}
+        r = self._header(headers, stats=True)
+        _file = os.path.basename(self.filename()).replace("'", "''")
+        r.append("\\copy %s (%s) FROM '%s' WITH (FORMAT binary)" % (
+            _quote(self.meta.table_name), self._columns, _file))
+        root = os.path.splitext(self.filename())[0]
+        return {root + '.sql': r}
+
+    def _header(self, headers, stats):
+        _meta = self.meta
+        h1 = [
+            "transformation for %s to table %s" % (_meta.model_name, _meta.table_name),
+            "input headers: %s" % ",".join(headers),
+        ]
+        if stats:
+            h1.append(self.stats())
+        r = []
+        r += ['-- %s' % l for l in h1]
+        r += [""]
+        if isinstance(_meta.prefix, list):
+            r += ["%s" % l for l in _meta.prefix]
+        else:
+            r += ["TRUNCATE %s;" % _quote(_meta.table_name)]
+        r += [""]
+        return r
+
+    def _prepare(self, types):
+        keys = [k for k, f in self.meta.fields.items() if not isinstance(f, HiddenField)]
+        self._values = compile_emit(self.meta, keys, pg_copy_escape)
+        self._columns = ", ".join([_quote(x) for x in self._values.names])
+        self._count = struct.pack('>h', len(keys))
+        self._fields = []
+        for k in keys:
+            f = self.meta.fields[k]
+            t = types.get(k) or self._type(f)
+            if t not in _ENCODERS:
+                raise DefinitionException('%s: no binary COPY support for type %s' % (k, t))
+            # datetimes are encoded from the value, not the formatted string
+            raw = t in ('timestamp', 'timestamptz') and isinstance(f, DateTimeField) \
+                and not (f.anonymize or f.replace or f.validate_output)
+            self._fields.append((k, f, _ENCODERS[t], raw))
+
+    def _type(self, f):  # pylint: disable=no-self-use
+        if isinstance(f, (IntField, NullIntField)):
+            return 'int8'
+        elif isinstance(f, BooleanField):
+            return 'bool'
+        elif isinstance(f, DateTimeField):
+            return 'timestamp'
+        return 'text'
@@ -3,6 +3,7 @@
 
 from data_migrator.emitters.base import BaseEmitter
 from data_migrator.models.fields import HiddenField
+from data_migrator.models.codegen import compile_emit
 from data_migrator.exceptions import DefinitionException
 from data_migrator.utils import sql_escape, default_logger
 
@@ -31,7 +32,7 @@ class UpdateEmitter(BaseEmitter):
         res = []
         if hasattr(l, self.meta.remark):
             res.append("# %s" % getattr(l, self.meta.remark))
-        res.append(self._template % l.emit(escaper=sql_escape))
+        res.append(self._template % self._values(l))
         return res
 
     def preamble(self, headers):
@@ -41,8 +42,9 @@ class UpdateEmitter(BaseEmitter):
         h1 = [
             "transformation for %s to table %s" % (_meta.model_name, _meta.table_name),
             "input headers: %s" % ",".join(headers),
-            'stats: %s' % ",".join(["%s=%d" % (k, v) for k, v in self.manager.stats().items()]),
         ]
+        if not self.stats_trailer:
+            h1.append(self.stats())
         r = []
         r += ['# %s' % l for l in h1]
         r += [""]
@@ -55,14 +57,22 @@ class UpdateEmitter(BaseEmitter):
         r += [""]
         return r
 
+    def postamble(self):
+        '''add the statistics as trailer if not in the preamble'''
+        if self.stats_trailer:
+            return ["", "# %s" % self.stats()]
+        return []
+
     def _prepare(self):
         # generate the base query template
-        c = [f.name for k, f in self.meta.fields.items() if not isinstance(f, HiddenField) and not f.key]
-        pk = [f.name for k, f in self.meta.fields.items() if f.key]
+        c = [k for k, f in self.meta.fields.items() if not isinstance(f, HiddenField) and not f.key]
+        pk = [k for k, f in self.meta.fields.items() if f.key]
         if not pk:
             raise DefinitionException("No keys set for %s", self.meta.model_name)
-        columns = ", ".join(["`" + x + "` = %(" + x + ")s" for x in c])
-        keys = " AND ".join(["`" + x + "` = %(" + x + ")s" for x in pk])
+        self._values = compile_emit(self.meta, c + pk, sql_escape)
+        names = self._values.names
+        columns = ", ".join(["`" + x + "` = %s" for x in names[:len(c)]])
+        keys = " AND ".join(["`" + x + "` = %s" for x in names[len(c):]])
         template = self.base_template % (self.meta.table_name, columns, keys)
         log.debug('emit template: %s', template)
         self._template = template
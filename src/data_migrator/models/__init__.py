@@ -10,7 +10,8 @@ This module contains all classes for models, managers and fields
 """
 
 from .base import Model  # noqa
-from .manager import BaseManager, SimpleManager  # noqa
+from .manager import BaseManager, SimpleManager, ColumnarManager  # noqa
+from .unique import DigestIndex, SpillingIndex  # noqa
 from .fields import (IntField, IntegerField, NullIntField, # noqa
                      StringField, NullStringField, # noqa
                      BooleanField, NullField, UUIDField,  # noqa
@@ -2,10 +2,21 @@
 # -*- coding: UTF-8 -*-
 from six import with_metaclass
 
-from data_migrator.exceptions import DataException
+from data_migrator.exceptions import DataException, DefinitionException
 from .manager import SimpleManager
 from .fields import BaseField, HiddenField
 from .options import Options
+from .codegen import compile_scan, compile_emit
+
+
+def _slots_getstate(self):
+    return dict((k, getattr(self, k)) for k in self.__slots__
+                if hasattr(self, k))
+
+
+def _slots_setstate(self, state):
+    for k, v in state.items():
+        setattr(self, k, v)
 
 
 class ModelBase(type):
@@ -25,14 +36,7 @@ class ModelBase(type):
             return super_new(mcs, name, bases, attrs)
 
         module = attrs.pop('__module__')
-        new_class = super_new(mcs, name, bases, {'__module__': module})
-
-        # Check if we have a meta class
         attr_meta = attrs.pop('Meta', None)
-        if not attr_meta:
-            meta = getattr(new_class, 'Meta', None)
-        else:
-            meta = attr_meta
 
         # declare the fields
         fields = {}
@@ -41,8 +45,25 @@ class ModelBase(type):
                 fields[n] = d
                 setattr(d, 'name', getattr(d, 'name') or n)
 
+        new_attrs = {'__module__': module}
+        if getattr(attr_meta, 'compact', False):
+            # only store the fields and remark, no __dict__ per object
+            _remark = getattr(attr_meta, 'remark', 'remark')
+            new_attrs['__slots__'] = tuple(sorted(fields)) + (_remark,)
+            # python 2 only pickles slots with an explicit state
+            new_attrs['__getstate__'] = _slots_getstate
+            new_attrs['__setstate__'] = _slots_setstate
+        new_class = super_new(mcs, name, bases, new_attrs)
+
+        # Check if we have a meta class
+        if not attr_meta:
+            meta = getattr(new_class, 'Meta', None)
+        else:
+            meta = attr_meta
+
         # now prepare the meta class/options
         setattr(new_class, '_meta', Options(new_class, meta, fields=fields))
+        new_class.compile()
 
         # instantiate the manager
         _manager = getattr(meta, 'manager', SimpleManager)()
@@ -66,6 +87,8 @@ class Model(with_metaclass(ModelBase)):
         objects: reference to manager
     """
     # __metaclass__=ModelBase
+    # empty slots, so compact models can do without __dict__
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         _meta = self.__class__._meta
@@ -82,7 +105,7 @@ class Model(with_metaclass(ModelBase)):
             elif _meta.strict:
                 raise DataException("trying to set unknown field %s" % k)
             else:
-                setattr(self, k, v)
+                self._set_unknown(k, v)
         # add missing fields
         for k in f:
             _f = _fields[k]
@@ -91,13 +114,52 @@ class Model(with_metaclass(ModelBase)):
     def scan(self, row):
         '''scan model from row based on field definition scanners.
 
+        Uses the scan function generated by :meth:`compile`.
+
         Returns:
             self, so that methods can be chained
         '''
-        _fields = self.__class__._meta.fields
-        for k in _fields.keys():
-            setattr(self, k, _fields[k].scan(row))
-        return self
+        return self._scan(row)
+
+    @classmethod
+    def compile(cls):
+        '''generate the specialised scan function of this model.
+
+        Called at model creation. Call it again if field definitions are
+        changed afterwards. Emitters generate their emit function when they
+        are instantiated, see :func:`~.compile_emit`.
+        '''
+        cls._scan = compile_scan(cls._meta)
+        # emit functions are generated per escaper when needed
+        cls._emitters = {}
+
+    @classmethod
+    def resolve_columns(cls, headers):
+        '''set the position of fields with a ``column`` name.
+
+        Looks up the column names in the input header, updates
+        :attr:`~.Options.max_pos` and compiles the model again. Called by the
+        transformer once the header is read.
+
+        Args:
+            headers (list): column names of the input
+
+        Raises:
+            :class:`~.DefinitionException`: raised if a column is not in the
+                header
+        '''
+        _meta = cls._meta
+        fields = [f for f in _meta.fields.values() if f.column]
+        if not fields:
+            return
+        for f in fields:
+            try:
+                f.pos = headers.index(f.column)
+            except ValueError:
+                raise DefinitionException('%s: column %r not in input header' % (
+                    _meta.model_name, f.column))
+        _meta.max_pos = max([-1] + [f.pos for f in _meta.fields.values()])
+        cls.compile()
 
     def emit(self, escaper=None):
         '''output and escape this object instance to a dict.
@@ -108,12 +170,11 @@ class Model(with_metaclass(ModelBase)):
         Note:
             HiddenFields are not emitted
         '''
-        res = {}
-        _fields = self.__class__._meta.fields
-        for k, f in _fields.items():
-            if not isinstance(f, HiddenField):
-                res[f.name] = f.emit(self.__dict__[k], escaper)
-        return res
+        _emit = self._emitters.get(escaper)
+        if _emit is None:
+            _emit = compile_emit(self._meta, escaper=escaper)
+            self.__class__._emitters[escaper] = _emit
+        return dict(zip(_emit.names, _emit(self)))
 
     def update(self, **kwargs):
         '''Update method for chaining operations.
@@ -123,17 +184,25 @@ class Model(with_metaclass(ModelBase)):
 
         Raises:
             :exc:`~.DataException`: raised if trying to set non defined field
-                and strict model.
+                and strict or compact model.
         '''
         _meta = self.__class__._meta
         _fields = self.__class__._meta.fields.keys()
         for k, v in kwargs.items():
-            if k in _fields or not _meta.strict:
+            if k in _fields:
                 setattr(self, k, v)
+            elif not _meta.strict:
+                self._set_unknown(k, v)
             else:
                 raise DataException("trying to set unknown field %s" % k)
         return self
 
+    def _set_unknown(self, k, v):
+        try:
+            setattr(self, k, v)
+        except AttributeError:
+            raise DataException("compact model, can not set unknown field %s" % k)
+
     def save(self):
         '''Save this object and add it to the list.
 
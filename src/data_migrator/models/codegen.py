@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Code generation of specialised functions for models.
+
+The generic implementations in :class:`~.Model` and :class:`~.BaseField` look
+up every field and every field option for every row. The functions generated
+here do these lookups once, when the model is created, and leave out the steps
+that are not used by a field.
+"""
+
+from data_migrator.exceptions import DataException, ValidationException
+from data_migrator.exceptions import DefinitionException
+from .fields import BaseField, HiddenField
+
+
+def _unbound(method):
+    return getattr(method, '__func__', method)
+
+
+def _indent(lines, n=1):
+    return ["    " * n + l for l in lines]
+
+
+def _scan_field(i, k, f, namespace):
+    '''generate the scan lines for field ``f`` stored as attribute ``k``'''
+    namespace['f_%d' % i] = f
+    if _unbound(type(f).scan) is not _unbound(BaseField.scan):
+        return ["self.%s = f_%d.scan(row)" % (k, i)]
+
+    if _unbound(type(f)._value) is not _unbound(BaseField._value):
+        namespace['value_%d' % i] = f._value
+        store = "self.%s = value_%d(v)" % (k, i)
+    else:
+        store = "self.%s = v" % k
+
+    if f.pos < 0 and f.column:
+        return ["raise DefinitionException("
+                "'field %%r: column %%r is not resolved' %% (f_%d.name, f_%d.column))" % (i, i)]
+    if f.pos < 0:
+        lines = ["v = None"]
+        if f.parse:
+            namespace['parse_%d' % i] = f.parse
+            lines = ["v = parse_%d(row) or None" % i]
+        return lines + [store]
+
+    lines = []
+    if f.cache is not None:
+        namespace['cached_%d' % i] = f._cached
+        lines += ["v = cached_%d(v)" % i]
+    elif f.validate:
+        namespace['validate_%d' % i] = f.validate
+        lines += [
+            "if not validate_%d(v):" % i,
+            "    raise ValidationException("
+            "'field %%r input data did not validate' %% f_%d.name)" % i,
+        ]
+    if f.parse and f.cache is None:
+        namespace['parse_%d' % i] = f.parse
+        lines += ["v = parse_%d(v)" % i]
+    lines += [store]
+    if f.nullable is None:
+        return ["v = row[%d]" % f.pos] + lines
+    namespace['null_%d' % i] = f.nullable
+    return [
+        "v = row[%d]" % f.pos,
+        "if v == null_%d:" % i,
+        "    self.%s = None" % k,
+        "else:",
+    ] + _indent(lines)
+
+
+def compile_scan(meta, timer=None):
+    '''generate the scan function for a model.
+
+    The generated function scans a row into all fields in one pass and is
+    equivalent to calling :meth:`~.BaseField.scan` on every field.
+
+    Args:
+        meta (Options): the model options with the field definitions
+        timer: if set, the fields are timed. Called as ``timer(None, None)``
+            first and as ``timer(name, start)`` after every field, with the
+            value it returned last, it returns the start for the next field
+
+    Returns:
+        function: ``scan(self, row)`` returning self
+    '''
+    namespace = {
+        'DataException': DataException,
+        'ValidationException': ValidationException,
+        'DefinitionException': DefinitionException,
+        'timer': timer,
+    }
+    body = []
+    for i, (k, f) in enumerate(meta.fields.items()):
+        body += _scan_field(i, k, f, namespace)
+        if timer:
+            body.append("t = timer(%r, t)" % k)
+    if meta.max_pos >= 0:
+        body = [
+            "if len(row) <= %d:" % meta.max_pos,
+            "    raise DataException('parsing %s, row len %%d, index %d not "
+            "found' %% len(row))" % (meta.model_name, meta.max_pos),
+        ] + body
+    if timer:
+        body = ["t = timer(None, None)"] + body
+    source = "\n".join(
+        ["def scan(self, row):"] + _indent(body + ["return self"]))
+    exec(compile(source, "<scan %s>" % meta.model_name, "exec"), namespace)  # nosec
+    scan = namespace['scan']
+    scan.source = source
+    return scan
+
+
+def _plain_emit(f):
+    '''field emits the stored value or default, without extra steps'''
+    return (
+        _unbound(type(f).emit) is _unbound(BaseField.emit) and
+        'emit' not in f.__dict__ and
+        not (f.max_length or f.validate_output or f.anonymize or f.replace)
+    )
+
+
+def compile_emit(meta, keys=None, escaper=None, timer=None):
+    '''generate the emit function for a model.
+
+    The generated function returns the emitted values of the given fields as a
+    tuple, in order, and is equivalent to calling :meth:`~.BaseField.emit`
+    on every field. Use it with tuple-positional (``%s``) templates.
+
+    Args:
+        meta (Options): the model options with the field definitions
+        keys (list): attribute names of the fields to emit, by default all
+            fields that are not hidden
+        escaper: escaper function to apply on every value
+        timer: if set, the fields are timed, see :func:`compile_scan`
+
+    Returns:
+        function: ``emit(o)`` returning a tuple with the emitted values. The
+        function has the attributes ``names`` with the output names, and
+        ``keys`` and ``escaper`` it was generated with.
+    '''
+    if keys is None:
+        keys = [k for k, f in meta.fields.items() if not isinstance(f, HiddenField)]
+    namespace = {'escaper': escaper, 'timer': timer}
+    body, values = [], []
+    if timer:
+        body.append("t = timer(None, None)")
+    for i, k in enumerate(keys):
+        f = meta.fields[k]
+        if not _plain_emit(f):
+            namespace['emit_%d' % i] = f.emit
+            v = "emit_%d(o.%s, escaper)" % (i, k)
+        else:
+            v = "o.%s" % k
+            if f.default is not None:
+                namespace['default_%d' % i] = f.default
+                body += [
+                    "v%d = o.%s" % (i, k),
+                    "if v%d is None:" % i,
+                    "    v%d = default_%d" % (i, i),
+                ]
+                v = "v%d" % i
+            if escaper:
+                v = "escaper(%s)" % v
+        if timer:
+            # values are computed one by one to time them
+            body += ["r%d = %s" % (i, v), "t = timer(%r, t)" % k]
+            v = "r%d" % i
+        values.append(v)
+    body.append("return (%s)" % "".join([x + ", " for x in values]))
+    source = "\n".join(["def emit(o):"] + _indent(body))
+    exec(compile(source, "<emit %s>" % meta.model_name, "exec"), namespace)  # nosec
+    emit = namespace['emit']
+    emit.source = source
+    emit.names = [meta.fields[k].name for k in keys]
+    emit.keys = keys
+    emit.escaper = escaper
+    return emit
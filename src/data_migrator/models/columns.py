@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Column storage for the :class:`~.ColumnarManager`.
+
+Every column stores the values of one field for all objects. Typed columns
+raise :exc:`TypeError` (or :exc:`OverflowError`) if a value does not fit, the
+manager then falls back to a plain :class:`Column`.
+"""
+
+import datetime
+from array import array
+
+from data_migrator.utils import isstr
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+try:
+    _INT64 = array('q').typecode
+except ValueError:
+    # python 2.7 has no long long arrays, long is 64 bit on most platforms.
+    # Values out of its range raise OverflowError and fall back to Column.
+    _INT64 = 'l'
+
+
+class Column(object):
+    '''plain column, stores values in a list'''
+
+    def __init__(self, values=None):
+        self.values = values or []
+
+    def append(self, v):
+        self.values.append(v)
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def __len__(self):
+        return len(self.values)
+
+    @classmethod
+    def from_column(cls, column):
+        '''copy the decoded values of another column'''
+        return cls([column[i] for i in range(len(column))])
+
+
+class NullMask(object):
+    '''bitmap marking the None values in a column'''
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.size = 0
+
+    def append(self, isnull):
+        if not self.size & 7:
+            self.bits.append(0)
+        if isnull:
+            self.bits[-1] |= 1 << (self.size & 7)
+        self.size += 1
+
+    def __getitem__(self, i):
+        return self.bits[i >> 3] >> (i & 7) & 1
+
+
+class IntColumn(Column):
+    '''integer column, stores 64 bit values in an array with null bitmap'''
+
+    def __init__(self):
+        self.values = array(_INT64)
+        self.nulls = NullMask()
+
+    def append(self, v):
+        if v is None:
+            self.values.append(0)
+        elif v.__class__ is int:
+            self.values.append(v)
+        else:
+            raise TypeError("not an integer: %r" % v)
+        self.nulls.append(v is None)
+
+    def __getitem__(self, i):
+        return None if self.nulls[i] else self.values[i]
+
+
+class DateTimeColumn(Column):
+    '''datetime column, stores naive datetimes as microseconds since epoch'''
+
+    def __init__(self):
+        self.values = array(_INT64)
+        self.nulls = NullMask()
+
+    def append(self, v):
+        if v is None:
+            self.values.append(0)
+        elif v.__class__ is datetime.datetime and v.tzinfo is None:
+            d = v - _EPOCH
+            self.values.append(
+                (d.days * 86400 + d.seconds) * 1000000 + d.microseconds)
+        else:
+            raise TypeError("not a naive datetime: %r" % v)
+        self.nulls.append(v is None)
+
+    def __getitem__(self, i):
+        if self.nulls[i]:
+            return None
+        return _EPOCH + datetime.timedelta(microseconds=self.values[i])
+
+
+class DictColumn(Column):
+    '''dictionary encoded string column, stores every distinct value once'''
+
+    def __init__(self):
+        self.codes = array('I')
+        self.index = {}
+        self.values = []
+
+    def append(self, v):
+        if v is not None and not isstr(v):
+            raise TypeError("not a string: %r" % v)
+        code = self.index.get(v)
+        if code is None:
+            code = self.index[v] = len(self.values)
+            self.values.append(v)
+        self.codes.append(code)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def __len__(self):
+        return len(self.codes)
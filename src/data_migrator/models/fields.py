@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import re
 import uuid
 import json
 import datetime
@@ -9,7 +10,7 @@ from functools import partial
 
 from data_migrator.exceptions import ValidationException, DataException
 from data_migrator.exceptions import DefinitionException
-from data_migrator.utils import isstr
+from data_migrator.utils import isstr, LRUCache
 
 
 def new_exception(field, exc_class, msg, *args):
@@ -21,6 +22,11 @@ def _replace(format_str, x):
     return format_str.format(*x)
 
 
+# markers for cached input that is not found or did not validate
+_MISSING = object()
+_NOT_VALID = object()
+
+
 class BaseField(object):
     '''Base column definition for the transformation DSL
 
@@ -31,6 +37,11 @@ class BaseField(object):
             data to select and store in this field. If not set (or negative)
             the fields is interpreted as not selecting just a column from the
             source but to take the full row in the parse function
+        column (str): Name of the column in the input header to select,
+            instead of ``pos``. The name is resolved to a position once, when
+            the input is opened, see :meth:`~.Model.resolve_columns`.
+            Scanning raises :exc:`~.DefinitionException` if it is not
+            resolved.
         name (str): The name of this field. By default this is the name
             provided in the model declaration. This attribute is to replace
             that name by the final column name.
@@ -74,6 +85,11 @@ class BaseField(object):
             fail or drop the record if the exception is raised.
         anonymizer: Add an additional function that will be called at emit to
             anonymize the data
+        cache: If set, the validation and parse results are memoised per input
+            value. Use ``True`` for a cache of 10000 values or an int for
+            another size. Useful for low cardinality columns with expensive
+            parse functions. Note that parsed values are shared between
+            objects. Hit ratios are reported in :meth:`~.BaseManager.stats`.
         validate_output: A pre-emit validator used to scan the bare output and
             raise exceptions if output is not as expected.
         creation_order: An automatically generated attribute used to determine
@@ -89,7 +105,7 @@ class BaseField(object):
                  replacement=None, parse=None, validate=None,
                  anonymize=None,
                  max_length=None, unique=False,
-                 validate_output=None):
+                 validate_output=None, cache=None, column=None):
 
         # default value if null
         self.default = default if default is not None else getattr(self.__class__, 'default', default)
@@ -106,6 +122,10 @@ class BaseField(object):
         # some function to apply to value
         self.parse = parse or getattr(self.__class__, 'parse', None)
         self.pos = int(pos)
+        # column name in the input header, resolved to pos
+        if column and self.pos >= 0:
+            raise DefinitionException("Cannot set both pos and column")
+        self.column = column
         # replace string to use in output
         if isstr(replacement):
             replacement = partial(_replace, replacement)
@@ -121,6 +141,10 @@ class BaseField(object):
         self.validate = validate or getattr(self.__class__, 'validate', None)
         # output validator
         self.validate_output = validate_output
+        # memoised validate and parse results
+        if cache is True:
+            cache = 10000
+        self.cache = LRUCache(cache) if cache else None
 
         # creation_order is required for orderdict to retain order of fields
         self.creation_order = BaseField.creation_order
@@ -143,6 +167,9 @@ class BaseField(object):
         '''
         # see if we want to read a column in the row
         v = None
+        if self.pos < 0 and self.column:
+            raise DefinitionException('field %r: column %r is not resolved' % (
+                self.name, self.column))
         if self.pos >= 0:
             try:
                 _v = row[self.pos]
@@ -151,17 +178,35 @@ class BaseField(object):
             # do null check if enabled
             if self.nullable is not None and _v == self.nullable:
                 return v
-            v = _v
-            if self.validate and not self.validate(v):
-                raise ValidationException('field %r input data did not validate' % self.name)
-            # apply intermediate function on output, default is stripping
-            if self.parse:
-                v = self.parse(v)
+            if self.cache is not None:
+                v = self._cached(_v)
+            else:
+                v = self._validate_parse(_v)
         elif self.parse:
             v = self.parse(row) or v
             # delegate to inner function, to reuse this logic
         return self._value(v)
 
+    def _validate_parse(self, v):
+        if self.validate and not self.validate(v):
+            raise ValidationException('field %r input data did not validate' % self.name)
+        # apply intermediate function on output, default is stripping
+        if self.parse:
+            v = self.parse(v)
+        return v
+
+    def _cached(self, v):
+        res = self.cache.get(v, _MISSING)
+        if res is _MISSING:
+            try:
+                res = self._validate_parse(v)
+            except ValidationException:
+                res = _NOT_VALID
+            self.cache[v] = res
+        if res is _NOT_VALID:
+            raise ValidationException('field %r input data did not validate' % self.name)
+        return res
+
     def emit(self, v, escaper=None):
         '''helper function to export this field.
 
@@ -240,29 +285,66 @@ class IntField(BaseField):
 
 IntegerField = IntField
 
+# naive ISO-8601 date and time, as parsed by fromisoformat (python >= 3.7)
+_ISO_DATETIME = re.compile(r'^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?)?$')
+_fromisoformat = getattr(datetime.datetime, 'fromisoformat', None)
+
+
 class DateTimeField(BaseField):
-    '''Basic datetime field handler'''
+    '''Basic datetime field handler
+
+    Strings are parsed with the input formats, if given, otherwise ISO-8601
+    dates and times are parsed directly. Only if these fail the much slower
+    ``dateutil`` parser is used. Parsed strings are memoised, so repeated
+    dates parse once.
+    '''
     schema_type = 'string'
     schema_format = 'date-time'
 
-    def __init__(self, f=None, **kwargs):
+    def __init__(self, f=None, input_format=None, cache_size=10000, **kwargs):
         """
         Args:
             f: format of the datetime
                 Default is ``%Y-%m-%dT%H:%M:%SZ`` (RFC3999)
+            input_format: format or list of formats to parse the input with
+                ``strptime``.
+            cache_size (int): number of parsed strings to memoise, set to 0
+                to disable. Default is 10000.
         """
         self.format = f or getattr(self.__class__, 'format', "%Y-%m-%dT%H:%M:%SZ")
+        if isstr(input_format):
+            input_format = [input_format]
+        self.input_format = input_format or []
+        self.dates = LRUCache(cache_size) if cache_size else None
         super(DateTimeField, self).__init__(**kwargs)
 
     def _value(self, v):
         if isstr(v):
             if v == "":
                 return None
+            if self.dates is None:
+                return self._parse(v)
+            d = self.dates.get(v)
+            if d is None:
+                d = self.dates[v] = self._parse(v)
+            return d
+        return v
+
+    def _parse(self, v):
+        for fmt in self.input_format:
             try:
-                v = p.parse(v)
+                return datetime.datetime.strptime(v, fmt)
             except ValueError:
-                raise DataException("%s could not parse date %s", self.name, v)
-        return v
+                pass
+        if _fromisoformat and _ISO_DATETIME.match(v):
+            try:
+                return _fromisoformat(v)
+            except ValueError:
+                pass
+        try:
+            return p.parse(v)
+        except (ValueError, OverflowError):
+            raise DataException("%s could not parse date %s", self.name, v)
 
     def emit(self, v, escaper=None):
         if v is not None and isinstance(v, datetime.datetime):
@@ -1,9 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+from collections import OrderedDict
+
 from data_migrator.exceptions import NonUniqueDataException
 from data_migrator.exceptions import ValidationException
 from data_migrator.utils import default_logger
+from .fields import IntField, NullIntField, DateTimeField, UUIDField
+from .columns import Column, IntColumn, DateTimeColumn, DictColumn
 
 log = default_logger()
 
@@ -21,14 +25,22 @@ class BaseManager(object):
         self.unique_values = {}
         self.rows = 0
         self.dropped = 0
+        self.saved = 0
+        # (row number, row, reason) of dropped rows, if quarantined
+        self.rejects = None
+        # row number and row of every saved object, to quarantine objects
+        # dropped while merging
+        self.sources = None
+        self._source = (None, None)
 
     def _prepare(self, cls):
         self.model_class = cls
         self.meta = cls._meta
 
         # define indexes for fields that are expected to be unique
+        _index = self.meta.unique_index or set
         for u in self.meta.unique_fields:
-            self.unique_values[u] = set()
+            self.unique_values[u] = _index()
 
     def transform(self, row, previous, model):
         '''defines the instantiation of objects from a row
@@ -63,6 +75,7 @@ class BaseManager(object):
             list of saved objects
         '''
         self.rows += 1
+        self._source = (self.rows, row)
         try:
             res = self.transform(row, previous, self.model_class)
         except ValidationException as err:
@@ -70,6 +83,7 @@ class BaseManager(object):
                 raise ValidationException("%d, %s:%s" % (self.rows, self.meta.model_name, err))
             log.debug("%d, %s: dropped, %s", self.rows, self.meta.model_name, err)
             self.dropped += 1
+            self.reject(str(err))
             return []
         else:
             return self.save(res)
@@ -89,6 +103,7 @@ class BaseManager(object):
         if v:
             self.dropped += 1
             log.debug('%d, %s: drop None in field(s): %s', self.rows, self.meta.model_name, ",".join(v))
+            self.reject('None in field(s): %s' % ",".join(v))
             return
         v = self._check_unique(o)
         if v and self.meta.fail_non_unique:
@@ -96,10 +111,28 @@ class BaseManager(object):
         elif v and self.meta.drop_non_unique:
             self.dropped += 1
             log.debug('%d, %s: drop uniqueness violation', self.rows, self.meta.model_name)
+            self.reject('non unique value in field(s): %s' % ",".join(v))
         else:
-            self.results.append(o)
+            self._store(o)
+            self.saved += 1
+            if self.sources is not None:
+                self.sources.append(self._source)
             return o
 
+    def reject(self, reason, row=None):
+        '''quarantine the row being scanned, if :attr:`rejects` is a list
+
+        Args:
+            reason (str): why the row is rejected
+            row (list): the rejected row, default the row being scanned
+        '''
+        if self.rejects is not None:
+            rowno, _row = self._source
+            self.rejects.append((rowno, _row if row is None else row, reason))
+
+    def _store(self, o):
+        self.results.append(o)
+
     def _check_none(self, o):
         violation = []
         for f in self.meta.drop_if_none:
@@ -111,27 +144,140 @@ class BaseManager(object):
         violation = []
         for k, s in self.unique_values.items():
             v = getattr(o, k)
-            if v in s:
+            if isinstance(s, set):
+                seen = v in s
+                s.add(v)
+            else:
+                # indexes look up and add a value at once
+                seen = not s.add(v)
+            if seen:
                 log.debug('%s: non unique value %s=%s', self.meta.model_name, k, v)
                 violation.append(k)
-            s.add(v)
         return violation
 
     def all(self):
         '''return all results'''
         return self.results
 
+    def state(self):
+        '''return the scan state of this manager.
+
+        Returns:
+            map: rows, dropped and results, to be merged by :meth:`merge`
+        '''
+        return {
+            "rows": self.rows,
+            "dropped": self.dropped,
+            "results": self.results,
+            "caches": dict([(k, (c.hits, c.misses)) for k, c in self._caches()]),
+            "rejects": self.rejects,
+            "sources": self.sources,
+        }
+
+    def merge(self, state):
+        '''merge the scan state of another manager into this manager.
+
+        Used to combine parts of the input scanned in parallel. States should
+        be merged in the order of the input. The other manager is expected not
+        to check uniqueness, objects are checked for uniqueness while merging
+        and dropped or failed as if scanned by this manager.
+
+        Rejects of the other manager are added with their row numbers
+        offset by the rows of this manager.
+
+        Args:
+            state (map): state as returned by :meth:`state`
+
+        Returns:
+            list of merged objects
+        '''
+        offset = self.rows
+        self.rows += state['rows']
+        self.dropped += state['dropped']
+        for k, c in self._caches():
+            hits, misses = state.get('caches', {}).get(k, (0, 0))
+            c.hits += hits
+            c.misses += misses
+        if self.rejects is not None:
+            self.rejects.extend([(offset + n, row, reason)
+                                 for n, row, reason in state.get('rejects') or []])
+        sources = state.get('sources') or [(None, None)] * len(state['results'])
+        res = []
+        for o, (n, row) in zip(state['results'], sources):
+            self._source = (None if n is None else offset + n, row)
+            if self._save_object(o):
+                res.append(o)
+        return res
+
+    def checkpoint(self):
+        '''return the full state of this manager, to resume from.
+
+        Returns:
+            map: :meth:`state` with the saved count and unique values, to be
+            restored by :meth:`restore`
+        '''
+        res = self.state()
+        res['saved'] = self.saved
+        res['unique_values'] = self.unique_values
+        return res
+
+    def restore(self, state):
+        '''restore this manager to a checkpoint.
+
+        Args:
+            state (map): state as returned by :meth:`checkpoint`
+        '''
+        self.rows = state['rows']
+        self.dropped = state['dropped']
+        self.saved = state['saved']
+        self.unique_values = state['unique_values']
+        for k, c in self._caches():
+            c.hits, c.misses = state.get('caches', {}).get(k, (0, 0))
+        self.flush()
+        for o in state['results']:
+            self._store(o)
+
+    def flush(self):
+        '''return all results and clear the result set.
+
+        Used for streaming, objects are handed over once and no longer kept
+        by this manager. Statistics keep counting all saved objects.
+
+        Returns:
+            list of all results since the previous flush
+        '''
+        res, self.results = self.results, []
+        return res
+
     def __len__(self):
         '''return length of current result set'''
         return len(self.results)
 
+    def _caches(self):
+        return [(k, f.cache) for k, f in self.meta.fields.items()
+                if f.cache is not None]
+
     def stats(self):
-        '''return current stats'''
-        return {
-            "out": len(self.results),
-            "in": self.rows,
-            "dropped": self.dropped,
-        }
+        '''return current stats
+
+        If fields have a cache, the cache hits, misses and hit ratio of all
+        these fields are added.
+        '''
+        # ordered, the stats are written in emitted files
+        res = OrderedDict([
+            ("out", self.saved),
+            ("in", self.rows),
+            ("dropped", self.dropped),
+        ])
+        caches = self._caches()
+        if caches:
+            hits = sum([c.hits for k, c in caches])
+            misses = sum([c.misses for k, c in caches])
+            res['cache_hits'] = hits
+            res['cache_misses'] = misses
+            res['cache_hit_ratio'] = round(float(hits) / (hits + misses), 3) \
+                if hits + misses else 0.0
+        return res
 
 
 class SimpleManager(BaseManager):
@@ -143,5 +289,119 @@ class SimpleManager(BaseManager):
         '''specific transform implementation, instantiates one object
         from a row
         '''
-        res = [model().scan(row)]
+        # scan sets all fields, no need to initialize the defaults first
+        res = [model.__new__(model).scan(row)]
+        return res
+
+
+class _Rows(object):
+    # lazy sequence of objects materialized from the columns
+    def __init__(self, manager):
+        self.manager = manager
+
+    def __len__(self):
+        return len(self.manager)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[x] for x in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("object index out of range")
+        return self.manager._materialize(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.manager._materialize(i)
+
+
+class ColumnarManager(SimpleManager):
+    """
+    Manager that stores the objects by column instead of as objects.
+
+    Integers and datetimes are stored in arrays with a null bitmap, strings
+    are dictionary encoded. Columns fall back to a list if a value does not
+    fit. Objects are materialized again when accessed, changes to these
+    objects are not stored. Only fields and the remark are kept.
+
+    Use it as :attr:`~.Options.manager` for models with many objects:
+
+    .. code-block:: python
+
+      class Meta:
+        manager = ColumnarManager
+    """
+    def __init__(self, *args, **kwargs):
+        super(ColumnarManager, self).__init__(*args, **kwargs)
+        self.columns = {}
+        self.remarks = {}
+        self.size = 0
+
+    def _prepare(self, cls):
+        super(ColumnarManager, self)._prepare(cls)
+        self._clear()
+
+    def _clear(self):
+        self.columns = dict(
+            [(k, self._column(f)) for k, f in self.meta.fields.items()])
+        self.remarks = {}
+        self.size = 0
+
+    def _column(self, f):  # pylint: disable=no-self-use
+        if isinstance(f, (IntField, NullIntField)):
+            return IntColumn()
+        elif isinstance(f, DateTimeField):
+            return DateTimeColumn()
+        elif f.schema_type == 'string' and not (f.unique or isinstance(f, UUIDField)):
+            return DictColumn()
+        return Column()
+
+    def _store(self, o):
+        for k, c in self.columns.items():
+            v = getattr(o, k)
+            try:
+                c.append(v)
+            except (TypeError, OverflowError):
+                c = self.columns[k] = Column.from_column(c)
+                c.append(v)
+        if hasattr(o, self.meta.remark):
+            self.remarks[self.size] = getattr(o, self.meta.remark)
+        self.size += 1
+
+    def _materialize(self, i):
+        o = self.model_class.__new__(self.model_class)
+        for k, c in self.columns.items():
+            setattr(o, k, c[i])
+        if i in self.remarks:
+            setattr(o, self.meta.remark, self.remarks[i])
+        return o
+
+    def column(self, k):
+        '''return all values of a field
+
+        Args:
+            k: attribute name of the field
+
+        Returns:
+            list of values, in order of the objects
+        '''
+        c = self.columns[k]
+        return [c[i] for i in range(self.size)]
+
+    def all(self):
+        '''return all results, as a lazy sequence'''
+        return _Rows(self)
+
+    def state(self):
+        res = super(ColumnarManager, self).state()
+        res['results'] = list(self.all())
+        return res
+
+    def flush(self):
+        res = list(self.all())
+        self._clear()
         return res
+
+    def __len__(self):
+        return self.size
@@ -7,6 +7,8 @@ from data_migrator.exceptions import DefinitionException
 
 # list of extendable options for the Meta class
 _options = {
+    'batch_size': None,
+    'compact': False,
     'drop_if_none': [],
     'drop_non_unique': False,
     'emitter': None,
@@ -14,9 +16,11 @@ _options = {
     'fail_not_validated': False,
     'fail_on_data_exception': True,
     'file_name': None,
+    'independent': False,
     'prefix': None,
     'strict': None,
-    'remark': 'remark'
+    'remark': 'remark',
+    'unique_index': None,
 }
 
 
@@ -38,6 +42,13 @@ class Options(object):
             fields (list): list of all field definitions
 
         Attributes:
+            batch_size (int): If set, emitters that support it combine this
+                number of objects, for example in one extended insert
+                statement of the :class:`~.MySQLEmitter`.
+            compact (boolean): If ``True``, *data-migrator* will store objects
+                of this model without a ``__dict__``, only the fields and the
+                remark can be set. This saves memory for large result sets.
+                Default is ``False``.
             drop_if_none (list): names of the columns to check for None, Is a
                 list of field names as defined. If set *data-migrator* will
                 check if fields are not None and drop if one of the columns is.
@@ -67,6 +78,11 @@ class Options(object):
             file_name (string): If set, *data-migrator* will use this as
                 file_name for the emitter instead of the default filename based
                 on model_name.
+            independent (boolean): If ``True``, the table of this model has
+                no foreign keys to or from the tables of the other models.
+                A :class:`~.DBAPILoader` loads independent models concurrently,
+                all other models are loaded one after another in the order of
+                the models. Default is ``False``.
             table_name (string): If set, *data-migrator* will use this as
                 table_name for the emitter instead of the default table_name
                 based on model_name.
@@ -82,6 +98,13 @@ class Options(object):
             strict (boolean): If ``True``, *data-migrator* will be strict on
                 the model and does not allow values outside of the definitions.
                 Default is ``None``.
+            unique_index: If set, *data-migrator* will use this class (or
+                factory) to keep track of the values of unique fields instead
+                of a ``set``. Use :class:`~.DigestIndex` or
+                :class:`~.SpillingIndex` to bound the memory used, for example
+                ``functools.partial(SpillingIndex, max_memory=2**30)``. The
+                ``add`` method of an index returns ``True`` if the value was
+                not seen before.
             manager (:class:`~.BaseManager`): If set, *data-migrator* will use
                 this as the manager for this model.
 
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Indexes to track values of unique fields.
+
+By default a manager keeps a python ``set`` of all values of a unique field.
+For large inputs use one of the indexes below as
+:attr:`~.Options.unique_index`. Indexes store fixed size digests of the values
+instead of the values themselves:
+
+* :class:`DigestIndex` keeps 64 or 128 bit digests in an array backed hash
+  table in memory.
+* :class:`SpillingIndex` keeps digests in memory up to a budget and spills
+  sorted runs to disk beyond that.
+
+With 128 bit digests the chance of a false violation is negligible, with 64
+bit digests it becomes relevant in the billions of values. Values are
+compared by type and representation, so ``1`` and ``"1"`` differ.
+"""
+
+import hashlib
+import heapq
+import mmap
+import struct
+import tempfile
+from array import array
+
+from data_migrator.utils import isstr
+
+try:
+    _UINT64 = array('Q').typecode
+except ValueError:
+    # python 2.7 has no unsigned long long arrays, long is 64 bit on most
+    # platforms
+    _UINT64 = 'L'
+
+
+if hasattr(hashlib, 'blake2b'):
+    def _hash(b, size):
+        return hashlib.blake2b(b, digest_size=size).digest()
+else:
+    # python 2.7 has no blake2b, sha256 is slower but truncates as well
+    def _hash(b, size):
+        return hashlib.sha256(b).digest()[:size]
+
+
+def digest(v, bits=64):
+    '''returns a fixed size digest of a value as tuple of 64 bit ints'''
+    if isinstance(v, bytes):
+        b = b'b' + v
+    elif isstr(v):
+        b = b's' + v.encode('utf-8', 'surrogatepass')
+    else:
+        b = (type(v).__name__ + repr(v)).encode('utf-8')
+    n = bits // 64
+    return struct.unpack('<%dQ' % n, _hash(b, 8 * n))
+
+
+class DigestIndex(object):
+    '''exact index storing digests in an open addressing hash table
+
+    Every value takes 8 or 16 bytes in an array, the table is kept at most
+    half full.
+
+    Args:
+        bits (int): digest size, 64 or 128 bits
+        capacity (int): initial number of slots, a power of 2
+    '''
+
+    def __init__(self, bits=128, capacity=1024):
+        if bits not in (64, 128):
+            raise ValueError("bits should be 64 or 128")
+        self.bits = bits
+        self.width = bits // 64
+        self.size = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        self._mask = capacity - 1
+        self._table = array(_UINT64, [0]) * (self.width * capacity)
+
+    def _key(self, v):
+        key = digest(v, self.bits)
+        if not any(key):
+            # all zero marks an empty slot
+            key = key[:-1] + (1,)
+        return key
+
+    def _find(self, key):
+        t, mask = self._table, self._mask
+        i = key[-1] & mask
+        if self.width == 1:
+            k = key[0]
+            while True:
+                x = t[i]
+                if x == k:
+                    return i, True
+                if not x:
+                    return i, False
+                i = (i + 1) & mask
+        hi, lo = key
+        while True:
+            x, y = t[2 * i], t[2 * i + 1]
+            if x == hi and y == lo:
+                return i, True
+            if not x and not y:
+                return i, False
+            i = (i + 1) & mask
+
+    def _insert(self, key):
+        i, found = self._find(key)
+        if found:
+            return False
+        self._put(i, key)
+        return True
+
+    def _put(self, i, key):
+        # store a key in empty slot i, as found by _find
+        w = self.width
+        self._table[i * w:i * w + w] = array(_UINT64, key)
+        self.size += 1
+        if self.size * 2 > self._mask + 1:
+            self._grow()
+
+    def _grow(self):
+        old, w = self._table, self.width
+        self._alloc((self._mask + 1) * 2)
+        self.size = 0
+        for i in range(0, len(old), w):
+            key = tuple(old[i:i + w])
+            if any(key):
+                self._insert(key)
+
+    def keys(self):
+        '''generate all stored digests'''
+        t, w = self._table, self.width
+        for i in range(0, len(t), w):
+            key = tuple(t[i:i + w])
+            if any(key):
+                yield key
+
+    def add(self, v):
+        '''add value, returns ``True`` if not seen before'''
+        return self._insert(self._key(v))
+
+    def __contains__(self, v):
+        return self._find(self._key(v))[1]
+
+    def __len__(self):
+        return self.size
+
+
+class _Run(object):
+    # sorted digests in a temporary file, searched through mmap
+    def __init__(self, keys, width):
+        self.fmt = '>%dQ' % width
+        self.record = 8 * width
+        self.file = tempfile.TemporaryFile()
+        for key in keys:
+            self.file.write(struct.pack(self.fmt, *key))
+        self.file.flush()
+        self.size = self.file.tell() // self.record
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, key):
+        b, r, m = struct.pack(self.fmt, *key), self.record, self.map
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            x = m[mid * r:mid * r + r]
+            if x == b:
+                return True
+            if x < b:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+    def __iter__(self):
+        r, m = self.record, self.map
+        for i in range(self.size):
+            yield struct.unpack(self.fmt, m[i * r:i * r + r])
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+class SpillingIndex(object):
+    '''exact digest index with a memory budget, spills to disk beyond that
+
+    Digests are kept in a :class:`DigestIndex` until the memory budget is
+    reached. The digests are then written as a sorted run to a temporary file
+    and looked up by binary search. Runs are merged if there are too many.
+
+    The runs are temporary files, so models with this index can not be
+    checkpointed (see ``--checkpoint``).
+
+    Args:
+        max_memory (int): memory budget in bytes for the in memory table
+        bits (int): digest size, 64 or 128 bits
+        max_runs (int): number of runs on disk before merging them
+    '''
+
+    resumable = False
+
+    def __init__(self, max_memory=256 * 1024 * 1024, bits=128, max_runs=8):
+        self.bits = bits
+        self.max_memory = max_memory
+        self.max_runs = max_runs
+        self.memory = DigestIndex(bits=bits)
+        self.runs = []
+        self.size = 0
+        # the table is at most half full, 2 slots per value
+        self._max_keys = max(1, max_memory // (2 * 8 * self.memory.width))
+
+    def _spill(self):
+        self.runs.append(_Run(sorted(self.memory.keys()), self.memory.width))
+        self.memory = DigestIndex(bits=self.bits)
+        if len(self.runs) > self.max_runs:
+            merged = _Run(heapq.merge(*self.runs), self.memory.width)
+            for run in self.runs:
+                run.close()
+            self.runs = [merged]
+
+    def _seen(self, key):
+        if self.memory._find(key)[1]:
+            return True
+        for run in self.runs:
+            if key in run:
+                return True
+        return False
+
+    def add(self, v):
+        '''add value, returns ``True`` if not seen before'''
+        key = self.memory._key(v)
+        i, found = self.memory._find(key)
+        if found:
+            return False
+        for run in self.runs:
+            if key in run:
+                return False
+        self.memory._put(i, key)
+        self.size += 1
+        if len(self.memory) >= self._max_keys:
+            self._spill()
+        return True
+
+    def __contains__(self, v):
+        return self._seen(self.memory._key(v))
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        '''remove the runs on disk'''
+        for run in self.runs:
+            run.close()
+        self.runs = []
@@ -3,14 +3,47 @@
 
 import sys
 import os
+import pickle  # nosec, only loads checkpoints written by a transformer
 import csv
 import logging
+import itertools
+import threading
+import multiprocessing
 
 from data_migrator import __version__
 from data_migrator.exceptions import DataException, ValidationException
+from data_migrator.exceptions import DefinitionException, NonUniqueDataException
 from data_migrator.utils import configure_logging
 from data_migrator.utils import configure_parser
+from data_migrator.utils.compat import replace
+from data_migrator.utils.reader import header_offset, read_rows, MMapReader
+from data_migrator.utils.files import open_file, compression_for, EXTENSIONS
+from data_migrator.utils.metrics import Metrics, clock
+from data_migrator.utils.profiler import Profiler
 from data_migrator.emitters import MySQLEmitter
+from data_migrator.models.manager import SimpleManager
+from data_migrator.models.fields import BaseField
+from data_migrator.models.codegen import compile_scan, compile_emit
+
+# transformer shared with the forked scan workers
+_WORKER = None
+# rows to read before checking a fractional error budget
+_MIN_ROWS = 1000
+
+
+def _scan_shard(shard):
+    return _WORKER._scan_shard(shard)
+
+
+def _fork_context():
+    # workers inherit the models by forking, python 2 always forks
+    if hasattr(multiprocessing, 'get_context'):
+        return multiprocessing.get_context('fork')
+    return multiprocessing
+
+
+def _unbound(method):
+    return getattr(method, '__func__', method)
 
 
 class Transformer(object):
@@ -25,7 +58,13 @@ class Transformer(object):
     '''
     def __init__(self, models=None, reader=None, dataset=None,
                  argparser=None, outdir=None,
-                 emitter=MySQLEmitter):
+                 emitter=MySQLEmitter, stream=False, workers=1,
+                 chunk_size=10000, loader=None, encoding='utf-8',
+                 input_encoding='utf-8',
+                 buffer_size=1024 * 1024, compression=None,
+                 compress_threads=1, quoted=True, checkpoint=None,
+                 checkpoint_rows=1000000, resume=False, metrics_file=None,
+                 profile=False, quarantine=False, max_errors=0):
         '''
         Args:
             models (list): list of all models to be processed in this
@@ -36,6 +75,47 @@ class Transformer(object):
                 default_parser
             outdir: output directory for results, otherwise scan from argparser
             emitter: emitter to be used for this transformation
+            stream (boolean): emit objects directly after scanning instead of
+                collecting all objects first. Memory is capped to the objects
+                of a single row, statistics are written as trailer.
+            workers (int): number of processes to scan the input with. Input
+                files are split in byte ranges, other input is split in
+                chunks of ``chunk_size`` rows. Workers are forked, this is
+                not available on Windows.
+            chunk_size (int): rows per chunk if scanning with workers, and
+                objects per chunk to emit
+            loader (DBAPILoader): load the objects in a database instead of
+                emitting files, models are loaded in order, models with
+                ``Meta.independent`` concurrently
+            encoding (str): encoding of the output files
+            input_encoding (str): encoding of the input file, should be ASCII
+                compatible, e.g. ``latin-1``
+            buffer_size (int): write buffer size of the output files, chunks
+                of objects are written as one block
+            compression (str): compress the output files with gzip, bz2, xz
+                or zstd. Output files and the input file are also compressed
+                if their name has the extension of a compression
+            compress_threads (int): number of threads to compress the output
+                with, in blocks
+            quoted (boolean): input files can have quoted fields, if
+                ``False`` lines are split on tabs directly, which is faster
+            checkpoint (str): file to write checkpoints to while scanning,
+                removed when the transformation is done. Needs ``stream``,
+                otherwise all collected objects are saved in every checkpoint
+            checkpoint_rows (int): input rows between checkpoints
+            resume (boolean): continue from the checkpoint, if it exists
+            metrics_file (str): dump the metrics to this file at the end, as
+                JSON or as Prometheus textfile if it ends with ``.prom``. Also
+                times the scan and emit per model and field.
+            profile (boolean): profile the read and write phase with
+                cProfile, see :class:`~.Profiler`
+            quarantine (boolean): write the rows that are dropped or fail to
+                scan to ``<table_name>.rejects.tsv`` in the output directory,
+                with the row number and the reason. Unquoted input is split
+                in full then, see ``quoted``
+            max_errors: number of rows that may fail to scan before the
+                transformation is aborted, or a fraction (below 1) of the rows
+                read. A fraction is checked from 1000 rows on and at the end.
 
         Note that the order of models is relevant for the generation
         '''
@@ -47,7 +127,35 @@ class Transformer(object):
         self.print_rows = 0
         self.argparser = argparser
         self.reader = reader
+        self.stream = stream
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.loader = loader
+        self.encoding = encoding
+        self.input_encoding = input_encoding
+        self.buffer_size = buffer_size
+        self.compression = compression
+        self.compress_threads = compress_threads
+        self.quoted = quoted
+        self.checkpoint = checkpoint
+        self.checkpoint_rows = checkpoint_rows
+        self.resume = resume
+        self.metrics_file = metrics_file
+        self.metrics = Metrics()
+        self.profiler = Profiler(enabled=profile)
+        self.quarantine = quarantine
+        self.max_errors = max_errors
+        self.errors = 0
+        self._rejects = {}
+        self.rows = 0
+        self._offset = None
+        self._positions = {}
+        self._timed_scans = {}
+        self._timed = None
+        self._shard = False
         self.max_pos = max([x._meta.max_pos for x in models])
+        self.outputs = {}
+        self.reader_file = None
 
     def process(self):
         '''Main processing loop'''
@@ -57,10 +165,26 @@ class Transformer(object):
         self._interpret_cmdline()
         self.log.info("data_migrator pipeline starting")
         self.log.debug("version: %s", __version__)
-        self._get_header()
-        self._open_input()
-        self._read_input()
-        self._write_output()
+        with self.metrics.stage('header'):
+            self._get_header()
+            self._open_input()
+        if self.quarantine:
+            for m in self.models:
+                m.objects.rejects = []
+        if self.resume:
+            self._restore()
+        if self.stream:
+            for m in self.models:
+                self.outputs[m] = self._open_output(m)
+        if self.checkpoint:
+            self._check_resumable()
+        with self.metrics.stage('read'), self.profiler.phase('read'):
+            self._read_input()
+        with self.metrics.stage('write'), self.profiler.phase('write'):
+            self._write_output()
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        self._report()
         self.log.info("data_migrator pipeline done")
 
     def _specific_args(self):
@@ -69,6 +193,31 @@ class Transformer(object):
     def _interpret_cmdline(self):
         self.args = self.parser.parse_args(sys.argv[1:])
         self.outdir = self.outdir or self.args.outdir
+        self.stream = self.stream or getattr(self.args, 'stream', False)
+        self.workers = max(self.workers, getattr(self.args, 'workers', 1))
+        if self.workers > 1 and not hasattr(os, 'fork'):
+            raise DefinitionException(
+                'workers (--workers) need fork, not available on %s' % sys.platform)
+        self.encoding = getattr(self.args, 'encoding', None) or self.encoding
+        self.input_encoding = getattr(self.args, 'input_encoding', None) or \
+            self.input_encoding
+        self.buffer_size = getattr(self.args, 'buffer_size', None) or self.buffer_size
+        self.compression = getattr(self.args, 'compress', None) or self.compression
+        self.compress_threads = getattr(self.args, 'compress_threads', None) or \
+            self.compress_threads
+        self.quoted = self.quoted and not getattr(self.args, 'unquoted', False)
+        self.checkpoint = getattr(self.args, 'checkpoint', None) or self.checkpoint
+        self.checkpoint_rows = getattr(self.args, 'checkpoint_rows', None) or \
+            self.checkpoint_rows
+        self.resume = self.resume or getattr(self.args, 'resume', False)
+        self.metrics_file = getattr(self.args, 'metrics', None) or self.metrics_file
+        self.metrics.detail = self.metrics.detail or bool(self.metrics_file)
+        # KinesisTransformer replaces --profile by the name of an AWS profile
+        self.profiler.enabled = self.profiler.enabled or \
+            getattr(self.args, 'profile', False) is True
+        self.quarantine = self.quarantine or getattr(self.args, 'quarantine', False)
+        if getattr(self.args, 'max_errors', None) is not None:
+            self.max_errors = self.args.max_errors
         if self.args.debug:
             self.log.setLevel(logging.DEBUG)
             self.print_rows = self.args.rows
@@ -85,14 +234,47 @@ class Transformer(object):
             self.reader = csv.reader(sys.stdin, delimiter='\t')
         else:
             self.log.debug("reading from file: %s", self.args.input)
-            self.reader = csv.reader(open(self.args.input), delimiter='\t')
+            _compression = getattr(self.args, 'input_compression', None) or \
+                compression_for(self.args.input)
+            if _compression is None:
+                # plain files are memory mapped and split for the workers
+                self.reader_file = self.args.input
+                self.metrics.total_bytes = os.path.getsize(self.args.input)
+                self.reader = MMapReader(
+                    self.args.input, encoding=self.input_encoding,
+                    quoted=self.quoted, header=True)
+            else:
+                f = open_file(self.args.input, 'rb', compression=_compression)
+                self.reader = read_rows(f, encoding=self.input_encoding)
 
 
+    def _projection(self):
+        '''returns the number of columns to split, if all models only read
+        columns by position, otherwise ``None``'''
+        if self.quarantine:
+            # rejected rows are written in full, to be read again as input
+            return None
+        for m in self.models:
+            if _unbound(type(m.objects).transform) is not \
+                    _unbound(SimpleManager.transform):
+                return None
+            for f in m._meta.fields.values():
+                if f.pos < 0 and f.parse or \
+                        _unbound(type(f).scan) is not _unbound(BaseField.scan):
+                    return None
+        return self.max_pos + 1
+
     def _get_header(self):
         try:
             self.in_headers = self.reader.headers
         except AttributeError:
             self.in_headers = next(self.reader, [])
+        # resolve column names once, rows are read by position
+        for m in self.models:
+            m.resolve_columns(self.in_headers)
+        self.max_pos = max([x._meta.max_pos for x in self.models])
+        if isinstance(self.reader, MMapReader):
+            self.reader.columns = self._projection()
 
     def _open_input(self):
         if len(self.in_headers) <= self.max_pos:
@@ -103,7 +285,6 @@ class Transformer(object):
         self.log.debug("input has %d columns", len(self.in_headers))
 
     def _read_input(self):
-        self.rows = 0
         self.log.info(
             "models: %s", ", ".join([x._meta.model_name for x in self.models])
         )
@@ -116,66 +297,502 @@ class Transformer(object):
                 )
         if self.print_rows:
             self.log.debug("printing first %d rows of input", self.print_rows)
-        for row in self.reader:
-            if self.print_rows > 0:
-                self.log.debug("%d: %s", self.print_rows, row)
-                self.print_rows -= 1
-            self.rows += 1
-            res = []
-            for o in self.models:
+        if self.reader_file:
+            self.metrics.offset = max(header_offset(self.reader_file), self._offset or 0)
+        if self.workers > 1:
+            self._read_shards()
+        else:
+            scan = self._scan_row_timed if self.metrics.detail else self._scan_row
+            # checkpoints are taken before scanning the first row of a block,
+            # all rows before the offset of the block are scanned by then
+            offset = getattr(self.reader, 'offset', None)
+            last = tick = self.rows
+            for row in self.reader:
+                if self.rows >= tick:
+                    tick = self.rows + 1000
+                    self.metrics.progress(self.rows, getattr(self.reader, 'offset', None))
+                    self._write_rejects()
+                if self.checkpoint:
+                    _offset = getattr(self.reader, 'offset', None)
+                    if self.rows - last >= self.checkpoint_rows and \
+                            (_offset is None or _offset != offset):
+                        self._checkpoint(_offset)
+                        last = self.rows
+                    offset = _offset
+                if self.print_rows > 0:
+                    self.log.debug("%d: %s", self.print_rows, row)
+                    self.print_rows -= 1
                 try:
-                    scanned = o.objects.scan_row(row=row, previous=res)
-                    res.append(scanned)
+                    scan(row)
                 except DataException:
-                    if o._meta.fail_on_data_exception:
-                        self.critical("Error in data[%d]: %s", self.rows, row)
-                        sys.exit(1)
-                    self.log.warning("Error in data[%d]: %s", self.rows, row)
+                    self.log.critical("Error in data[%d]: %s", self.rows, row)
+                    sys.exit(1)
                 except:  #pylint: disable=W0702
                     self.log.critical("Uncaught exception in data: %s", row)
                     sys.exit(1)
+                if self.stream:
+                    for o in self.models:
+                        self._emit(self.outputs[o], o.objects.flush())
+        self.metrics.progress(self.rows)
+        self._write_rejects()
+        for f, _ in self._rejects.values():
+            f.close()
+        if self.errors:
+            self.log.warning("%d rows failed to scan", self.errors)
+        try:
+            self._check_errors(final=True)
+        except DataException as err:
+            self.log.critical("Error in data: %s", err)
+            sys.exit(1)
         self.log.debug("headers of input: %s", ",".join(self.in_headers))
 
+    def _check_resumable(self):
+        if not self.stream:
+            raise DefinitionException('checkpoints need streaming (--stream)')
+        for m in self.models:
+            for k, index in m.objects.unique_values.items():
+                if not getattr(index, 'resumable', True):
+                    raise DefinitionException(
+                        '%s: unique index of %s can not be checkpointed' %
+                        (m._meta.model_name, k))
+        # streamed output is truncated on resume, it should be a plain file
+        for m, output in self.outputs.items():
+            if 'session' in output or not output['emitter'].resumable or \
+                    output['file_name'] is None or compression_for(output['file_name']):
+                raise DefinitionException(
+                    '%s: streamed output can not be resumed' % m._meta.model_name)
+
+    def _checkpoint(self, offset):
+        # byte offset in the input file, or None to skip rows on resume
+        self._write_rejects()
+        for f, _ in self._rejects.values():
+            f.flush()
+        outputs = {}
+        for m, output in self.outputs.items():
+            f, nl = output['file'], output['nl']
+            for l in output['emitter'].flush():
+                f.write(l + nl)
+            f.flush()
+            outputs[m._meta.model_name] = {'position': f.tell(), 'lineno': output['lineno']}
+        state = {
+            'input': self.reader_file or getattr(self.args, 'input', None),
+            'rows': self.rows,
+            'errors': self.errors,
+            'offset': offset,
+            'models': dict([(m._meta.model_name, m.objects.checkpoint()) for m in self.models]),
+            'outputs': outputs,
+        }
+        tmp = self.checkpoint + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            os.remove(tmp)
+            raise
+        replace(tmp, self.checkpoint)
+        self.log.info("checkpoint at row %d", self.rows)
+
+    def _restore(self):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            self.log.info("no checkpoint to resume from, starting at row 0")
+            return
+        with open(self.checkpoint, 'rb') as f:
+            # the checkpoint file is given by the user, written by a previous run
+            state = pickle.load(f)  # nosec
+        if state['input'] != (self.reader_file or getattr(self.args, 'input', None)):
+            raise DefinitionException('checkpoint is for input %s' % state['input'])
+        for m in self.models:
+            m.objects.restore(state['models'][m._meta.model_name])
+        self.rows = state['rows']
+        self.errors = state.get('errors', 0)
+        self._positions = state['outputs']
+        if state['offset'] is not None:
+            self._offset = self.reader.start = state['offset']
+        else:
+            # skip the rows scanned, after the header
+            for _ in itertools.islice(self.reader, self.rows):
+                pass
+        self.log.info("resuming from checkpoint at row %d", self.rows)
+
+    def _scan_row(self, row):
+        self.rows += 1
+        res = []
+        for o in self.models:
+            try:
+                scanned = o.objects.scan_row(row=row, previous=res)
+                res.append(scanned)
+            except Exception as err:  #pylint: disable=W0703
+                self._error(o, row, err)
+        return res
+
+    def _error(self, o, row, err):
+        # a row failed to scan for model o: skip it, or count it against the
+        # error budget if the model fails on it. Uniqueness violations of
+        # fail_non_unique models always fail, as when merging shards.
+        if isinstance(err, NonUniqueDataException):
+            raise err
+        o.objects.reject("%s: %s" % (err.__class__.__name__, err), row)
+        if isinstance(err, DataException) and not o._meta.fail_on_data_exception:
+            self.log.warning("Error in data[%d]: %s", self.rows, row)
+            return
+        self.errors += 1
+        self.log.error("Error in data[%d], %s: %s, %s", self.rows,
+                       o._meta.model_name, err.__class__.__name__, err)
+        self._check_errors()
+
+    def _check_errors(self, final=False):
+        if self._shard:
+            # workers only count, the budget is checked on the merged counts
+            return
+        budget = self.max_errors
+        if isinstance(budget, float) and 0 < budget < 1:
+            if self.rows < _MIN_ROWS and not final:
+                return
+            budget = budget * self.rows
+        if self.errors > budget:
+            raise DataException("%d rows failed to scan, more than the error budget of %s" %
+                                (self.errors, self.max_errors))
+
+    def _write_rejects(self):
+        for m in self.models:
+            rejects = m.objects.rejects
+            if not rejects:
+                continue
+            if not self.outdir:
+                for n, row, reason in rejects:
+                    self.log.warning("%s: rejected row %s, %s: %s", m._meta.model_name, n, reason, row)
+            else:
+                if m not in self._rejects:
+                    self._rejects[m] = self._open_rejects(m)
+                self._rejects[m][1].writerows(
+                    [["" if n is None else n, reason] + list(row or []) for n, row, reason in rejects])
+            del rejects[:]
+
+    def _open_rejects(self, m):
+        _filename = os.path.normpath(
+            self.outdir + "/" + m._meta.table_name + ".rejects.tsv")
+        self.log.info("Writing rejects to %s", _filename)
+        # resumed transformations add to the rejects before the checkpoint
+        exists = self.resume and os.path.exists(_filename)
+        f = open_file(_filename, "a" if exists else "w", encoding=self.encoding, newline='')
+        writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+        if not exists:
+            writer.writerow(['row', 'reason'] + list(self.in_headers))
+        return f, writer
+
+    def _scan_row_timed(self, row):
+        # _scan_row timing every model, and every field of sampled rows. The
+        # fields are timed by a timed scan function, so every field is
+        # scanned once, as without timing
+        self.rows += 1
+        res = []
+        metrics = self.metrics
+        sampled = not self.rows % metrics.sample
+        for o in self.models:
+            if sampled:
+                scan, o._scan = _unbound(o._scan), self._timed_scan(o)
+                self._timed = None
+            t = clock()
+            try:
+                scanned = o.objects.scan_row(row=row, previous=res)
+                res.append(scanned)
+            except Exception as err:  #pylint: disable=W0703
+                self._error(o, row, err)
+            finally:
+                if sampled:
+                    o._scan = scan
+            metrics.add('scan.' + o._meta.model_name, clock() - t)
+            if sampled and self._timed is not None:
+                for k in list(o._meta.fields)[self._timed:]:
+                    self._field_error("%s.%s" % (o._meta.model_name, k))
+        return res
+
+    def _timed_scan(self, o):
+        # scan function of model o timing its fields, generated once
+        scan = self._timed_scans.get(o)
+        if scan is None:
+            scan = self._timed_scans[o] = compile_scan(
+                o._meta, self._field_timer(o, 'parse'))
+        return scan
+
+    def _timed_emit(self, m, values):
+        # emit function timing the fields of every sample-th object, the
+        # others are emitted by the emit function of the emitter
+        timed = compile_emit(m._meta, values.keys, values.escaper,
+                             self._field_timer(m, 'emit'))
+        n, count = self.metrics.sample, itertools.count(1)
+
+        def emit(o):
+            if next(count) % n:
+                return values(o)
+            return timed(o)
+        emit.names, emit.keys, emit.escaper = values.names, values.keys, values.escaper
+        return emit
+
+    def _field_timer(self, m, phase):
+        # timer of the generated functions, adds the time of a field to the
+        # metrics and counts the fields timed in _timed
+        prefix = m._meta.model_name + '.'
+
+        def timer(k, start):
+            if k is None:
+                self._timed = 0
+            else:
+                self.metrics.add_field(prefix + k, phase,
+                                       (clock() - start) * self.metrics.sample)
+                self._timed += 1
+            return clock()
+        return timer
+
+    def _shards(self):
+        # input files are split in byte ranges, all other input in chunks
+        if self.reader_file:
+            offset = max(header_offset(self.reader_file), self._offset or 0)
+            shards = (('range', start, end) for start, end in
+                      self.reader.ranges(self.workers * 4, offset))
+        else:
+            rows = iter(self.reader)
+            shards = (('rows', chunk) for chunk in iter(
+                lambda: list(itertools.islice(rows, self.chunk_size)), []))
+        for shard in shards:
+            self._pending.acquire()
+            if not self._scanning:
+                return
+            yield shard
+
+    def _read_shards(self):
+        global _WORKER
+        self.log.info("scanning with %d workers", self.workers)
+        _WORKER = self
+        # limit the shards read ahead and waiting to be merged
+        self._pending = threading.Semaphore(self.workers * 2)
+        self._scanning = True
+        # flush pending output, otherwise it is duplicated in the workers
+        sys.stdout.flush()
+        for output in self.outputs.values():
+            if 'file' in output:
+                output['file'].flush()
+        # workers profile their shards, they should not inherit the profile
+        with self.profiler.paused():
+            pool = _fork_context().Pool(self.workers)
+        try:
+            last = self.rows
+            for end, rows, states, metrics, profile, errors in pool.imap(
+                    _scan_shard, self._shards()):
+                self._pending.release()
+                self.rows += rows
+                self.errors += errors
+                self.metrics.merge(metrics)
+                if profile:
+                    self.profiler.add('read', profile)
+                self.metrics.progress(self.rows, end)
+                for o, state in zip(self.models, states):
+                    o.objects.merge(state)
+                    if self.stream:
+                        self._emit(self.outputs[o], o.objects.flush())
+                self._write_rejects()
+                self._check_errors()
+                if self.checkpoint and self.rows - last >= self.checkpoint_rows:
+                    self._checkpoint(end)
+                    last = self.rows
+        except DataException as err:
+            self.log.critical("Error in data: %s", err)
+            sys.exit(1)
+        except Exception as err:  #pylint: disable=W0703
+            self.log.critical("Uncaught exception in data: %s", err)
+            sys.exit(1)
+        finally:
+            # release the shard generator if it is waiting
+            self._scanning = False
+            for _ in range(self.workers * 2):
+                self._pending.release()
+            pool.terminate()
+            _WORKER = None
+
+    def _scan_shard(self, shard):
+        # runs in a worker: scan with fresh managers without uniqueness
+        # checks, these are done by the main process while merging
+        for o in self.models:
+            manager = o.objects.__class__()
+            manager._prepare(o)
+            manager.unique_values = {}
+            if o.objects.rejects is not None:
+                manager.rejects, manager.sources = [], []
+            o.objects = manager
+        self.metrics = Metrics(detail=self.metrics.detail, sample=self.metrics.sample)
+        scan = self._scan_row_timed if self.metrics.detail else self._scan_row
+        if shard[0] == 'range':
+            rows = MMapReader(self.reader_file, shard[1], shard[2],
+                              encoding=self.input_encoding, quoted=self.quoted,
+                              columns=self.reader.columns)
+            end = shard[2]
+        else:
+            rows = shard[1]
+            end = None
+        self.rows = self.errors = 0
+        self._shard = True
+        self.profiler = Profiler(enabled=self.profiler.enabled)
+        with self.profiler.phase('read'):
+            for row in rows:
+                try:
+                    scan(row)
+                except DataException as err:
+                    raise DataException("%s, row %r" % (err, row))
+        profile = self.profiler.phases.get('read')
+        return end, self.rows, [o.objects.state() for o in self.models], \
+            self.metrics.state(), profile and profile.stats, self.errors
+
     def _write_output(self):
+        if self.loader and not self.stream:
+            # independent models first, no other model depends on these
+            self.loader.map(self._load_output,
+                            [m for m in self.models if m._meta.independent])
+            for m in self.models:
+                if not m._meta.independent:
+                    self._load_output(m)
+            self.loader.pool.close()
+            return
         for m in self.models:
-            _emitter = (
-                getattr(m._meta, 'emitter', self.emitter) or
-                self.emitter
-            )(manager=m.objects)
-            f, file_name = self._filehandle(_emitter)
-            self.log.debug(
-                '%s: stats %s', m._meta.model_name, ", ".join(
-                    ["%s=%d" % (k, v) for k, v in m.objects.stats().items()]
-                )
+            if self.stream:
+                output = self.outputs[m]
+            else:
+                output = self._open_output(m)
+                self._emit(output, m.objects.all())
+            self._close_output(output)
+        if self.loader:
+            self.loader.pool.close()
+
+    def _load_output(self, m):
+        output = self._open_output(m)
+        self._emit(output, m.objects.all())
+        self._close_output(output)
+
+    def _open_output(self, m):
+        if self.loader:
+            return {'session': self.loader.open(m), 'model': m, 'lineno': 0}
+        _emitter = (
+            getattr(m._meta, 'emitter', self.emitter) or
+            self.emitter
+        )(manager=m.objects, stats_trailer=self.stream)
+        _emitter.encoding = self.encoding
+        if self.metrics.detail and hasattr(_emitter, '_values'):
+            _emitter._values = self._timed_emit(m, _emitter._values)
+        position = self._positions.get(m._meta.model_name)
+        f, file_name = self._filehandle(_emitter, position)
+        # binary emitters output bytes without line endings
+        nl = b'' if _emitter.binary else '\n'
+        if position:
+            return {'emitter': _emitter, 'file': f, 'file_name': file_name,
+                    'model': m, 'lineno': position['lineno'], 'nl': nl}
+        for l in _emitter.preamble(headers=self.in_headers):
+            f.write(l + nl)
+        return {'emitter': _emitter, 'file': f, 'file_name': file_name,
+                'model': m, 'lineno': 0, 'nl': nl}
+
+    def _emit(self, output, objects):
+        if not self.metrics.detail:
+            return self._emit_objects(output, objects)
+        t = clock()
+        try:
+            return self._emit_objects(output, objects)
+        finally:
+            self.metrics.add('emit.' + output['model']._meta.model_name, clock() - t)
+
+    def _emit_objects(self, output, objects):
+        if 'session' in output:
+            output['lineno'] += output['session'].load(objects)
+            return
+        _emitter, f, nl = output['emitter'], output['file'], output['nl']
+        objects = iter(objects)
+        for chunk in iter(lambda: list(itertools.islice(objects, self.chunk_size)), []):
+            try:
+                lines = _emitter.emit_many(chunk)
+                if lines:
+                    f.write(nl.join(lines))
+                    f.write(nl)
+            except AssertionError as err:
+                raise ValidationException(
+                    "object: %d, %s" % (output['lineno'], err))
+            output['lineno'] += len(chunk)
+
+    def _field_error(self, name):
+        self.metrics.field_errors += 1
+        self.log.debug("metrics: %s not timed, the row failed to scan", name)
+
+    def _report(self):
+        d = self.metrics.as_dict()
+        self.log.info(
+            "metrics: %d rows in %.1fs, %.0f rows/s, stages %s", d['rows'],
+            d['elapsed'], d['rows_per_second'], ", ".join(
+                ["%s=%.3fs" % x for x in self.metrics.stages.items()]))
+        if d['field_errors']:
+            self.log.info("metrics: %d sampled fields failed, not timed", d['field_errors'])
+        if d['peak_rss']:
+            self.log.info("metrics: peak rss %.1f MB", d['peak_rss'] / 1048576.0)
+        if self.metrics_file:
+            self.log.info("Writing metrics to %s", self.metrics_file)
+            self.metrics.dump(self.metrics_file)
+        if self.profiler.phases:
+            self.profiler.report(self.models)
+            if self.outdir:
+                for filename in self.profiler.dump(self.outdir):
+                    self.log.info("Writing profile %s", filename)
+
+    def _close_output(self, output):
+        m, f = output['model'], output.get('file')
+        self.log.debug(
+            '%s: stats %s', m._meta.model_name, ", ".join(
+                ["%s=%s" % (k, v) for k, v in m.objects.stats().items()]
             )
-            for l in _emitter.preamble(headers=self.in_headers):
-                f.write(l + '\n')
-            lineno = 0
-            for l in m.objects.all():
-                try:
-                    _out = _emitter.emit(l)
-                    for x in _out:
-                        f.write(x+'\n')
-                except AssertionError as err:
-                    raise ValidationException("object: %d, %s" % (lineno, err))
-                lineno += 1
-            for l in _emitter.postamble():
-                f.write(l + '\n')
-            if f != sys.stdout:
-                self.log.info("Closing file %s", file_name)
+        )
+        if 'session' in output:
+            output['session'].close()
+        else:
+            for l in output['emitter'].postamble():
+                f.write(l + output['nl'])
+            if output['file_name'] is not None:
+                self.log.info("Closing file %s", output['file_name'])
                 f.close()
-            self.log.info(
-                "%s: %d records emitted",
-                m._meta.model_name, len(m.objects)
-            )
+            self._write_control(output['emitter'])
+        self.log.info(
+            "%s: %d records emitted",
+            m._meta.model_name, output['lineno']
+        )
+
+    def _write_control(self, e):
+        for name, lines in e.control_files(headers=self.in_headers).items():
+            if not self.outdir:
+                self.log.warning('%s: no output dir, not writing %s',
+                                 e.meta.model_name, name)
+                continue
+            _filename = os.path.normpath(self.outdir + "/" + name)
+            self.log.info("Writing control file %s", _filename)
+            with open_file(_filename, "w", encoding=self.encoding) as f:
+                for l in lines:
+                    f.write(l + '\n')
 
-    def _filehandle(self, e):
+    def _filehandle(self, e, position=None):
+        _filename = None
         if self.outdir:
             _filename = e.filename()
+            if self.compression and compression_for(_filename) is None:
+                _filename += EXTENSIONS[self.compression]
+            if not e.compressible and compression_for(_filename):
+                raise DefinitionException(
+                    '%s: output can not be compressed' % e.meta.model_name)
             _filename = os.path.normpath(self.outdir + "/" + _filename)
             self.log.debug('%s: opening %r', e.meta.model_name, _filename)
-            f = open(_filename, "w")
+            mode = "wb" if e.binary else "w"
+            if position:
+                # continue after the checkpoint
+                with open(_filename, 'r+b') as f:
+                    f.truncate(position['position'])
+                mode = mode.replace('w', 'a')
+            f = open_file(
+                _filename, mode,
+                encoding=None if e.binary else self.encoding,
+                buffering=self.buffer_size, threads=self.compress_threads)
         else:
-            self.log.debug('%s: writing to stdout', e._meta.model_name)
-            f = sys.stdout
+            self.log.debug('%s: writing to stdout', e.meta.model_name)
+            f = getattr(sys.stdout, 'buffer', sys.stdout) if e.binary else sys.stdout
         return f, _filename
@@ -2,15 +2,17 @@
 # -*- coding: UTF-8 -*-
 
 from .compat import isstr
-from .sql import sql_escape
+from .sql import sql_escape, mysql_tsv_escape, pg_copy_escape
 from .log import configure_logging, default_logger
 from .argparser import configure_parser, default_parser
 from .csv import flatten, unflatten
+from .cache import LRUCache
 
 __all__ = [
     'isstr',
-    'sql_escape',
+    'sql_escape', 'mysql_tsv_escape', 'pg_copy_escape',
     'configure_logging', 'default_logger',
     'configure_parser', 'default_parser',
-    'flatten', 'unflatten'
+    'flatten', 'unflatten',
+    'LRUCache',
 ]
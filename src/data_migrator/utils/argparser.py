@@ -5,15 +5,30 @@ import argparse
 _PARSER = None
 
 
+def error_budget(v):
+    '''parse an error budget: a number of rows, or a fraction between 0 and 1'''
+    if v.strip().isdigit():
+        return int(v)
+    try:
+        fraction = float(v)
+    except ValueError:
+        fraction = None
+    if fraction is None or not 0 < fraction < 1:
+        raise argparse.ArgumentTypeError(
+            "%r is not a number of rows or a fraction between 0 and 1" % v)
+    return fraction
+
+
 def default_parser():
     return _PARSER
 
 
 def configure_parser(args=None, description=None):
     global _PARSER
-    if not _PARSER:
-        description = description or 'Basic Transformer parser'
-        _PARSER = argparse.ArgumentParser(description=description)
+    if _PARSER:
+        return _PARSER
+    description = description or 'Basic Transformer parser'
+    _PARSER = argparse.ArgumentParser(description=description)
 
     _PARSER.add_argument('-o', '--outdir', default='results',
             help='output directory')
@@ -25,4 +40,38 @@ def configure_parser(args=None, description=None):
             help='quiet mode, no output')
     _PARSER.add_argument('-p', '--rows', default=0, type=int,
             help='input rows to print')
+    _PARSER.add_argument('--stream', action='store_true',
+            help='emit objects while scanning, do not keep them in memory')
+    _PARSER.add_argument('--workers', default=1, type=int,
+            help='number of processes to scan the input with')
+    _PARSER.add_argument('--encoding', default=None,
+            help='encoding of the output files, default utf-8')
+    _PARSER.add_argument('--input-encoding', default=None,
+            help='encoding of the input file, default utf-8')
+    _PARSER.add_argument('--buffer-size', default=None, type=int,
+            help='write buffer size of the output files in bytes')
+    _PARSER.add_argument('--compress', default=None,
+            choices=['gzip', 'bz2', 'xz', 'zstd'],
+            help='compress the output files')
+    _PARSER.add_argument('--compress-threads', default=None, type=int,
+            help='number of threads to compress the output with')
+    _PARSER.add_argument('--input-compression', default=None,
+            choices=['gzip', 'bz2', 'xz', 'zstd'],
+            help='compression of the input file, default by extension')
+    _PARSER.add_argument('--unquoted', action='store_true',
+            help='input has no quoted fields, split lines on tabs directly')
+    _PARSER.add_argument('--checkpoint', default=None,
+            help='file to write checkpoints to while streaming (--stream)')
+    _PARSER.add_argument('--checkpoint-rows', default=None, type=int,
+            help='input rows between checkpoints')
+    _PARSER.add_argument('--resume', action='store_true',
+            help='resume from the checkpoint file if it exists')
+    _PARSER.add_argument('--metrics', default=None,
+            help='write timing metrics to this file, JSON or Prometheus (.prom)')
+    _PARSER.add_argument('--profile', action='store_true',
+            help='profile the read and write phases, stats written to outdir')
+    _PARSER.add_argument('--quarantine', action='store_true',
+            help='write dropped and failed rows to a reject file per model')
+    _PARSER.add_argument('--max-errors', default=None, type=error_budget,
+            help='rows that may fail to scan, a number or a fraction between 0 and 1')
     return _PARSER
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""bounded caches for memoisation of expensive functions"""
+
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    '''size bounded, least recently used cache with hit statistics
+
+        >>> c = LRUCache(maxsize=2)
+        >>> c['a'] = 1
+        >>> c.get('a'), c.get('b')
+        (1, None)
+        >>> c.hits, c.misses
+        (1, 1)
+
+    Attributes:
+        maxsize (int): maximum number of entries, least recently used entries
+            are removed first
+        hits (int): number of successful lookups
+        misses (int): number of failed lookups
+    '''
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        '''lookup key, counts as hit or miss'''
+        # pop and reinsert to mark as recently used, move_to_end is python 3
+        v = self._data.pop(key, _MISSING)
+        if v is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data[key] = v
+        return v
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def hit_ratio(self):
+        '''returns the fraction of lookups that were hits'''
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
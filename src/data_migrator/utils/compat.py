@@ -2,6 +2,7 @@
 # -*- coding: UTF-8 -*-
 """helper functions for py2 -> p3 compat"""
 
+import os
 import random
 import bisect as _bisect
 from functools import reduce
@@ -14,6 +15,13 @@ def isstr(s):
         return isinstance(s, str)
 
 
+def replace(src, dst):
+    '''rename src to dst, replacing dst if it exists, as python 3 os.replace.
+
+    On python 2 this is os.rename, which replaces dst on posix only.'''
+    return getattr(os, 'replace', os.rename)(src, dst)
+
+
 def choices(population, weights=None, cum_weights=None, k=1):
     """Return a k sized list of population elements chosen with replacement.
     If the relative weights or cumulative weights are not specified,
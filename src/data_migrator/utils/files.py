@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""helper functions to open plain and compressed files
+
+Compression is detected from the file extension: ``.gz``, ``.bz2``, ``.xz``
+and ``.zst``. The ``zstd`` compression needs the ``zstandard`` package, the
+``xz`` and ``bz2`` files need python 3.
+Output can be compressed by multiple threads, the data is compressed in
+blocks that are written as separate members (gzip, bz2), streams (xz) or
+frames (zstd). Concatenated members are valid files for all these formats.
+"""
+
+import io
+import os
+import bz2
+import gzip
+from multiprocessing.pool import ThreadPool
+
+from data_migrator.exceptions import DefinitionException
+
+EXTENSIONS = {
+    'gzip': '.gz',
+    'bz2': '.bz2',
+    'xz': '.xz',
+    'zstd': '.zst',
+}
+
+
+def _lzma():
+    try:
+        import lzma
+    except ImportError:
+        raise DefinitionException('xz compression needs lzma (python 3)')
+    return lzma
+
+
+def _gzip_compress(b, level):
+    # gzip.compress is python 3 only
+    out = io.BytesIO()
+    with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=level) as f:
+        f.write(b)
+    return out.getvalue()
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise DefinitionException('zstd compression needs zstandard')
+    return zstandard
+
+
+def compression_for(filename):
+    '''returns the compression of a file by its extension, or ``None``'''
+    ext = os.path.splitext(filename)[1].lower()
+    for k, v in EXTENSIONS.items():
+        if ext == v:
+            return k
+    return None
+
+
+def _compressor(compression, level=None):
+    # function compressing a block into a complete member/stream/frame
+    if compression == 'gzip':
+        return lambda b: _gzip_compress(b, 6 if level is None else level)
+    elif compression == 'bz2':
+        return lambda b: bz2.compress(b, 9 if level is None else level)
+    elif compression == 'xz':
+        lzma = _lzma()
+        return lambda b: lzma.compress(b, preset=level)
+    elif compression == 'zstd':
+        c = _zstandard().ZstdCompressor(level=3 if level is None else level)
+        return c.compress
+    raise DefinitionException('unknown compression %s' % compression)
+
+
+def _open_raw(filename, mode, compression, level=None):
+    # binary file object for reading or writing with compression
+    if compression is None:
+        return io.open(filename, mode)
+    elif compression == 'gzip':
+        return gzip.open(filename, mode, 6 if level is None else level)
+    elif compression == 'bz2':
+        if not hasattr(bz2, 'open'):
+            # python 2 BZ2File is no io object and reads the first stream only
+            raise DefinitionException('bz2 files need python 3')
+        return bz2.open(filename, mode, 9 if level is None else level)
+    elif compression == 'xz':
+        return _lzma().open(filename, mode, preset=level if 'w' in mode else None)
+    elif compression == 'zstd':
+        z = _zstandard()
+        if 'w' in mode:
+            c = z.ZstdCompressor(level=3 if level is None else level)
+            return c.stream_writer(io.open(filename, mode))
+        return z.ZstdDecompressor().stream_reader(io.open(filename, mode))
+    raise DefinitionException('unknown compression %s' % compression)
+
+
+class _TextWriter(io.TextIOWrapper):
+    # python 2 emitters and csv writers return str, taken as encoded already
+    def write(self, s):
+        if isinstance(s, bytes):
+            s = s.decode(self.encoding)
+        return super(_TextWriter, self).write(s)
+
+
+_TextIO = io.TextIOWrapper if bytes is not str else _TextWriter
+
+
+class BlockCompressor(io.RawIOBase):
+    '''writer compressing blocks of data in parallel
+
+    Blocks are compressed by a pool of threads and written in order. The
+    compression libraries release the GIL, so this scales with the threads.
+
+    Args:
+        f: binary file to write the compressed data to
+        compression (str): gzip, bz2, xz or zstd
+        threads (int): number of compressing threads
+        block_size (int): uncompressed bytes per block
+        level (int): compression level
+    '''
+
+    def __init__(self, f, compression, threads=4, block_size=1024 * 1024,
+                 level=None):
+        super(BlockCompressor, self).__init__()
+        self.file = f
+        self.block_size = block_size
+        self.threads = threads
+        self._compress = _compressor(compression, level)
+        self._pool = ThreadPool(threads)
+        self._buffer = bytearray()
+        self._pending = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buffer += b
+        while len(self._buffer) >= self.block_size:
+            self._submit(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+        return len(b)
+
+    def _submit(self, block):
+        self._pending.append(self._pool.apply_async(self._compress, (block,)))
+        # limit the blocks in memory, write the oldest when done
+        while len(self._pending) > 2 * self.threads:
+            self.file.write(self._pending.pop(0).get())
+
+    def flush(self):
+        '''compress and write all data written so far'''
+        if self.closed:
+            return
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        while self._pending:
+            self.file.write(self._pending.pop(0).get())
+        self.file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            # flushes the remaining blocks
+            super(BlockCompressor, self).close()
+        finally:
+            self._pool.terminate()
+            self.file.close()
+
+
+def open_file(filename, mode='r', encoding=None, compression='infer',
+              buffering=-1, threads=1, level=None, newline=None):
+    '''open a plain or compressed file.
+
+    Args:
+        filename: file to open
+        mode (str): ``r``, ``w``, ``rb`` or ``wb``, uncompressed files can
+            also be opened with ``a`` or ``ab``
+        encoding (str): encoding for text modes
+        compression (str): ``infer`` to detect it from the extension, ``None``
+            or one of gzip, bz2, xz and zstd
+        buffering (int): buffer size
+        threads (int): threads to compress output with, if more than one the
+            output is compressed in blocks by a :class:`BlockCompressor`
+        level (int): compression level
+        newline: newline handling for text modes, see :func:`io.open`
+
+    Returns:
+        file object
+    '''
+    if compression == 'infer':
+        compression = compression_for(filename)
+    binary = 'b' in mode
+    if compression is None:
+        if binary:
+            return io.open(filename, mode, buffering=buffering)
+        if _TextIO is io.TextIOWrapper or 'r' in mode:
+            return io.open(filename, mode, buffering=buffering, encoding=encoding,
+                           newline=newline)
+        return _TextIO(io.open(filename, mode + 'b', buffering=buffering),
+                       encoding=encoding, newline=newline)
+    raw_mode = mode.replace('b', '') + 'b'
+    if 'w' in mode and threads > 1:
+        f = BlockCompressor(io.open(filename, raw_mode), compression,
+                            threads=threads, level=level)
+    else:
+        f = _open_raw(filename, raw_mode, compression, level)
+    # python 2 GzipFile has no working read1, needed by TextIOWrapper
+    if buffering > 0 or not isinstance(f, io.BufferedIOBase) or bytes is str:
+        if 'w' in mode:
+            f = io.BufferedWriter(f, buffering if buffering > 0 else io.DEFAULT_BUFFER_SIZE)
+        else:
+            f = io.BufferedReader(f, buffering if buffering > 0 else io.DEFAULT_BUFFER_SIZE)
+    if binary:
+        return f
+    return _TextIO(f, encoding=encoding, newline=newline)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Timing and throughput metrics of a transformation.
+
+The :class:`~.Transformer` records the wall time of every stage, the input
+rows and bytes read and the peak memory use in a :class:`Metrics` object.
+While scanning progress is logged periodically, with an ETA if the size of
+the input is known. At the end the metrics are available as a dict and can be
+dumped as JSON or as a Prometheus textfile (``--metrics``).
+"""
+
+import sys
+import json
+import contextlib
+from collections import OrderedDict
+from timeit import default_timer as clock
+
+from .compat import replace
+from .log import default_logger
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+log = default_logger()
+
+
+def peak_rss():
+    '''returns the peak resident memory of this process and its children in
+    bytes, ``None`` if not available on this platform'''
+    if resource is None:
+        return None
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # linux reports kilobytes, macOS bytes
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def _duration(seconds):
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return "%d:%02d:%02d" % (h, m, s)
+
+
+class Metrics(object):
+    '''wall time per stage, throughput and peak memory of a transformation.
+
+    Stages are named and can be nested, e.g. the emit time of a model in
+    stream mode is part of the ``read`` stage. Timing per field is estimated
+    by timing the fields while scanning and emitting every ``sample``-th row
+    and object.
+
+        >>> metrics = Metrics()
+        >>> with metrics.stage('read'):
+        ...     pass
+        >>> sorted(metrics.as_dict()['stages'])
+        ['read']
+
+    Args:
+        total_bytes (int): size of the input, to compute progress and ETA
+        detail (boolean): time the scan per model and the parse and emit per
+            field, this costs some throughput
+        sample (int): time the fields of one in ``sample`` rows and objects
+        interval (float): seconds between progress log lines
+
+    Attributes:
+        offset (int): position the input is read from, by default the first
+            position passed to :meth:`progress`
+        stages (dict): seconds per stage
+        fields (dict): seconds per ``model.field`` and phase (``parse`` or
+            ``emit``)
+        rows (int): input rows read
+        bytes (int): input bytes read
+        field_errors (int): fields of sampled rows that failed to scan, these
+            fields are not timed
+    '''
+
+    def __init__(self, total_bytes=None, detail=False, sample=100, interval=30.0):
+        self.total_bytes = total_bytes
+        self.detail = detail
+        self.sample = sample
+        self.interval = interval
+        self.stages = OrderedDict()
+        self.fields = OrderedDict()
+        self.rows = 0
+        self.bytes = 0
+        self.field_errors = 0
+        self.start = clock()
+        self.offset = None
+        self._logged = self.start
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        '''context manager adding the wall time of the block to stage ``name``'''
+        t = clock()
+        try:
+            yield
+        finally:
+            self.add(name, clock() - t)
+
+    def add(self, name, seconds):
+        '''add seconds to stage ``name``'''
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_field(self, name, phase, seconds):
+        '''add seconds to phase ``parse`` or ``emit`` of field ``name``'''
+        f = self.fields.setdefault(name, {'parse': 0.0, 'emit': 0.0})
+        f[phase] += seconds
+
+    def progress(self, rows, position=None):
+        '''record the rows read and the position in the input.
+
+        Logs a progress line if ``interval`` seconds have passed since the
+        previous line.
+
+        Args:
+            rows (int): total rows read
+            position (int): byte position in the input, if known
+        '''
+        self.rows = rows
+        if position is not None:
+            if self.offset is None:
+                self.offset = position
+            self.bytes = position - self.offset
+        now = clock()
+        if now - self._logged < self.interval:
+            return
+        self._logged = now
+        elapsed = now - self.start
+        line = "%d rows, %.0f rows/s" % (rows, rows / elapsed)
+        if position is not None:
+            rate = self.bytes / elapsed
+            line += ", %.1f MB/s" % (rate / 1048576.0)
+            if self.total_bytes and rate:
+                line += ", %.1f%%, ETA %s" % (
+                    100.0 * position / self.total_bytes,
+                    _duration((self.total_bytes - position) / rate))
+        log.info("progress: %s", line)
+
+    def state(self):
+        '''return the stage and field times, to be merged by :meth:`merge`'''
+        return {'stages': dict(self.stages), 'fields': dict(self.fields),
+                'field_errors': self.field_errors}
+
+    def merge(self, state):
+        '''add the stage and field times of another, e.g. a worker'''
+        for k, v in state['stages'].items():
+            self.add(k, v)
+        for k, phases in state['fields'].items():
+            for phase, v in phases.items():
+                self.add_field(k, phase, v)
+        self.field_errors += state.get('field_errors', 0)
+
+    def as_dict(self):
+        '''return all metrics as a dict'''
+        elapsed = clock() - self.start
+        return {
+            'elapsed': round(elapsed, 6),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'rows_per_second': round(self.rows / elapsed, 1) if elapsed else 0.0,
+            'bytes_per_second': round(self.bytes / elapsed, 1) if elapsed else 0.0,
+            'peak_rss': peak_rss(),
+            'stages': dict([(k, round(v, 6)) for k, v in self.stages.items()]),
+            'fields': dict([
+                (k, dict([(p, round(v, 6)) for p, v in phases.items()]))
+                for k, phases in self.fields.items()]),
+            'field_errors': self.field_errors,
+        }
+
+    def prometheus(self, prefix='data_migrator'):
+        '''return the metrics in the Prometheus text format'''
+        d = self.as_dict()
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append("# HELP %s_%s %s" % (prefix, name, help_text))
+            lines.append("# TYPE %s_%s gauge" % (prefix, name))
+            for labels, v in samples:
+                if v is None:
+                    continue
+                labels = ",".join(['%s="%s"' % x for x in labels])
+                lines.append("%s_%s%s %s" % (
+                    prefix, name, "{%s}" % labels if labels else "", v))
+
+        metric('elapsed_seconds', 'wall time of the transformation', [((), d['elapsed'])])
+        metric('input_rows', 'input rows read', [((), d['rows'])])
+        metric('input_bytes', 'input bytes read', [((), d['bytes'])])
+        metric('rows_per_second', 'input rows per second', [((), d['rows_per_second'])])
+        metric('bytes_per_second', 'input bytes per second', [((), d['bytes_per_second'])])
+        metric('peak_rss_bytes', 'peak resident memory', [((), d['peak_rss'])])
+        metric('stage_seconds', 'wall time per stage',
+               [((('stage', k),), v) for k, v in sorted(d['stages'].items())])
+        samples = []
+        for k, phases in sorted(d['fields'].items()):
+            model, field = k.split('.', 1)
+            for phase, v in sorted(phases.items()):
+                samples.append(((('model', model), ('field', field), ('phase', phase)), v))
+        metric('field_seconds', 'estimated time per field', samples)
+        metric('field_errors', 'sampled fields that failed to time', [((), d['field_errors'])])
+        return "\n".join(lines) + "\n"
+
+    def dump(self, filename):
+        '''write the metrics to a file, in the Prometheus text format if the
+        extension is ``.prom``, otherwise as JSON.
+
+        The file is replaced at once, as expected by the textfile collector.
+        '''
+        if filename.endswith('.prom'):
+            data = self.prometheus()
+        else:
+            data = json.dumps(self.as_dict(), indent=2, sort_keys=True) + "\n"
+        tmp = filename + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(data)
+        replace(tmp, filename)
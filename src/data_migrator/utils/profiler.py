@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Profiling of the phases of a transformation.
+
+With ``--profile`` the :class:`~.Transformer` runs the read (scan) and write
+(emit) phases under :mod:`cProfile`. The statistics of every phase are written
+as ``profile_<phase>.pstats`` to the output directory, to be inspected with
+:mod:`pstats` or tools like snakeviz. A table of the hot spots is logged, with
+the generated scan and emit functions and the parse, validate, anonymize and
+replace callables attributed to the model and field they belong to.
+"""
+
+import os
+import cProfile
+import pstats
+import contextlib
+
+from .log import default_logger
+
+log = default_logger()
+
+# per field callables, by attribute of the field
+_CALLABLES = ['parse', 'validate', 'validate_output', 'anonymize', 'replace']
+# field methods, shared by all fields of a class
+_METHODS = ['scan', 'emit', '_value']
+
+
+class _Collected(object):
+    # raw stats of a worker, loadable by pstats.Stats
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _code_key(fn):
+    '''returns the pstats key of a python callable, ``None`` for builtins'''
+    fn = getattr(fn, 'func', fn)  # functools.partial
+    fn = getattr(fn, '__func__', fn)  # bound methods
+    code = getattr(fn, '__code__', None)
+    if code is None and not isinstance(fn, type):
+        code = getattr(getattr(type(fn), '__call__', None), '__code__', None)
+    if code is None:
+        return None
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def labels(models):
+    '''map the pstats keys of the callables of models to readable labels.
+
+    Args:
+        models (list): models to label the callables of
+
+    Returns:
+        dict: ``(filename, line, name)`` to label, like ``Model.field parse``.
+        Callables shared by fields have the labels of these fields.
+    '''
+    res = {}
+
+    def add(key, label):
+        if key is not None and label not in res.setdefault(key, []):
+            res[key].append(label)
+
+    for m in models:
+        name = m._meta.model_name
+        for k, f in m._meta.fields.items():
+            for attr in _CALLABLES:
+                fn = getattr(f, attr, None)
+                if callable(fn):
+                    add(_code_key(fn), "%s.%s %s" % (name, k, attr))
+            for attr in _METHODS:
+                method = getattr(type(f), attr, None)
+                if method is not None:
+                    add(_code_key(method), "%s.%s %s" % (name, k, attr.strip('_')))
+        # generated functions are compiled with the model name as filename
+        for kind in ['scan', 'emit']:
+            add(("<%s %s>" % (kind, name), 1, kind), "%s %s (generated)" % (name, kind))
+    return dict([(k, ", ".join(v[:3]) + (" and %d more" % (len(v) - 3) if len(v) > 3 else ""))
+                 for k, v in res.items()])
+
+
+class Profiler(object):
+    '''profile named phases with :mod:`cProfile`.
+
+        >>> profiler = Profiler(enabled=False)
+        >>> with profiler.phase('read'):
+        ...     pass
+        >>> profiler.phases
+        {}
+
+    Args:
+        enabled (boolean): if ``False`` phases are not profiled
+        top (int): number of hot spots to report
+
+    Attributes:
+        phases (dict): :class:`pstats.Stats` per phase
+    '''
+
+    def __init__(self, enabled=True, top=20):
+        self.enabled = enabled
+        self.top = top
+        self.phases = {}
+        self._active = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''context manager profiling the block as phase ``name``'''
+        if not self.enabled:
+            yield
+            return
+        profile = self._active = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._active = None
+            self._add(name, profile)
+
+    @contextlib.contextmanager
+    def paused(self):
+        '''context manager pausing the active phase, e.g. to fork workers that
+        profile themselves'''
+        profile = self._active
+        if profile is not None:
+            profile.disable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.enable()
+
+    def _add(self, name, profile):
+        if name in self.phases:
+            self.phases[name].add(profile)
+        else:
+            self.phases[name] = pstats.Stats(profile)
+
+    def add(self, name, stats):
+        '''add the raw ``stats`` dict of a :class:`pstats.Stats`, e.g. of a
+        worker, to phase ``name``'''
+        self._add(name, _Collected(stats))
+
+    def dump(self, outdir):
+        '''write the stats of every phase to ``profile_<phase>.pstats``
+
+        Returns:
+            list of the files written
+        '''
+        res = []
+        for name, stats in sorted(self.phases.items()):
+            filename = os.path.normpath(os.path.join(outdir, "profile_%s.pstats" % name))
+            stats.dump_stats(filename)
+            res.append(filename)
+        return res
+
+    def hotspots(self, models, top=None):
+        '''returns the callables of models that used the most time.
+
+        Args:
+            models (list): models to attribute the callables to
+            top (int): number of hot spots, default :attr:`top`
+
+        Returns:
+            list of ``(phase, label, calls, tottime, cumtime)``, by cumulative
+            time
+        '''
+        names = labels(models)
+        res = []
+        for phase, stats in self.phases.items():
+            for key, (_, calls, tottime, cumtime, _) in stats.stats.items():
+                if key in names:
+                    res.append((phase, names[key], calls, tottime, cumtime))
+        res.sort(key=lambda x: -x[4])
+        return res[:top or self.top]
+
+    def report(self, models):
+        '''log the table of hot spots of models'''
+        spots = self.hotspots(models)
+        if not spots:
+            return
+        log.info("profile: %-6s %10s %10s %10s  %s", "phase", "calls", "tottime", "cumtime", "callable")
+        for phase, label, calls, tottime, cumtime in spots:
+            log.info("profile: %-6s %10d %10.3f %10.3f  %s", phase, calls, tottime, cumtime, label)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""helper functions to split and read input files in parts"""
+
+from __future__ import absolute_import
+
+import io
+import csv
+import mmap
+import os
+import itertools
+
+
+def byte_ranges(filename, parts, offset=0):
+    '''split a file in newline aligned byte ranges.
+
+    Args:
+        filename: file to split
+        parts (int): number of ranges to generate at most
+        offset (int): position to start from, for example to skip the header
+
+    Returns:
+        list: ``(start, end)`` tuples, every line falls in exactly one range
+    '''
+    size = os.path.getsize(filename)
+    step = max(1, (size - offset) // max(1, parts))
+    res = []
+    with open(filename, 'rb') as f:
+        start = offset
+        while start < size:
+            end = min(start + step, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            res.append((start, end))
+            start = end
+    return res
+
+
+def header_offset(filename):
+    '''returns the position in a file just after the header line'''
+    with open(filename, 'rb') as f:
+        f.readline()
+        return f.tell()
+
+
+def _lines(filename, start, end):
+    # the encoded lines in a byte range of a file
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line
+
+
+def _decoded_rows(lines, delimiter, encoding):
+    # python 2 csv only parses byte strings, the fields are decoded after
+    return ([v.decode(encoding) for v in row]
+            for row in csv.reader(lines, delimiter=delimiter))
+
+
+def read_lines(filename, start, end, encoding='utf-8'):
+    '''generate the decoded lines in a byte range of a file.
+
+    Args:
+        filename: file to read
+        start (int): start of the range, should be at the start of a line
+        end (int): end of the range (exclusive)
+        encoding: encoding of the file
+    '''
+    for line in _lines(filename, start, end):
+        yield line.decode(encoding)
+
+
+def read_range(filename, start, end, delimiter='\t', encoding='utf-8'):
+    '''generate the rows in a byte range of a delimited file.
+
+    Note that quoted values can not contain line endings, the ranges are split
+    on line endings.
+    '''
+    if bytes is str:
+        return _decoded_rows(_lines(filename, start, end), delimiter, encoding)
+    return csv.reader(read_lines(filename, start, end, encoding),
+                      delimiter=delimiter)
+
+
+def read_rows(f, delimiter='\t', encoding='utf-8'):
+    '''generate the rows of a delimited binary file object, e.g. a
+    compressed file opened by :func:`~.open_file`'''
+    if bytes is str:
+        return _decoded_rows(f, delimiter, encoding)
+    return csv.reader(io.TextIOWrapper(f, encoding=encoding, newline=''),
+                      delimiter=delimiter)
+
+
+class MMapReader(object):
+    '''memory mapped reader of delimited files.
+
+    Generates rows from a byte range of a file, by default the whole file.
+    The file is read in newline aligned blocks that are decoded at once. If
+    the file is known to be unquoted (e.g. ``mysqldump --tab``) lines are
+    split on the delimiter directly, otherwise the lines are parsed by
+    :func:`csv.reader`.
+
+        >>> reader = MMapReader('input.tsv', quoted=False)
+        >>> headers = next(reader)
+        >>> for start, end in reader.ranges(4, header_offset('input.tsv')):
+        ...     rows = MMapReader('input.tsv', start, end, quoted=False)
+
+    Args:
+        filename: file to read
+        start (int): start of the range, should be at the start of a line
+        end (int): end of the range (exclusive), default end of file
+        delimiter (str): field delimiter
+        encoding (str): encoding of the file, should be ASCII compatible
+        quoted (boolean): parse quoted fields, if ``False`` lines are split
+            on the delimiter
+        block_size (int): bytes to decode at once
+        columns (int): only split the first ``columns`` fields of unquoted
+            lines, the remainder of the line is left in one last field
+        header (boolean): read the first line as :attr:`headers`, the rows
+            start after it
+
+    Attributes:
+        headers (list): the header if read with ``header``
+        offset (int): start of the block the current row was read from, rows
+            before it are all generated
+    '''
+
+    def __init__(self, filename, start=0, end=None, delimiter='\t',
+                 encoding='utf-8', quoted=True, block_size=1024 * 1024,
+                 columns=None, header=False):
+        self.filename = filename
+        self.start = start
+        self.end = end
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.quoted = quoted
+        self.block_size = block_size
+        self.columns = columns
+        self.offset = None
+        if header:
+            self.start = header_offset(filename)
+            self.headers = next(MMapReader(
+                filename, 0, self.start, delimiter, encoding, quoted), [])
+        self._rows = self._rows_quoted() if quoted else self._rows_split()
+
+    def __iter__(self):
+        return self._rows
+
+    def __next__(self):
+        return next(self._rows)
+
+    next = __next__
+
+    def ranges(self, parts, offset=0):
+        '''split the file in ``parts`` newline aligned byte ranges'''
+        return byte_ranges(self.filename, parts, offset)
+
+    def _blocks(self):
+        # newline aligned blocks of bytes from the range
+        with open(self.filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            end = size if self.end is None else min(self.end, size)
+            if self.start >= end:
+                return
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                pos = self.start
+                while pos < end:
+                    stop = min(pos + self.block_size, end)
+                    if stop < end:
+                        nl = m.find(b'\n', stop - 1, end)
+                        stop = end if nl < 0 else nl + 1
+                    self.offset = pos
+                    yield m[pos:stop]
+                    pos = stop
+            finally:
+                m.close()
+
+    def _rows_quoted(self):
+        if bytes is str:
+            lines = itertools.chain.from_iterable(
+                io.BytesIO(block) for block in self._blocks())
+            return _decoded_rows(lines, self.delimiter, self.encoding)
+        # decoded blocks as line iterators, chained to keep the csv state
+        lines = itertools.chain.from_iterable(
+            io.StringIO(block.decode(self.encoding), newline='\n')
+            for block in self._blocks())
+        return csv.reader(lines, delimiter=self.delimiter)
+
+    def _rows_split(self):
+        d, n = self.delimiter, self.columns or -1
+        for block in self._blocks():
+            text = block.decode(self.encoding)
+            if '\r' in text:
+                text = text.replace('\r\n', '\n')
+            lines = text.split('\n')
+            if not lines[-1]:
+                lines.pop()
+            if '' in lines:
+                # empty lines are empty rows, like csv.reader
+                for line in lines:
+                    yield line.split(d, n) if line else []
+                continue
+            for line in lines:
+                yield line.split(d, n)
@@ -39,3 +39,94 @@ def sql_escape(v):
         return '"%s"' % json.dumps(v).replace('"', '""')
     else:
         return '%s' % v
+
+
+_TSV_ESCAPES = [
+    ('\\', '\\\\'),
+    ('\t', '\\t'),
+    ('\n', '\\n'),
+    ('\r', '\\r'),
+    ('\0', '\\0'),
+]
+
+
+def mysql_tsv_escape(v):
+    '''Translate Python native types to fields for MySQL ``LOAD DATA``
+
+    Uses the default format of ``LOAD DATA``: tab separated fields, escaped
+    by backslash and ``\\N`` for NULL.
+
+        >>> mysql_tsv_escape(None)
+        '\\\\N'
+        >>> mysql_tsv_escape("hello")
+        'hello'
+        >>> print(mysql_tsv_escape("tab\\there\\\\"))
+        tab\\there\\\\
+        >>> mysql_tsv_escape({"hello":"world"})
+        '{"hello": "world"}'
+        >>> mysql_tsv_escape(True)
+        '1'
+        >>> mysql_tsv_escape(0)
+        '0'
+
+    Args:
+        v: value to Translate
+
+    Returns:
+        str: escaped field for the data file
+    '''
+    if v is None:
+        return "\\N"
+    elif isinstance(v, dict) or isinstance(v, list):
+        v = json.dumps(v)
+    elif isinstance(v, bool):
+        return '1' if v else '0'
+    elif not isstr(v):
+        return '%s' % v
+    for a, b in _TSV_ESCAPES:
+        if a in v:
+            v = v.replace(a, b)
+    return v
+
+
+_COPY_ESCAPES = [
+    ('\\', '\\\\'),
+    ('\t', '\\t'),
+    ('\n', '\\n'),
+    ('\r', '\\r'),
+]
+
+
+def pg_copy_escape(v):
+    '''Translate Python native types to fields for PostgreSQL ``COPY``
+
+    Uses the text format of ``COPY``: tab separated fields, escaped by
+    backslash and ``\\N`` for NULL.
+
+        >>> pg_copy_escape(None)
+        '\\\\N'
+        >>> print(pg_copy_escape("line\\nbreak"))
+        line\\nbreak
+        >>> pg_copy_escape(["hello"])
+        '["hello"]'
+        >>> pg_copy_escape(False)
+        'f'
+
+    Args:
+        v: value to Translate
+
+    Returns:
+        str: escaped field for the COPY data
+    '''
+    if v is None:
+        return "\\N"
+    elif isinstance(v, dict) or isinstance(v, list):
+        v = json.dumps(v)
+    elif isinstance(v, bool):
+        return 't' if v else 'f'
+    elif not isstr(v):
+        return '%s' % v
+    for a, b in _COPY_ESCAPES:
+        if a in v:
+            v = v.replace(a, b)
+    return v
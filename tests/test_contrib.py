@@ -1,18 +1,88 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import os
+import argparse
+import shutil
+import tempfile
 import unittest
 import doctest
 from io import StringIO
 
 from data_migrator.contrib.read import read_map_from_csv
 from data_migrator.exceptions import DefinitionException, NonUniqueDataException
-from data_migrator.contrib import dutch
+from data_migrator.contrib import dutch, synthetic
+from data_migrator.contrib.kinesis import KinesisTransformer
+from data_migrator.utils import argparser
+from data_migrator import models
 
 def load_tests(loader, tests, ignore):
     tests.addTests(doctest.DocTestSuite(dutch))
+    tests.addTests(doctest.DocTestSuite(synthetic))
     return tests
 
+class SyntheticModel(models.Model):
+    id = models.IntField(pos=0, unique=True)
+    code = models.StringField(pos=2, max_length=4, unique=True)
+    name = models.NullStringField(pos=3, max_length=10)
+    created = models.DateTimeField(pos=4, input_format='%d-%m-%Y')
+    active = models.BooleanField(pos=5)
+    city = models.StringField(column='city')
+
+
+class TestSynthetic(unittest.TestCase):
+    def test_rows(self):
+        rows = list(synthetic.synthetic_rows(SyntheticModel, 2000, null_fraction=0.1))
+        self.assertEqual(rows[0], ['id', 'column1', 'code', 'name', 'created', 'active', 'city'])
+        rows = rows[1:]
+        self.assertEqual(len(rows), 2000)
+        self.assertEqual(len(set([r[2] for r in rows])), 2000)
+        self.assertTrue(all(len(r[2]) <= 4 for r in rows))
+        names = [r[3] for r in rows]
+        self.assertTrue(0 < names.count('NULL') < 400)
+        self.assertTrue(all(len(n) <= 10 for n in names))
+        self.assertEqual(list(synthetic.synthetic_rows(SyntheticModel, 5)),
+                         list(synthetic.synthetic_rows(SyntheticModel, 5)))
+
+    def test_scan(self):
+        '''the generated rows scan without violations'''
+        rows = list(synthetic.synthetic_rows(SyntheticModel, 500))
+        SyntheticModel.resolve_columns(rows[0])
+        SyntheticModel.objects.scan_rows(rows[1:])
+        self.assertEqual(SyntheticModel.objects.stats()['dropped'], 0)
+        self.assertEqual(len(SyntheticModel.objects), 500)
+
+    def test_values(self):
+        rows = synthetic.synthetic_rows(SyntheticModel, 3, values={'city': lambda i, rnd: 'city%d' % i})
+        self.assertEqual([r[-1] for r in rows], ['city', 'city1', 'city2', 'city3'])
+
+    def test_write(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'input.tsv')
+            size = synthetic.write_tsv(SyntheticModel, filename, 100)
+            self.assertEqual(os.path.getsize(filename), size)
+            with open(filename) as f:
+                self.assertEqual(len(f.readlines()), 101)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestKinesis(unittest.TestCase):
+    def test_args(self):
+        '''--stream and --profile replace the flags of the Transformer'''
+        shared, argparser._PARSER = argparser._PARSER, None
+        try:
+            t = KinesisTransformer(models=[SyntheticModel])
+            t.parser = argparser.configure_parser()
+            t._specific_args()
+            args = t.parser.parse_args(['--stream', 'name', '--profile', 'aws'])
+            self.assertEqual((args.stream, args.profile), ('name', 'aws'))
+            self.assertRaises(argparse.ArgumentError, t.parser.add_argument, '--outdir')
+        finally:
+            argparser._PARSER = shared
+
+
 class TestRead(unittest.TestCase):
     def test_reader(self):
         f = StringIO(u'key,value\nhello,world\nhappy,camper\n')
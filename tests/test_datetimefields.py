@@ -3,6 +3,7 @@
 
 import unittest
 import datetime
+from dateutil import parser
 
 from data_migrator import models
 from data_migrator.exceptions import DataException
@@ -21,5 +22,26 @@ class TestDateTimeFields(unittest.TestCase):
         f = models.DateTimeField(f="%d-%m-%Y", pos=0, name='f')
         self.assertRaises(DataException, f.scan, row=["blabla"])
 
+    def test_iso(self):
+        '''ISO-8601 strings parse like dateutil'''
+        f = models.DateTimeField(pos=0, name='f', cache_size=0)
+        for v in ["2017-10-02", "2017-10-02T12:01", "2017-10-02 12:01:02.123",
+                  "2017-10-02T12:01:02Z", "2 Oct 2017"]:
+            self.assertEqual(f.scan(row=[v]), parser.parse(v))
+
+    def test_input_format(self):
+        '''input formats are tried first'''
+        f = models.DateTimeField(pos=0, name='f', input_format=["%d/%m/%Y", "%Y%m%d"])
+        self.assertEqual(f.scan(row=["02/10/2017"]), datetime.datetime(2017, 10, 2))
+        self.assertEqual(f.scan(row=["20171002"]), datetime.datetime(2017, 10, 2))
+        self.assertEqual(f.scan(row=["Oct 2, 2017"]), datetime.datetime(2017, 10, 2))
+
+    def test_cache(self):
+        '''repeated dates parse once'''
+        f = models.DateTimeField(pos=0, name='f', cache_size=2)
+        for v in ["2017-10-02", "2017-10-02", "2017-10-03", "2017-10-02"]:
+            f.scan(row=[v])
+        self.assertEqual((f.dates.hits, f.dates.misses), (2, 2))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from functools import partial
+
+from data_migrator import models
+from data_migrator.emitters import DBAPIEmitter, DBAPILoader
+from data_migrator.exceptions import DefinitionException
+from data_migrator.transform import Transformer
+
+INPUT = [
+    ["id", "name"],
+    ["1", "alice"],
+    ["2", "bob"],
+    ["3", "carol"],
+]
+
+
+class PersonModel(models.Model):
+    id = models.IntField(pos=0)
+    name = models.StringField(pos=1)
+    tags = models.ObjectField(default=[])
+
+
+class NameModel(models.Model):
+    name = models.StringField(pos=1)
+
+    class Meta:
+        table_name = 'names'
+        prefix = ["DELETE FROM names WHERE name = 'old'"]
+
+
+class TagModel(models.Model):
+    name = models.StringField(pos=1)
+
+    class Meta:
+        table_name = 'tags'
+        independent = True
+
+
+class RecordingLoader(DBAPILoader):
+    '''records the tables in the order of loading'''
+    def __init__(self, *args, **kwargs):
+        super(RecordingLoader, self).__init__(*args, **kwargs)
+        self.tables = []
+
+    def execute(self, statements, statement, params):
+        self.tables.append(statement.split('"')[1])
+        super(RecordingLoader, self).execute(statements, statement, params)
+
+
+def reset(model):
+    manager = model.objects.__class__()
+    manager._prepare(model)
+    model.objects = manager
+
+
+class FlakyConnection(object):
+    '''fails the first executemany'''
+    failures = 1
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        if FlakyConnection.failures:
+            FlakyConnection.failures -= 1
+            raise sqlite3.OperationalError("connection lost")
+        return self.conn.cursor()
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+class TestDBAPIEmitter(unittest.TestCase):
+    def test_statement(self):
+        e = DBAPIEmitter(manager=PersonModel.objects)
+        self.assertEqual(e.statement, 'INSERT INTO "personmodel" ("id", "name", "tags") VALUES (?, ?, ?)')
+        self.assertEqual(e.emit(PersonModel(id=1, name="a")), [(1, "a", "[]")])
+        self.assertEqual(e.prefix(), ['DELETE FROM "personmodel"'])
+
+    def test_paramstyle(self):
+        e = DBAPIEmitter(manager=PersonModel.objects, paramstyle='pyformat', quote='`')
+        self.assertEqual(e.statement, 'INSERT INTO `personmodel` (`id`, `name`, `tags`) VALUES (%(id)s, %(name)s, %(tags)s)')
+        self.assertEqual(e.emit(PersonModel(id=1, name="a")), [{"id": 1, "name": "a", "tags": "[]"}])
+        self.assertRaises(DefinitionException, DBAPIEmitter,
+                          manager=PersonModel.objects, paramstyle='unknown')
+
+
+class TestDBAPILoader(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.dir, 'test.db')
+        self.connect = partial(sqlite3.connect, self.db, check_same_thread=False)
+        conn = self.connect()
+        conn.execute("CREATE TABLE personmodel (id INTEGER, name TEXT, tags TEXT)")
+        conn.execute("CREATE TABLE names (name TEXT)")
+        conn.execute("CREATE TABLE tags (name TEXT)")
+        conn.execute("INSERT INTO personmodel VALUES (9, 'old', '[]')")
+        conn.execute("INSERT INTO names VALUES ('old'), ('keep')")
+        conn.commit()
+        conn.close()
+        self.argv = sys.argv
+        sys.argv = ['transform', '-q']
+
+    def tearDown(self):
+        sys.argv = self.argv
+        shutil.rmtree(self.dir)
+
+    def query(self, sql):
+        conn = self.connect()
+        res = conn.execute(sql).fetchall()
+        conn.close()
+        return res
+
+    def transform(self, loader, models=None, **kwargs):
+        models = models or [PersonModel, NameModel]
+        for m in models:
+            reset(m)
+        t = Transformer(models=models, reader=lambda args: iter(INPUT),
+                        loader=loader, **kwargs)
+        t.process()
+
+    def test_load(self):
+        '''models are loaded in chunks'''
+        self.transform(DBAPILoader(self.connect, chunk_size=2, pool_size=2))
+        self.assertEqual(self.query("SELECT id, name, tags FROM personmodel ORDER BY id"),
+                         [(1, "alice", "[]"), (2, "bob", "[]"), (3, "carol", "[]")])
+        self.assertEqual(self.query("SELECT name FROM names ORDER BY name"),
+                         [("alice",), ("bob",), ("carol",), ("keep",)])
+
+    def test_order(self):
+        '''models are loaded in order, independent models first'''
+        loader = RecordingLoader(self.connect, chunk_size=2, pool_size=2)
+        self.transform(loader, models=[PersonModel, TagModel, NameModel])
+        self.assertEqual(loader.tables, ['tags', 'tags', 'personmodel', 'personmodel',
+                                         'names', 'names'])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM tags"), [(3,)])
+
+    def test_stream(self):
+        '''streamed objects are loaded while scanning'''
+        self.transform(DBAPILoader(self.connect, chunk_size=2), stream=True)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM personmodel"), [(3,)])
+        self.assertEqual(len(PersonModel.objects), 0)
+
+    def test_retry(self):
+        '''a failing chunk is retried on a new connection'''
+        FlakyConnection.failures = 1
+        loader = DBAPILoader(lambda: FlakyConnection(self.connect()), retry_wait=0)
+        reset(PersonModel)
+        PersonModel.objects.scan_rows(INPUT[1:])
+        session = loader.open(PersonModel)
+        self.assertEqual(session.load(PersonModel.objects.all()), 3)
+        session.close()
+        self.assertEqual(self.query("SELECT COUNT(*) FROM personmodel"), [(3,)])
+
+    def test_fail(self):
+        '''errors are raised after the retries'''
+        FlakyConnection.failures = 2
+        loader = DBAPILoader(lambda: FlakyConnection(self.connect()), retries=1, retry_wait=0)
+        self.assertRaises(sqlite3.OperationalError, loader.execute, [], "SELECT 1", [])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM personmodel"), [(1,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,25 @@
 # -*- coding: UTF-8 -*-
 
 import unittest
+import io
 import json
+import datetime
 
 from data_migrator.emitters.base import BaseEmitter
 from data_migrator.emitters import CSVEmitter, JSONEmitter
 from data_migrator.emitters import MySQLEmitter, UpdateEmitter
+from data_migrator.emitters import MySQLLoadDataEmitter, PostgresCopyEmitter
+from data_migrator.emitters import ParquetEmitter
 from data_migrator.models import Model, StringField
+from data_migrator.models import IntField, HiddenField, JSONField, DateTimeField
+from data_migrator.models.codegen import compile_emit
 from data_migrator.exceptions import DefinitionException
+from data_migrator.utils import sql_escape
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
 
 class EmitterModel(Model):
     a = StringField(pos=0, key=True)
@@ -25,6 +37,30 @@ class EmitterHeaderModel(Model):
         prefix = ["hello", "world"]
         table_name = 'test'
 
+class CompiledEmitModel(Model):
+    a = IntField(pos=0)
+    b = StringField(pos=1, max_length=3)
+    c = HiddenField(pos=2)
+    d = JSONField(pos=3)
+    e = StringField(pos=4, default="none")
+
+class TestCompiledEmit(unittest.TestCase):
+    def test_equivalent(self):
+        '''compiled emit equals emitting every field'''
+        o = CompiledEmitModel(a=1, b="hello", c="hidden", d={"x": 1}, e=None)
+        _emit = compile_emit(CompiledEmitModel._meta, escaper=sql_escape)
+        self.assertEqual(_emit.names, ['a', 'b', 'd', 'e'])
+        fields = CompiledEmitModel._meta.fields
+        self.assertEqual(_emit(o), tuple(
+            [fields[k].emit(getattr(o, k), sql_escape) for k in 'abde']))
+        self.assertEqual(o.emit(), {'a': 1, 'b': 'hel', 'd': '{"x": 1}', 'e': 'none'})
+
+    def test_keys(self):
+        '''compiled emit of selected fields, in order'''
+        o = CompiledEmitModel(a=1, b="hello", c="hidden")
+        _emit = compile_emit(CompiledEmitModel._meta, ['c', 'a'])
+        self.assertEqual(_emit(o), ('hidden', 1))
+
 class TestEmitterBase(unittest.TestCase):
     def test_base_default(self):
         '''Base Emitter defaults'''
@@ -59,6 +95,157 @@ class MySQLEmitterBase(unittest.TestCase):
         self.assertEqual(e.emit(o[0]), ['INSERT INTO `test` (`b`, `a`) VALUES ("world", "hello");'])
         self.assertEqual(e.emit(o[1]), ['INSERT INTO `test` (`b`, `a`) VALUES ("cruel world", "goodbye");'])
 
+    def test_batch(self):
+        '''rows are combined in extended inserts, remainder in postamble'''
+        e = MySQLEmitter(manager=EmitterHeaderModel.objects, batch_size=2)
+        o = EmitterModel(a="remark", b="me")
+        o.remark = "check this"
+        self.assertEqual(e.emit(o1), [])
+        self.assertEqual(e.emit(o2), [
+            'INSERT INTO `test` (`b`, `a`) VALUES',
+            '("world", "hello"),',
+            '("cruel world", "goodbye");'])
+        self.assertEqual(e.emit(o), ['# check this'])
+        self.assertEqual(e.postamble(), [
+            'INSERT INTO `test` (`b`, `a`) VALUES',
+            '("me", "remark");'])
+        self.assertEqual(e.postamble(), [])
+
+    def test_batch_bytes(self):
+        '''statements are closed before exceeding the byte limit'''
+        e = MySQLEmitter(manager=EmitterHeaderModel.objects, batch_size=100,
+                         max_statement_bytes=70)
+        self.assertEqual(e.emit(o1), [])
+        self.assertEqual(e.emit(o2), [
+            'INSERT INTO `test` (`b`, `a`) VALUES',
+            '("world", "hello");'])
+        self.assertEqual(e.flush(), [
+            'INSERT INTO `test` (`b`, `a`) VALUES',
+            '("cruel world", "goodbye");'])
+
+    def test_batch_bytes_encoded(self):
+        '''the byte limit counts encoded bytes, of text and str values'''
+        e = MySQLEmitter(manager=EmitterHeaderModel.objects, batch_size=100,
+                         max_statement_bytes=70)
+        self.assertEqual(e.emit(EmitterModel(a="é", b="café")), [])
+        out = e.emit(EmitterModel(a="é", b="café"))
+        self.assertEqual(len(out), 2)
+        self.assertTrue(out[0].startswith('INSERT INTO `test`'))
+        self.assertEqual(len(e.flush()), 2)
+
+    def test_batch_meta(self):
+        '''batch size is taken from Meta'''
+        class BatchModel(Model):
+            a = StringField(pos=0)
+
+            class Meta:
+                batch_size = 10
+        e = MySQLEmitter(manager=BatchModel.objects)
+        self.assertEqual(e.batch_size, 10)
+
+class MySQLLoadDataEmitterBase(unittest.TestCase):
+    def test_emit(self):
+        e = MySQLLoadDataEmitter(manager=EmitterHeaderModel.objects)
+        o = EmitterModel(a="tab\there", b=None)
+        self.assertEqual(e.emit(o), ['\ttab\\there'])
+        self.assertEqual(e.preamble(["first line"]), [])
+
+    def test_control(self):
+        e = MySQLLoadDataEmitter(manager=EmitterHeaderModel.objects)
+        c = e.control_files(["first line"])
+        self.assertEqual(list(c.keys()), ['test.sql'])
+        c = c['test.sql']
+        self.assertIn("hello", c)
+        self.assertEqual(c[-1], "LOAD DATA LOCAL INFILE 'test.tsv' INTO TABLE `test` "
+            "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+            "LINES TERMINATED BY '\\n' (`b`, `a`);")
+
+    def test_charset(self):
+        '''the character set follows the encoding of the output'''
+        e = MySQLLoadDataEmitter(manager=EmitterHeaderModel.objects)
+        e.encoding = 'latin-1'
+        self.assertIn("CHARACTER SET latin1 ", e.control_files([])['test.sql'][-1])
+        e.encoding = 'utf-7'
+        self.assertRaises(DefinitionException, e.control_files, [])
+        e.charset = 'utf7'
+        self.assertIn("CHARACTER SET utf7 ", e.control_files([])['test.sql'][-1])
+
+    def test_replacement(self):
+        '''fields with a replacement can not be loaded'''
+        class ReplaceModel(Model):
+            a = StringField(pos=0, replacement='(SELECT id FROM a WHERE b={0})')
+        self.assertRaises(DefinitionException, MySQLLoadDataEmitter,
+                          manager=ReplaceModel.objects)
+
+class PostgresTypesModel(Model):
+    a = IntField(pos=0)
+    b = StringField(pos=1)
+    c = DateTimeField(pos=2)
+
+    class Meta:
+        table_name = 'types'
+
+class PostgresCopyEmitterBase(unittest.TestCase):
+    def test_text(self):
+        e = PostgresCopyEmitter(manager=EmitterHeaderModel.objects)
+        h = e.preamble(["first line"])
+        self.assertIn("hello", h)
+        self.assertEqual(h[-1], 'COPY "test" ("b", "a") FROM STDIN;')
+        self.assertEqual(e.emit(EmitterModel(a="new\nline", b="x")), ['x\tnew\\nline'])
+        self.assertEqual(e.postamble(), ['\\.'])
+
+    def test_truncate(self):
+        e = PostgresCopyEmitter(manager=EmitterModel.objects)
+        self.assertIn('TRUNCATE "emittermodel";', e.preamble([]))
+        self.assertEqual(e.filename(), 'emittermodel.sql')
+
+    def test_binary(self):
+        e = PostgresCopyEmitter(manager=PostgresTypesModel.objects, binary=True,
+                                types={'a': 'int4'})
+        self.assertEqual(e.filename(), 'types.pgcopy')
+        self.assertEqual(e.preamble([]), [b'PGCOPY\n\xff\r\n\x00' + b'\x00' * 8])
+        o = PostgresTypesModel(a=1, b=None, c=datetime.datetime(2000, 1, 1, 0, 0, 1))
+        self.assertEqual(e.emit(o), [
+            b'\x00\x03' +
+            b'\x00\x00\x00\x04\x00\x00\x00\x01' +
+            b'\x00\x00\x00\x00' +
+            b'\x00\x00\x00\x08\x00\x00\x00\x00\x00\x0f\x42\x40'])
+        self.assertEqual(e.postamble(), [b'\xff\xff'])
+        c = e.control_files([])['types.sql']
+        self.assertIn('TRUNCATE "types";', c)
+        self.assertEqual(c[-1], '\\copy "types" ("a", "b", "c") FROM \'types.pgcopy\' WITH (FORMAT binary)')
+
+    def test_binary_type(self):
+        self.assertRaises(DefinitionException, PostgresCopyEmitter,
+                          manager=PostgresTypesModel.objects, binary=True,
+                          types={'a': 'money'})
+
+@unittest.skipUnless(pq, "needs pyarrow")
+class ParquetEmitterBase(unittest.TestCase):
+    def test_emit(self):
+        '''row groups are written as objects arrive'''
+        e = ParquetEmitter(manager=PostgresTypesModel.objects, row_group_size=2,
+                           compression='gzip')
+        out = e.preamble([])
+        for i in range(3):
+            out += e.emit(PostgresTypesModel(a=i, b="b%d" % i, c=datetime.datetime(2020, 1, i + 1)))
+        self.assertGreater(len(out[-1]), 0)
+        out += e.postamble()
+        f = pq.ParquetFile(io.BytesIO(b''.join(out)))
+        self.assertEqual(f.metadata.num_row_groups, 2)
+        self.assertEqual(str(f.schema_arrow.field('c').type), 'timestamp[us]')
+        self.assertEqual(f.read().to_pydict(), {
+            'a': [0, 1, 2],
+            'b': ['b0', 'b1', 'b2'],
+            'c': [datetime.datetime(2020, 1, i + 1) for i in range(3)]})
+
+    def test_json(self):
+        '''objects are written as JSON strings'''
+        e = ParquetEmitter(manager=CompiledEmitModel.objects)
+        out = e.preamble([]) + e.emit(CompiledEmitModel(a=1, b="abcd", d={"x": 1})) + e.postamble()
+        self.assertEqual(pq.read_table(io.BytesIO(b''.join(out))).to_pydict(),
+                         {'a': [1], 'b': ['abc'], 'd': ['{"x": 1}'], 'e': ['none']})
+
 class CSVEmitterBase(unittest.TestCase):
 
     def test_header(self):
@@ -72,6 +259,21 @@ class CSVEmitterBase(unittest.TestCase):
         self.assertEqual(e.emit(o[0]), ['"world", "hello"'])
         self.assertEqual(e.emit(o[1]), ['"cruel world", "goodbye"'])
 
+    def test_writer(self):
+        '''csv writer mode quotes only when needed'''
+        e = CSVEmitter(manager=EmitterHeaderModel.objects, dialect='excel')
+        self.assertEqual(e.preamble(), ['b,a'])
+        o = EmitterModel(a='say "hi"', b="x, y")
+        self.assertEqual(e.emit(o), ['"x, y","say ""hi"""'])
+        self.assertEqual(e.emit_many(EmitterModel.objects.all()),
+                         ['world,hello\ncruel world,goodbye'])
+        self.assertEqual(e.emit_many([]), [])
+
+    def test_delimiter(self):
+        e = CSVEmitter(manager=CompiledEmitModel.objects, delimiter='|')
+        self.assertEqual(e.preamble(), ['a|b|d|e'])
+        self.assertEqual(e.emit(CompiledEmitModel(a=1, b=None, d=["x"])), ['1||"[""x""]"|none'])
+
 class JSONEmitterBase(unittest.TestCase):
 
     def test_emit(self):
@@ -72,6 +72,11 @@ class TestFields(unittest.TestCase):
         self.assertRaises(DefinitionException, models.IntField,
                           pos=0, max_length=10)
 
+    def test_column(self):
+        '''column can not be combined with pos'''
+        self.assertEqual(models.StringField(column='email').column, 'email')
+        self.assertRaises(DefinitionException, models.StringField, pos=1, column='email')
+
     def test_string_length(self):
         f = models.StringField(pos=0, max_length=3, name='f')
         self.assertEqual(f.emit("blablabla"), "bla")
@@ -137,5 +142,24 @@ class TestFields(unittest.TestCase):
         self.assertNotEqual(f.default, 'bla')
         self.assertIsNone(f.default)
 
+    def test_cache(self):
+        calls = []
+        def parse(v):
+            calls.append(v)
+            return v.upper()
+        f = models.StringField(pos=0, name='f', parse=parse, validate=lambda x: x != 'bad', cache=True)
+        for v in ['nl', 'be', 'nl', 'nl', 'NULL']:
+            f.scan(row=[v])
+        self.assertEqual(f.scan(row=['nl']), 'NL')
+        self.assertEqual(calls, ['nl', 'be'])
+        self.assertRaises(ValidationException, f.scan, row=['bad'])
+        self.assertRaises(ValidationException, f.scan, row=['bad'])
+        self.assertEqual((f.cache.hits, f.cache.misses), (4, 3))
+
+    def test_cache_size(self):
+        f = models.StringField(pos=0, cache=2)
+        self.assertEqual(f.cache.maxsize, 2)
+        self.assertIsNone(models.StringField(pos=0).cache)
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,9 +2,12 @@
 # -*- coding: UTF-8 -*-
 
 import unittest
+import datetime
 
-from data_migrator.models import SimpleManager
-from data_migrator.models import Model, StringField
+from data_migrator.models import SimpleManager, ColumnarManager
+from data_migrator.models import Model, StringField, IntField, NullIntField
+from data_migrator.models import DateTimeField, JSONField
+from data_migrator.models.columns import IntColumn, DictColumn, Column
 from data_migrator.exceptions import NonUniqueDataException, ValidationException
 
 class ManagerModel(Model):
@@ -78,3 +81,71 @@ class TestFields(unittest.TestCase):
         self.assertRaises(ValidationException, ManagerModel.objects.scan_rows, a)
         ManagerModel._meta.fail_not_validated = False
         self.assertFalse(ManagerModel.objects.scan_rows(a))
+
+
+class CachedModel(Model):
+    a = StringField(pos=0, cache=True, parse=str.upper)
+    b = StringField(pos=1, cache=10)
+
+class TestCachedManager(unittest.TestCase):
+    def test_stats(self):
+        '''cache hit ratio is part of the stats'''
+        CachedModel.objects.scan_rows([["nl", "x"], ["nl", "y"], ["be", "x"]])
+        self.assertEqual([x.a for x in CachedModel.objects.all()], ['NL', 'NL', 'BE'])
+        s = CachedModel.objects.stats()
+        self.assertEqual((s['cache_hits'], s['cache_misses']), (2, 4))
+        self.assertEqual(s['cache_hit_ratio'], 0.333)
+        self.assertNotIn('cache_hits', ManagerModel.objects.stats())
+
+
+class ColumnarModel(Model):
+    a = IntField(pos=0)
+    b = NullIntField(pos=1)
+    c = StringField(pos=2)
+    d = DateTimeField(pos=3)
+    e = JSONField(pos=4)
+
+    class Meta:
+        manager = ColumnarManager
+
+class TestColumnarManager(unittest.TestCase):
+    rows = [
+        ["1", "2", "hello", "2017-10-02", "x"],
+        ["3", "NULL", "hello", "NULL", "y"],
+        ["5", "6", "world", "2017-10-03 12:00:01.5", "z"],
+    ]
+
+    def setUp(self):
+        ColumnarModel.objects._clear()
+
+    def test_columns(self):
+        '''fields are stored in typed columns'''
+        ColumnarModel.objects.scan_rows(self.rows)
+        columns = ColumnarModel.objects.columns
+        self.assertIsInstance(columns['a'], IntColumn)
+        self.assertIsInstance(columns['c'], DictColumn)
+        self.assertEqual(columns['c'].values, ['hello', 'world'])
+        self.assertEqual(ColumnarModel.objects.column('b'), [2, None, 6])
+
+    def test_all(self):
+        '''objects are materialized on access'''
+        ColumnarModel.objects.scan_rows(self.rows)
+        self.assertEqual(len(ColumnarModel.objects), 3)
+        o = ColumnarModel.objects.all()
+        self.assertEqual(len(o), 3)
+        self.assertEqual([x.a for x in o], [1, 3, 5])
+        self.assertEqual(o[-1].d, datetime.datetime(2017, 10, 3, 12, 0, 1, 500000))
+        self.assertIsNone(o[1].d)
+        self.assertEqual(o[0].emit(), ColumnarModel().scan(self.rows[0]).emit())
+        self.assertEqual(ColumnarModel.objects.stats()['out'], 3)
+
+    def test_fallback(self):
+        '''values that do not fit fall back to a plain column'''
+        ColumnarModel.objects.scan_rows(self.rows)
+        ColumnarModel.objects.save(ColumnarModel(a=2**70, remark="big"))
+        self.assertIsInstance(ColumnarModel.objects.columns['a'], Column)
+        o = ColumnarModel.objects.all()
+        self.assertEqual([x.a for x in o], [1, 3, 5, 2**70])
+        self.assertEqual(o[3].remark, "big")
+        self.assertEqual(len(ColumnarModel.objects.flush()), 4)
+        self.assertEqual(len(ColumnarModel.objects), 0)
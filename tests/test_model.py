@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import pickle
 import unittest
 
 from data_migrator.models import Model, StringField, NullField, UUIDField
-from data_migrator.exceptions import DataException
+from data_migrator.models import IntField, NullIntField, BooleanField
+from data_migrator.exceptions import DataException, ValidationException
+from data_migrator.exceptions import DefinitionException
 
 class TrialModel(Model):
     a = StringField(pos=0, key=True)
@@ -107,5 +110,103 @@ class TestModel(unittest.TestCase):
         # print(m.json_schema())
         TrialModel._meta.strict = t
 
+class CompiledModel(Model):
+    a = IntField(pos=0)
+    b = NullIntField(pos=1, nullable=None)
+    c = StringField(pos=2, validate=lambda x: len(x) < 10, parse=str.upper)
+    d = BooleanField(pos=3)
+    e = StringField(parse=lambda row: row[0] + row[2])
+
+
+class TestCompiledModel(unittest.TestCase):
+
+    def test_equivalent(self):
+        '''compiled scan equals scanning every field'''
+        for row in [["1", "2", "hello", "yes"], ["NULL", "0", "NULL", "NULL"]]:
+            o = CompiledModel.__new__(CompiledModel).scan(row)
+            for k, f in CompiledModel._meta.fields.items():
+                self.assertEqual(getattr(o, k), f.scan(row))
+
+    def test_specialised(self):
+        '''unused field features are left out'''
+        source = CompiledModel._scan.source
+        self.assertIn('validate_2', source)
+        self.assertNotIn('validate_0', source)
+        self.assertNotIn('null_1', source)
+
+    def test_failures(self):
+        '''scan raises on validation and short rows'''
+        o = CompiledModel()
+        self.assertRaises(ValidationException, o.scan, ["1", "2", "hello world", "y"])
+        self.assertRaises(DataException, o.scan, ["1", "2"])
+
+    def test_recompile(self):
+        '''field changes are picked up after compile'''
+        f = CompiledModel._meta.fields['d']
+        f.nullable = 'nope'
+        CompiledModel.compile()
+        self.assertIsNone(CompiledModel().scan(["1", "2", "x", "nope"]).d)
+        f.nullable = 'NULL'
+        CompiledModel.compile()
+        self.assertFalse(CompiledModel().scan(["1", "2", "x", "nope"]).d)
+
+class CompactModel(Model):
+    a = StringField(pos=0)
+    b = IntField(pos=1)
+
+    class Meta:
+        compact = True
+
+
+class TestCompactModel(unittest.TestCase):
+
+    def test_slots(self):
+        '''compact objects have no __dict__'''
+        o = CompactModel.objects.scan_row(['hello', '1'])[0]
+        self.assertFalse(hasattr(o, '__dict__'))
+        self.assertTrue(hasattr(TrialModel(), '__dict__'))
+        self.assertEqual((o.a, o.b), ('hello', 1))
+
+    def test_semantics(self):
+        '''update, emit and remark keep working'''
+        o = CompactModel(a='hello', remark='some remark').update(b=2)
+        self.assertEqual(o.remark, 'some remark')
+        self.assertEqual(o.emit(), {'a': 'hello', 'b': 2})
+        self.assertFalse(hasattr(CompactModel(), 'remark'))
+        o = pickle.loads(pickle.dumps(o))
+        self.assertEqual((o.a, o.b, o.remark), ('hello', 2, 'some remark'))
+
+    def test_unknown(self):
+        '''compact objects can not store unknown fields'''
+        self.assertRaises(DataException, CompactModel, c='fail')
+        self.assertRaises(DataException, CompactModel().update, c='fail')
+
+class ColumnModel(Model):
+    a = StringField(column='name')
+    b = IntField(column='id', unique=True)
+    c = StringField(pos=0)
+
+
+class TestColumns(unittest.TestCase):
+
+    def test_resolve(self):
+        '''column names are resolved to positions'''
+        ColumnModel.resolve_columns(['x', 'id', 'y', 'name'])
+        self.assertEqual(ColumnModel._meta.fields['a'].pos, 3)
+        self.assertEqual(ColumnModel._meta.max_pos, 3)
+        o = ColumnModel().scan(['0', '12', '', 'alice'])
+        self.assertEqual((o.a, o.b, o.c), ('alice', 12, '0'))
+        self.assertRaises(DataException, ColumnModel().scan, ['0', '12'])
+
+    def test_missing(self):
+        self.assertRaises(DefinitionException, ColumnModel.resolve_columns, ['x', 'id'])
+
+    def test_unresolved(self):
+        '''fields with a column that is not resolved can not scan'''
+        class UnresolvedModel(Model):
+            a = StringField(column='name')
+        self.assertRaises(DefinitionException, UnresolvedModel().scan, ['alice'])
+        self.assertRaises(DefinitionException, UnresolvedModel._meta.fields['a'].scan, ['alice'])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,490 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import os
+import gzip
+import json
+import sys
+import shutil
+import tempfile
+import unittest
+from functools import partial
+
+from data_migrator import models
+from data_migrator.transform import Transformer
+from data_migrator.emitters import MySQLLoadDataEmitter, PostgresCopyEmitter
+from data_migrator.exceptions import DefinitionException
+from data_migrator.utils import LRUCache
+
+INPUT = [
+    ["id", "name", "city"],
+    ["1", "alice", "amsterdam"],
+    ["2", "bob", "berlin"],
+    ["2", "bobby", "brussels"],
+    ["3", "carol", "NULL"],
+]
+
+
+class StreamModel(models.Model):
+    id = models.IntField(pos=0, unique=True)
+    name = models.StringField(pos=1)
+    city = models.StringField(pos=2)
+
+    class Meta:
+        drop_if_none = ['city']
+        drop_non_unique = True
+
+
+def reset(model):
+    '''give the model a fresh manager, models are module globals'''
+    manager = model.objects.__class__()
+    manager._prepare(model)
+    model.objects = manager
+
+
+class RowModel(models.Model):
+    id = models.IntField(pos=0)
+    full = models.StringField(parse=lambda row: "|".join(row))
+
+
+class NamedModel(models.Model):
+    city = models.StringField(column='city')
+    name = models.StringField(column='name')
+
+
+STOP = {'at': None}
+
+
+def interrupt(row):
+    '''fails on the row with id ``STOP['at']``, like a killed process'''
+    if row[0] == STOP['at']:
+        raise RuntimeError('interrupted')
+    return row[1]
+
+
+class ResumeModel(models.Model):
+    id = models.IntField(pos=0, unique=True)
+    name = models.StringField(parse=interrupt)
+
+    class Meta:
+        drop_non_unique = True
+
+
+class BlockTransformer(Transformer):
+    '''reads input files in small blocks, to checkpoint between blocks'''
+    def _interpret_cmdline(self):
+        super(BlockTransformer, self)._interpret_cmdline()
+        self.reader.block_size = 512
+
+
+class SpillingModel(models.Model):
+    id = models.IntField(pos=0, unique=True)
+
+    class Meta:
+        drop_non_unique = True
+        unique_index = partial(models.SpillingIndex, max_memory=1024)
+
+
+class TransformerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.argv = sys.argv
+        sys.argv = ['transform', '-q']
+
+    def tearDown(self):
+        sys.argv = self.argv
+        shutil.rmtree(self.outdir)
+
+    def transform(self, model, rows=None, transformer=Transformer, **kwargs):
+        reset(model)
+        kwargs.setdefault('reader', lambda args: iter(rows or INPUT))
+        t = transformer(models=[model], outdir=self.outdir, **kwargs)
+        t.process()
+        return t
+
+    def input_file(self, rows):
+        filename = os.path.join(self.outdir, 'input.tsv')
+        with open(filename, 'w') as f:
+            for row in rows:
+                f.write('\t'.join(row) + '\n')
+        sys.argv += ['-i', filename]
+        return filename
+
+    def output(self, filename):
+        with open(os.path.join(self.outdir, filename)) as f:
+            return f.read().splitlines()
+
+
+class TestTransformer(TransformerTestCase):
+    def test_collect(self):
+        '''default mode keeps all objects in the manager'''
+        self.transform(StreamModel)
+        self.assertEqual(len(StreamModel.objects), 2)
+        out = [l for l in self.output('streammodel.sql') if l.startswith('INSERT')]
+        self.assertEqual(len(out), 2)
+        self.assertIn('# stats: out=2,in=4,dropped=2', self.output('streammodel.sql'))
+
+    def test_stream(self):
+        '''stream mode emits directly and keeps no objects'''
+        self.transform(StreamModel, stream=True)
+        self.assertEqual(len(StreamModel.objects), 0)
+        self.assertEqual(StreamModel.objects.stats()['out'], 2)
+        out = self.output('streammodel.sql')
+        self.assertEqual(len([l for l in out if l.startswith('INSERT')]), 2)
+        self.assertEqual(out[-1], '# stats: out=2,in=4,dropped=2')
+
+    def test_stream_cmdline(self):
+        '''stream mode can be set on the command line'''
+        sys.argv.append('--stream')
+        t = self.transform(StreamModel)
+        self.assertTrue(t.stream)
+        self.assertEqual(len(StreamModel.objects), 0)
+
+    def test_encoding(self):
+        '''output files are written in the given encoding'''
+        self.transform(StreamModel, rows=INPUT[:2] + [["4", u"zo\u00eb", u"z\u00fcrich"]],
+                       encoding='latin-1', buffer_size=16)
+        with open(os.path.join(self.outdir, 'streammodel.sql'), 'rb') as f:
+            data = f.read()
+        self.assertIn(b'"zo\xeb", "z\xfcrich"', data)
+        self.assertEqual(len([l for l in data.splitlines() if l.startswith(b'INSERT')]), 2)
+
+    def test_input_encoding(self):
+        '''quoted input files are read in the given encoding'''
+        filename = os.path.join(self.outdir, 'input.tsv')
+        with open(filename, 'wb') as f:
+            for row in INPUT[:2] + [["4", u'"zo\u00eb"', u"z\u00fcrich"]]:
+                f.write(u'\t'.join(row).encode('latin-1') + b'\n')
+        sys.argv += ['-i', filename, '--input-encoding', 'latin-1']
+        self.transform(StreamModel, reader=None)
+        with open(os.path.join(self.outdir, 'streammodel.sql'), 'rb') as f:
+            self.assertIn(u'"zo\u00eb", "z\u00fcrich"'.encode('utf-8'), f.read())
+
+    def test_compression(self):
+        '''compressed input is detected, output is compressed on request'''
+        filename = os.path.join(self.outdir, 'input.tsv.gz')
+        with gzip.open(filename, 'wt') as f:
+            for row in INPUT:
+                f.write('\t'.join(row) + '\n')
+        sys.argv += ['-i', filename, '--compress', 'gzip', '--compress-threads', '2']
+        t = self.transform(StreamModel, reader=None, workers=2)
+        self.assertIsNone(t.reader_file)
+        with gzip.open(os.path.join(self.outdir, 'streammodel.sql.gz'), 'rt') as f:
+            out = f.read().splitlines()
+        self.assertEqual(len([l for l in out if l.startswith('INSERT')]), 2)
+
+    def test_load_data(self):
+        '''load data emitter writes data and control file'''
+        self.transform(StreamModel, emitter=MySQLLoadDataEmitter, stream=True)
+        self.assertEqual(self.output('streammodel.tsv'), ['1\talice\tamsterdam', '2\tbob\tberlin'])
+        out = self.output('streammodel.sql')
+        self.assertIn('# stats: out=2,in=4,dropped=2', out)
+        self.assertIn('DELETE FROM `streammodel`;', out)
+        self.assertTrue(out[-1].startswith("LOAD DATA LOCAL INFILE 'streammodel.tsv' IGNORE INTO TABLE `streammodel`"))
+
+    def test_load_data_encoding(self):
+        '''the control file loads the data file in the output encoding'''
+        self.transform(StreamModel, emitter=MySQLLoadDataEmitter, encoding='latin-1')
+        self.assertIn("CHARACTER SET latin1 ", self.output('streammodel.sql')[-1])
+
+    def test_load_data_compress(self):
+        '''LOAD DATA can not read compressed data files'''
+        sys.argv += ['--compress', 'gzip']
+        self.assertRaises(DefinitionException, self.transform, StreamModel,
+                          emitter=MySQLLoadDataEmitter)
+
+    def test_binary(self):
+        '''binary emitters write bytes to a binary file'''
+        self.transform(StreamModel, emitter=partial(PostgresCopyEmitter, binary=True))
+        with open(os.path.join(self.outdir, 'streammodel.pgcopy'), 'rb') as f:
+            data = f.read()
+        self.assertTrue(data.startswith(b'PGCOPY\n'))
+        self.assertTrue(data.endswith(b'berlin\xff\xff'))
+        self.assertIn('TRUNCATE "streammodel";', self.output('streammodel.sql'))
+
+    def test_profile(self):
+        '''read and write are profiled, the generated functions reported'''
+        sys.argv.append('--profile')
+        t = self.transform(StreamModel)
+        self.assertTrue(os.path.exists(os.path.join(self.outdir, 'profile_read.pstats')))
+        self.assertTrue(os.path.exists(os.path.join(self.outdir, 'profile_write.pstats')))
+        spots = [x[:3] for x in t.profiler.hotspots([StreamModel])]
+        self.assertIn(('read', 'StreamModel scan (generated)', 4), spots)
+        self.assertIn(('write', 'StreamModel emit (generated)', 2), spots)
+
+
+class LenientModel(models.Model):
+    id = models.IntField(pos=0)
+    city = models.StringField(pos=2)
+
+    class Meta:
+        fail_on_data_exception = False
+
+
+ANONYMIZED = []
+
+
+def anonymize(v):
+    ANONYMIZED.append(v)
+    return v[::-1]
+
+
+class CachedModel(models.Model):
+    id = models.IntField(pos=0, cache=True)
+    name = models.StringField(pos=1, anonymize=anonymize)
+
+
+class TestWorkers(TransformerTestCase):
+    rows = INPUT[:1] + [[str(i % 700), "name%d" % i, "city%d" % i] for i in range(1000)]
+
+    def test_chunks(self):
+        '''scan chunks of rows in workers and merge in order'''
+        self.transform(StreamModel, rows=self.rows, workers=3, chunk_size=50)
+        self.assertEqual(StreamModel.objects.stats(), {'out': 700, 'in': 1000, 'dropped': 300})
+        self.assertEqual([o.name for o in StreamModel.objects.all()],
+                         ["name%d" % i for i in range(700)])
+
+    def test_byte_ranges(self):
+        '''scan byte ranges of an input file in workers'''
+        self.input_file(self.rows)
+        self.transform(StreamModel, reader=None)
+        serial = self.output('streammodel.sql')
+        self.transform(StreamModel, reader=None, workers=4)
+        self.assertEqual(StreamModel.objects.stats()['in'], 1000)
+        self.assertEqual(self.output('streammodel.sql'), serial)
+
+    def test_unquoted(self):
+        '''unquoted input is split directly, in workers too'''
+        self.input_file(self.rows)
+        self.transform(StreamModel, reader=None)
+        serial = self.output('streammodel.sql')
+        sys.argv.append('--unquoted')
+        t = self.transform(StreamModel, reader=None, workers=2)
+        self.assertFalse(t.quoted)
+        self.assertEqual(self.output('streammodel.sql'), serial)
+
+    def test_projection(self):
+        '''only the used columns are split, unless models read the row'''
+        self.input_file(INPUT)
+        sys.argv.append('--unquoted')
+        t = self.transform(StreamModel, reader=None)
+        self.assertEqual(t.reader.columns, 3)
+        self.assertEqual(t.in_headers, INPUT[0])
+        t = self.transform(RowModel, reader=None)
+        self.assertIsNone(t.reader.columns)
+        self.assertEqual([o.full for o in RowModel.objects.all()][0], "1|alice|amsterdam")
+
+    def test_columns(self):
+        '''column names are resolved against the input header'''
+        self.input_file([["city", "name", "id"], ["amsterdam", "alice", "1"], ["berlin", "bob", "2"]])
+        sys.argv.append('--unquoted')
+        t = self.transform(NamedModel, reader=None, workers=2)
+        self.assertEqual(t.max_pos, 1)
+        self.assertEqual(t.reader.columns, 2)
+        self.assertEqual([(o.name, o.city) for o in NamedModel.objects.all()],
+                         [("alice", "amsterdam"), ("bob", "berlin")])
+
+    def test_metrics(self):
+        '''scan times of the workers are merged, fields are sampled'''
+        self.input_file(self.rows)
+        filename = os.path.join(self.outdir, 'metrics.json')
+        sys.argv += ['--metrics', filename]
+        t = self.transform(StreamModel, reader=None, workers=2)
+        with open(filename) as f:
+            metrics = json.load(f)
+        self.assertEqual(metrics['rows'], 1000)
+        self.assertEqual(metrics['bytes'], t.metrics.total_bytes - len('id\tname\tcity\n'))
+        for stage in ['header', 'read', 'write', 'scan.StreamModel', 'emit.StreamModel']:
+            self.assertIn(stage, metrics['stages'])
+        self.assertEqual(sorted(metrics['fields']['StreamModel.id']), ['emit', 'parse'])
+
+    def test_metrics_side_effects(self):
+        '''timed fields are scanned and emitted once, as without metrics'''
+        runs = []
+        for metrics_file in [None, os.path.join(self.outdir, 'm.json')]:
+            CachedModel._meta.fields['id'].cache = LRUCache(10000)
+            del ANONYMIZED[:]
+            t = self.transform(CachedModel, rows=self.rows, metrics_file=metrics_file)
+            runs.append((CachedModel.objects.stats(), list(ANONYMIZED),
+                         self.output('cachedmodel.sql')))
+        self.assertEqual(runs[1], runs[0])
+        self.assertEqual(runs[0][0]['cache_hits'], 300)
+        self.assertEqual(len(runs[0][1]), 1000)
+        self.assertEqual(sorted(t.metrics.fields['CachedModel.name']), ['emit', 'parse'])
+
+    def test_metrics_field_errors(self):
+        '''fields of sampled rows that fail are counted, not timed'''
+        rows = self.rows[:100] + [["99"]] + self.rows[101:]
+        t = self.transform(LenientModel, rows=rows, metrics_file=os.path.join(self.outdir, 'm.json'))
+        self.assertEqual(len(LenientModel.objects), 999)
+        self.assertEqual(t.metrics.field_errors, 2)
+
+    def test_stream_cmdline(self):
+        '''workers can be combined with streaming'''
+        self.input_file(self.rows)
+        sys.argv += ['--workers', '2', '--stream']
+        t = self.transform(StreamModel, reader=None)
+        self.assertEqual(t.workers, 2)
+        out = self.output('streammodel.sql')
+        self.assertEqual(len([l for l in out if l.startswith('INSERT')]), 700)
+
+
+class TestCheckpoint(TransformerTestCase):
+    rows = TestWorkers.rows
+
+    def setUp(self):
+        super(TestCheckpoint, self).setUp()
+        self.checkpoint = os.path.join(self.outdir, 'checkpoint')
+
+    def tearDown(self):
+        STOP['at'] = None
+        super(TestCheckpoint, self).tearDown()
+
+    def resume(self, **kwargs):
+        self.transform(ResumeModel, rows=self.rows, stream=True, **kwargs)
+        expected = self.output('resumemodel.sql')
+        STOP['at'] = '650'
+        self.assertRaises(SystemExit, self.transform, ResumeModel, rows=self.rows, stream=True,
+                          checkpoint=self.checkpoint, checkpoint_rows=100, **kwargs)
+        self.assertTrue(os.path.exists(self.checkpoint))
+        STOP['at'] = None
+        t = self.transform(ResumeModel, rows=self.rows, stream=True, checkpoint=self.checkpoint,
+                           checkpoint_rows=100, resume=True, **kwargs)
+        self.assertEqual(self.output('resumemodel.sql'), expected)
+        self.assertEqual(ResumeModel.objects.stats(), {'out': 700, 'in': 1000, 'dropped': 300})
+        self.assertFalse(os.path.exists(self.checkpoint))
+        return t
+
+    def test_resume_rows(self):
+        '''resume skips the rows scanned before the checkpoint'''
+        self.resume()
+
+    def test_resume_byte_ranges(self):
+        '''resume workers from the end of the last merged byte range'''
+        self.input_file(self.rows)
+        t = self.resume(reader=None, workers=2)
+        self.assertGreater(t.reader.start, 0)
+
+    def test_resume_blocks(self):
+        '''resume the memory mapped reader from the last block checkpointed'''
+        self.input_file(self.rows)
+        t = self.resume(reader=None, transformer=BlockTransformer)
+        self.assertGreater(t.reader.start, 0)
+
+    def test_collect(self):
+        '''collected objects are not checkpointed, that needs streaming'''
+        self.assertRaises(DefinitionException, self.transform, ResumeModel, rows=self.rows,
+                          checkpoint=self.checkpoint, checkpoint_rows=100)
+
+    def test_spilling_index(self):
+        '''runs of a spilling index are temporary files'''
+        self.assertRaises(DefinitionException, self.transform, SpillingModel, rows=self.rows,
+                          stream=True, checkpoint=self.checkpoint, checkpoint_rows=100)
+        self.assertFalse(os.path.exists(self.checkpoint + '.tmp'))
+
+    def test_not_resumable(self):
+        '''compressed streamed output can not be truncated'''
+        sys.argv += ['--compress', 'gzip', '--checkpoint', self.checkpoint]
+        self.assertRaises(DefinitionException, self.transform, ResumeModel, stream=True)
+
+
+class QuarantineModel(models.Model):
+    id = models.IntField(pos=0, unique=True)
+    name = models.StringField(pos=1, validate=lambda v: not v.endswith('3'))
+    city = models.StringField(pos=2)
+
+    class Meta:
+        drop_if_none = ['city']
+        drop_non_unique = True
+
+
+class FailUniqueModel(models.Model):
+    id = models.IntField(pos=0, unique=True)
+
+    class Meta:
+        fail_non_unique = True
+
+
+class TestQuarantine(TransformerTestCase):
+    rows = TestWorkers.rows[:11] + [["10", "name10", "NULL"]] + TestWorkers.rows[11:]
+
+    def rejects(self, filename):
+        rows = [l.split('\t') for l in self.output(filename)]
+        return rows[0], sorted(rows[1:], key=lambda r: int(r[0]))
+
+    def test_rejects(self):
+        '''dropped rows are written with row number and reason'''
+        sys.argv.append('--quarantine')
+        self.transform(QuarantineModel, rows=self.rows)
+        header, rejects = self.rejects('quarantinemodel.rejects.tsv')
+        self.assertEqual(header, ['row', 'reason', 'id', 'name', 'city'])
+        self.assertEqual(rejects[:3], [
+            ['4', "field 'name' input data did not validate", '3', 'name3', 'city3'],
+            ['11', 'None in field(s): city', '10', 'name10', 'NULL'],
+            ['15', "field 'name' input data did not validate", '13', 'name13', 'city13'],
+        ])
+        self.assertIn(['702', 'non unique value in field(s): id', '0', 'name700', 'city700'], rejects)
+        self.assertEqual(len(rejects), QuarantineModel.objects.stats()['dropped'])
+
+    def test_workers(self):
+        '''rejects of workers have the row numbers of the input'''
+        sys.argv.append('--quarantine')
+        self.transform(QuarantineModel, rows=self.rows)
+        serial = self.rejects('quarantinemodel.rejects.tsv')
+        self.input_file(self.rows)
+        self.transform(QuarantineModel, reader=None, workers=3)
+        self.assertEqual(self.rejects('quarantinemodel.rejects.tsv'), serial)
+
+    def test_unquoted(self):
+        '''rejects of projected unquoted input have all columns'''
+        self.input_file([r + ['x', 'y'] for r in self.rows])
+        sys.argv += ['--quarantine', '--unquoted']
+        t = self.transform(QuarantineModel, reader=None)
+        self.assertIsNone(t.reader.columns)
+        header, rejects = self.rejects('quarantinemodel.rejects.tsv')
+        self.assertEqual(header, ['row', 'reason', 'id', 'name', 'city', 'x', 'y'])
+        self.assertEqual(rejects[0], ['4', "field 'name' input data did not validate",
+                                      '3', 'name3', 'city3', 'x', 'y'])
+
+    def test_error_budget(self):
+        '''rows that fail count against the error budget'''
+        STOP['at'] = '5'
+        try:
+            self.assertRaises(SystemExit, self.transform, ResumeModel, rows=self.rows)
+            t = self.transform(ResumeModel, rows=self.rows, quarantine=True, max_errors=2)
+            self.assertEqual(t.errors, 2)
+            rejects = self.rejects('resumemodel.rejects.tsv')[1]
+            self.assertEqual([r[:2] for r in rejects if r[1].startswith('RuntimeError')],
+                             [['6', 'RuntimeError: interrupted'], ['707', 'RuntimeError: interrupted']])
+            sys.argv += ['--max-errors', '0.001']
+            self.assertRaises(SystemExit, self.transform, ResumeModel, rows=self.rows, workers=2)
+            sys.argv[-1] = '0.002'
+            t = self.transform(ResumeModel, rows=self.rows, workers=2, chunk_size=100)
+            self.assertEqual((t.errors, t.max_errors), (2, 0.002))
+        finally:
+            STOP['at'] = None
+
+    def test_error_budget_workers(self):
+        '''a fraction is checked on the errors of all workers together'''
+        rows = INPUT[:1] + [["5" if i >= 2985 else str(i + 10), "name%d" % i, "city"]
+                            for i in range(3000)]
+        STOP['at'] = '5'
+        try:
+            t = self.transform(ResumeModel, rows=rows, max_errors=0.01)
+            self.assertEqual(t.errors, 15)
+            t = self.transform(ResumeModel, rows=rows, max_errors=0.01, workers=2,
+                               chunk_size=1000)
+            self.assertEqual(t.errors, 15)
+        finally:
+            STOP['at'] = None
+
+    def test_non_unique(self):
+        '''uniqueness violations fail regardless of the error budget'''
+        self.assertRaises(SystemExit, self.transform, FailUniqueModel, rows=self.rows,
+                          max_errors=1000)
+        self.assertRaises(SystemExit, self.transform, FailUniqueModel, rows=self.rows,
+                          max_errors=1000, workers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
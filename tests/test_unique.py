@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import unittest
+from functools import partial
+
+from data_migrator.models import Model, StringField, IntField
+from data_migrator.models import DigestIndex, SpillingIndex
+from data_migrator.exceptions import NonUniqueDataException
+
+
+class DigestModel(Model):
+    a = StringField(pos=0, unique=True)
+    b = IntField(pos=1, unique=True)
+
+    class Meta:
+        drop_non_unique = True
+        unique_index = DigestIndex
+
+
+class SpillModel(Model):
+    a = StringField(pos=0, unique=True)
+
+    class Meta:
+        fail_non_unique = True
+        unique_index = partial(SpillingIndex, max_memory=1024)
+
+
+class CountingRun(object):
+    '''counts the lookups in a run on disk'''
+    def __init__(self, run):
+        self.run = run
+        self.lookups = 0
+
+    def __contains__(self, key):
+        self.lookups += 1
+        return key in self.run
+
+
+class TestIndexes(unittest.TestCase):
+
+    def check_index(self, index, n=5000):
+        for i in range(n):
+            self.assertTrue(index.add("value %d" % i))
+        self.assertEqual(len(index), n)
+        for i in range(n):
+            self.assertIn("value %d" % i, index)
+            self.assertFalse(index.add("value %d" % i))
+        self.assertNotIn("value %d" % n, index)
+        self.assertNotIn(1, index)
+        self.assertTrue(index.add(1))
+        self.assertNotIn("1", index)
+
+    def test_digest_64(self):
+        self.check_index(DigestIndex(bits=64, capacity=8))
+
+    def test_digest_128(self):
+        index = DigestIndex(bits=128)
+        self.check_index(index)
+        self.assertEqual(len(list(index.keys())), 5001)
+
+    def test_spilling(self):
+        index = SpillingIndex(max_memory=2048, max_runs=3)
+        self.check_index(index)
+        self.assertGreater(len(index.runs), 0)
+        self.assertLessEqual(len(index.runs), 4)
+        index.close()
+
+
+class TestUniqueManager(unittest.TestCase):
+
+    def test_drop(self):
+        '''drop_non_unique works with digest index'''
+        DigestModel.objects.scan_rows([["a", "1"], ["b", "2"], ["a", "3"], ["c", "2"], ["d", "4"]])
+        self.assertIsInstance(DigestModel.objects.unique_values['a'], DigestIndex)
+        self.assertEqual([o.a for o in DigestModel.objects.all()], ["a", "b", "d"])
+        self.assertEqual(DigestModel.objects.stats()['dropped'], 2)
+
+    def test_fail(self):
+        '''fail_non_unique works with spilling index'''
+        SpillModel.objects.scan_rows([["v%d" % i] for i in range(500)])
+        self.assertGreater(len(SpillModel.objects.unique_values['a'].runs), 0)
+        self.assertRaises(NonUniqueDataException, SpillModel.objects.scan_row, ["v10"])
+
+    def test_single_lookup(self):
+        '''a new value is looked up once in the runs on disk'''
+        manager = SpillModel.objects.__class__()
+        manager._prepare(SpillModel)
+        manager.scan_rows([["v%d" % i] for i in range(500)])
+        index = manager.unique_values['a']
+        index.runs = [CountingRun(run) for run in index.runs]
+        manager.scan_row(["new"])
+        self.assertEqual([run.lookups for run in index.runs], [1] * len(index.runs))
+
+if __name__ == '__main__':
+    unittest.main()
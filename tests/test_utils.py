@@ -1,14 +1,32 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import os
+import sys
+import argparse
+import gzip
+import json
+import logging
+import shutil
+import tempfile
 import unittest
 import doctest
 
 from data_migrator import utils
+from data_migrator.exceptions import DefinitionException
+from data_migrator.utils.files import open_file, compression_for
+from data_migrator.utils.reader import MMapReader, header_offset, read_range, read_rows
+from data_migrator.utils.metrics import Metrics
+from data_migrator.utils.profiler import Profiler, labels
+from data_migrator import models
+from data_migrator.anonymizors import SimpleStringAnonymizor
 
 
 def load_tests(loader, tests, ignore):
     tests.addTests(doctest.DocTestSuite(utils.sql))
+    tests.addTests(doctest.DocTestSuite(utils.cache))
+    tests.addTests(doctest.DocTestSuite(utils.metrics))
+    tests.addTests(doctest.DocTestSuite(utils.profiler))
     return tests
 
 class TestFunctions(unittest.TestCase):
@@ -20,12 +38,225 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(args.input, 'hello')
         self.assertEqual(args.outdir, 'world')
 
+    def test_argparse_conflict(self):
+        '''options of the parser can not be replaced by accident'''
+        parser = utils.configure_parser()
+        self.assertRaises(argparse.ArgumentError, parser.add_argument, '--outdir')
+        self.assertRaises(argparse.ArgumentError, parser.add_argument, '--stream')
+
+    def test_error_budget(self):
+        '''integers are rows, fractions must be between 0 and 1'''
+        self.assertEqual(utils.argparser.error_budget('0'), 0)
+        self.assertIsInstance(utils.argparser.error_budget('0'), int)
+        self.assertEqual(utils.argparser.error_budget('25'), 25)
+        self.assertEqual(utils.argparser.error_budget('0.01'), 0.01)
+        for v in ['2.5', '0.0', '1.0', '-1', 'many']:
+            self.assertRaises(argparse.ArgumentTypeError, utils.argparser.error_budget, v)
+
     def test_logging(self):
         self.assertTrue(utils.configure_logging())
 
     def test_parser(self):
         self.assertTrue(utils.default_parser())
 
+class TestCache(unittest.TestCase):
+    def test_lru(self):
+        c = utils.LRUCache(maxsize=2)
+        c['a'], c['b'] = 1, 2
+        self.assertEqual(c.get('a'), 1)
+        c['c'] = 3
+        self.assertNotIn('b', c)
+        self.assertIn('a', c)
+        self.assertEqual(len(c), 2)
+        self.assertEqual(c.hit_ratio(), 1.0)
+
+class TestFiles(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.text = u"".join([u"line %d \u00e9\n" % i for i in range(10000)])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def roundtrip(self, name, **kwargs):
+        filename = os.path.join(self.dir, name)
+        with open_file(filename, 'w', encoding='utf-8', **kwargs) as f:
+            f.write(self.text)
+        with open_file(filename, encoding='utf-8') as f:
+            self.assertEqual(f.read(), self.text)
+        return filename
+
+    def test_compression_for(self):
+        self.assertEqual(compression_for('a.sql.gz'), 'gzip')
+        self.assertEqual(compression_for('a.XZ'), 'xz')
+        self.assertEqual(compression_for('a.sql'), None)
+
+    def test_formats(self):
+        names = ['plain.txt', 'a.gz']
+        if sys.version_info[0] > 2:
+            names += ['a.bz2', 'a.xz']
+        for name in names:
+            self.roundtrip(name)
+
+    def test_threads(self):
+        '''block compressed output is a valid multi member file'''
+        filename = self.roundtrip('blocks.gz', threads=3, buffering=1000)
+        with gzip.open(filename, 'rb') as f:
+            self.assertEqual(f.read().decode('utf-8'), self.text)
+
+    def test_unknown(self):
+        self.assertRaises(DefinitionException, open_file,
+                          os.path.join(self.dir, 'a'), 'w', compression='lz4')
+
+class TestMMapReader(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'input.tsv')
+        with open(self.filename, 'wb') as f:
+            f.write(b'a\tb\n')
+            for i in range(1000):
+                f.write(('%d\tv\u00e9 %d\r\n' % (i, i)).encode('utf-8'))
+            f.write(b'"quoted\tvalue"\tlast')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_rows(self):
+        for quoted in [True, False]:
+            rows = list(MMapReader(self.filename, quoted=quoted, block_size=100))
+            self.assertEqual(len(rows), 1002)
+            self.assertEqual(rows[0], ['a', 'b'])
+            self.assertEqual(rows[1000], ['999', 'v\u00e9 999'])
+        self.assertEqual(rows[-1], ['"quoted', 'value"', 'last'])
+        self.assertEqual(list(MMapReader(self.filename))[-1], ['quoted\tvalue', 'last'])
+
+    def test_ranges(self):
+        '''every row is read from exactly one range'''
+        reader = MMapReader(self.filename, quoted=False)
+        self.assertEqual(next(reader), ['a', 'b'])
+        ranges = reader.ranges(7, header_offset(self.filename))
+        self.assertEqual(len(ranges), 7)
+        rows = []
+        for start, end in ranges:
+            rows += MMapReader(self.filename, start, end, quoted=False, block_size=64)
+        self.assertEqual(rows, list(reader))
+
+    def test_columns(self):
+        '''only the first columns are split, header is read in full'''
+        reader = MMapReader(self.filename, quoted=False, columns=1, header=True)
+        self.assertEqual(reader.headers, ['a', 'b'])
+        rows = list(reader)
+        self.assertEqual(rows[0], ['0', 'v\u00e9 0'])
+        self.assertEqual(rows[-1], ['"quoted', 'value"\tlast'])
+
+    def test_encoding(self):
+        '''non-ASCII quoted and unquoted input is decoded'''
+        filename = os.path.join(self.dir, 'latin.tsv')
+        with open(filename, 'wb') as f:
+            f.write(u'"\u00e9t\u00e9"\tz\u00fcrich\n'.encode('latin-1'))
+        self.assertEqual(list(MMapReader(filename, encoding='latin-1')),
+                         [[u'\u00e9t\u00e9', u'z\u00fcrich']])
+        self.assertEqual(list(MMapReader(filename, encoding='latin-1', quoted=False)),
+                         [[u'"\u00e9t\u00e9"', u'z\u00fcrich']])
+        self.assertEqual(list(read_range(filename, 0, 100, encoding='latin-1')),
+                         [[u'\u00e9t\u00e9', u'z\u00fcrich']])
+        with open(filename, 'rb') as f:
+            self.assertEqual(list(read_rows(f, encoding='latin-1')),
+                             [[u'\u00e9t\u00e9', u'z\u00fcrich']])
+
+    def test_empty(self):
+        filename = os.path.join(self.dir, 'empty.tsv')
+        open(filename, 'w').close()
+        self.assertEqual(list(MMapReader(filename)), [])
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_stages(self):
+        m = Metrics()
+        for _ in range(2):
+            with m.stage('read'):
+                pass
+        m.add_field('model.a', 'parse', 0.5)
+        m.merge({'stages': {'read': 1.0, 'scan.model': 2.0},
+                 'fields': {'model.a': {'parse': 0.5, 'emit': 0.25}},
+                 'field_errors': 2})
+        d = m.as_dict()
+        self.assertEqual(d['field_errors'], 2)
+        self.assertGreaterEqual(d['stages']['read'], 1.0)
+        self.assertEqual(d['stages']['scan.model'], 2.0)
+        self.assertEqual(d['fields'], {'model.a': {'parse': 1.0, 'emit': 0.25}})
+
+    def test_progress(self):
+        m = Metrics(total_bytes=1000, interval=0)
+        # assertLogs is python 3 only
+        lines = []
+        handler = logging.Handler()
+        handler.emit = lambda record: lines.append(record.getMessage())
+        log = logging.getLogger('data_migrator')
+        level = log.level
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        try:
+            m.progress(10, 100)
+            m.progress(20, 500)
+        finally:
+            log.removeHandler(handler)
+            log.setLevel(level)
+        self.assertEqual((m.rows, m.bytes), (20, 400))
+        self.assertIn('50.0%, ETA', lines[-1])
+
+    def test_dump(self):
+        m = Metrics()
+        m.add('read', 1.5)
+        m.add_field('model.a', 'emit', 0.5)
+        filename = os.path.join(self.dir, 'metrics.json')
+        m.dump(filename)
+        with open(filename) as f:
+            self.assertEqual(json.load(f)['stages'], {'read': 1.5})
+        filename = os.path.join(self.dir, 'metrics.prom')
+        m.dump(filename)
+        with open(filename) as f:
+            prom = f.read()
+        self.assertIn('data_migrator_stage_seconds{stage="read"} 1.5\n', prom)
+        self.assertIn('data_migrator_field_seconds{model="model",field="a",phase="emit"} 0.5\n', prom)
+        self.assertEqual(sorted(os.listdir(self.dir)), ['metrics.json', 'metrics.prom'])
+
+
+def upper(v):
+    return v.upper()
+
+
+class ProfiledModel(models.Model):
+    a = models.StringField(pos=0, parse=upper)
+    b = models.StringField(pos=1, parse=upper, anonymize=SimpleStringAnonymizor)
+
+
+class TestProfiler(unittest.TestCase):
+    def test_labels(self):
+        names = labels([ProfiledModel])
+        self.assertEqual(names[(upper.__code__.co_filename, upper.__code__.co_firstlineno, 'upper')],
+                         'ProfiledModel.a parse, ProfiledModel.b parse')
+        self.assertIn('ProfiledModel.b anonymize', names.values())
+        self.assertIn('ProfiledModel scan (generated)', names.values())
+
+    def test_phases(self):
+        profiler = Profiler()
+        with profiler.phase('read'):
+            ProfiledModel.objects.scan_rows([["x", "y"]] * 10)
+        with profiler.phase('read'):
+            with profiler.paused():
+                ProfiledModel.objects.scan_rows([["x", "y"]] * 10)
+        spots = profiler.hotspots([ProfiledModel])
+        self.assertEqual(spots[0][:3], ('read', 'ProfiledModel scan (generated)', 10))
+        self.assertIn(('read', 'ProfiledModel.a parse, ProfiledModel.b parse', 20),
+                      [x[:3] for x in spots])
+
+
 class TestCSV(unittest.TestCase):
     def test_unflatten(self):
         a = {'hello__world': 1, 'hallo': 2, 'hi': 3, 'hello__welt': 4}